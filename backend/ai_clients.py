@@ -0,0 +1,244 @@
+"""
+Shared AI API clients for FaunaVision
+Owns one long-lived OpenAI client and one Gemini model handle per
+process, so HTTP connection pools and TLS sessions are reused across
+requests. Calls go through per-provider concurrency limits and timeouts.
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# OpenAI integration
+try:
+    from openai import OpenAI
+    OPENAI_AVAILABLE = True
+except ImportError:
+    OPENAI_AVAILABLE = False
+    logging.warning("OpenAI library not available. Install with: pip install openai")
+
+# Gemini integration
+try:
+    import google.generativeai as genai
+    GEMINI_AVAILABLE = True
+except ImportError:
+    GEMINI_AVAILABLE = False
+    logging.warning("Gemini library not available. Install with: pip install google-generativeai")
+
+DEFAULT_OPENAI_MODEL = "gpt-4"
+# Model names require 'models/' prefix
+DEFAULT_GEMINI_MODEL = "models/gemini-2.0-flash"
+
+
+class ConcurrencyLimitError(Exception):
+    """Raised when no call slot frees up within the timeout."""
+
+
+class AIClientProvider:
+    """
+    Pooled, thread-safe OpenAI and Gemini clients.
+
+    Clients are created once by `initialize()`. Every call holds a slot of
+    a bounded semaphore for its provider, so at most `max_concurrency`
+    requests per provider are in flight.
+
+    To run against a local stub server, set `openai_base_url` (e.g.
+    http://127.0.0.1:8080/v1) and/or `gemini_endpoint` (e.g.
+    127.0.0.1:8080, uses the REST transport).
+    """
+
+    def __init__(
+        self,
+        openai_api_key: Optional[str] = None,
+        gemini_api_key: Optional[str] = None,
+        openai_base_url: Optional[str] = None,
+        gemini_endpoint: Optional[str] = None,
+        openai_model: str = DEFAULT_OPENAI_MODEL,
+        gemini_model: str = DEFAULT_GEMINI_MODEL,
+        timeout: float = 120.0,
+        max_concurrency: int = 8,
+        max_retries: int = 2
+    ):
+        """
+        Initialize client provider.
+
+        Args:
+            openai_api_key: OpenAI API key
+            gemini_api_key: Gemini API key
+            openai_base_url: Override the OpenAI API URL
+            gemini_endpoint: Override the Gemini API endpoint (host[:port])
+            openai_model: Chat model used for health assessment
+            gemini_model: Gemini model name
+            timeout: Per-request timeout in seconds
+            max_concurrency: Maximum in-flight requests per provider; also
+                             the connection pool size
+            max_retries: Retries on transient OpenAI errors
+        """
+        self.openai_api_key = openai_api_key
+        self.gemini_api_key = gemini_api_key
+        self.openai_base_url = openai_base_url
+        self.gemini_endpoint = gemini_endpoint
+        self.openai_model = openai_model
+        self.gemini_model_name = gemini_model
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+
+        self._openai_client = None
+        self._gemini_model = None
+        self._init_lock = threading.Lock()
+        self._slots = {
+            "openai": threading.BoundedSemaphore(max_concurrency),
+            "gemini": threading.BoundedSemaphore(max_concurrency)
+        }
+        self._in_flight = {"openai": 0, "gemini": 0}
+        self._counter_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "AIClientProvider":
+        """Build a provider from environment variables."""
+        return cls(
+            openai_api_key=os.getenv("OPENAI_API_KEY"),
+            gemini_api_key=os.getenv("GEMINI_API_KEY"),
+            openai_base_url=os.getenv("OPENAI_BASE_URL") or None,
+            gemini_endpoint=os.getenv("GEMINI_API_ENDPOINT") or None,
+            openai_model=os.getenv("OPENAI_MODEL", DEFAULT_OPENAI_MODEL),
+            gemini_model=os.getenv("GEMINI_MODEL", DEFAULT_GEMINI_MODEL),
+            timeout=float(os.getenv("AI_REQUEST_TIMEOUT", 120)),
+            max_concurrency=int(os.getenv("AI_MAX_CONCURRENCY", 8)),
+            max_retries=int(os.getenv("AI_MAX_RETRIES", 2))
+        )
+
+    def initialize(self):
+        """Create the clients for every provider that is installed and configured."""
+        with self._init_lock:
+            if OPENAI_AVAILABLE and self.openai_api_key and self._openai_client is None:
+                import httpx
+                http_client = httpx.Client(
+                    limits=httpx.Limits(
+                        max_connections=self.max_concurrency,
+                        max_keepalive_connections=self.max_concurrency
+                    ),
+                    timeout=self.timeout
+                )
+                self._openai_client = OpenAI(
+                    api_key=self.openai_api_key,
+                    base_url=self.openai_base_url,
+                    timeout=self.timeout,
+                    max_retries=self.max_retries,
+                    http_client=http_client
+                )
+                logger.info("OpenAI client initialized")
+
+            if GEMINI_AVAILABLE and self.gemini_api_key and self._gemini_model is None:
+                options = {"api_key": self.gemini_api_key}
+                if self.gemini_endpoint:
+                    options["transport"] = "rest"
+                    options["client_options"] = {"api_endpoint": self.gemini_endpoint}
+                genai.configure(**options)
+                self._gemini_model = genai.GenerativeModel(self.gemini_model_name)
+                logger.info(f"Gemini model initialized: {self.gemini_model_name}")
+
+    @property
+    def openai_client(self):
+        if self._openai_client is None:
+            self.initialize()
+        if self._openai_client is None:
+            raise ValueError("OPENAI_API_KEY not set in environment")
+        return self._openai_client
+
+    @property
+    def gemini_model(self):
+        if self._gemini_model is None:
+            self.initialize()
+        if self._gemini_model is None:
+            raise ValueError("GEMINI_API_KEY not set in environment")
+        return self._gemini_model
+
+    @contextmanager
+    def _slot(self, provider: str):
+        """Hold one of the provider's concurrency slots."""
+        if not self._slots[provider].acquire(timeout=self.timeout):
+            raise ConcurrencyLimitError(f"Timed out waiting for a {provider} request slot")
+        with self._counter_lock:
+            self._in_flight[provider] += 1
+        try:
+            yield
+        finally:
+            with self._counter_lock:
+                self._in_flight[provider] -= 1
+            self._slots[provider].release()
+
+    def chat(self, messages: List[Dict], **kwargs) -> str:
+        """
+        Run an OpenAI chat completion.
+
+        Args:
+            messages: Chat messages
+            **kwargs: Extra arguments for chat.completions.create
+
+        Returns:
+            Stripped text of the first choice
+        """
+        client = self.openai_client
+        with self._slot("openai"):
+            response = client.chat.completions.create(
+                model=self.openai_model,
+                messages=messages,
+                **kwargs
+            )
+        return response.choices[0].message.content.strip()
+
+    def generate(self, contents) -> str:
+        """
+        Run a Gemini generate_content call.
+
+        Args:
+            contents: Prompt string or list of prompt parts/files
+
+        Returns:
+            Stripped response text
+        """
+        model = self.gemini_model
+        with self._slot("gemini"):
+            response = model.generate_content(contents, request_options={"timeout": self.timeout})
+        return response.text.strip()
+
+    def generate_with_video(self, prompt: str, video_path: str) -> str:
+        """
+        Upload a video to Gemini, run a prompt against it and delete the upload.
+
+        Args:
+            prompt: Text prompt
+            video_path: Path to the video file
+
+        Returns:
+            Stripped response text
+        """
+        model = self.gemini_model
+        with self._slot("gemini"):
+            video_file = genai.upload_file(path=video_path)
+            try:
+                response = model.generate_content(
+                    [prompt, video_file],
+                    request_options={"timeout": self.timeout}
+                )
+            finally:
+                genai.delete_file(video_file.name)
+        return response.text.strip()
+
+    def stats(self) -> Dict:
+        """Client status and in-flight request counts."""
+        with self._counter_lock:
+            in_flight = dict(self._in_flight)
+        return {
+            "openai_ready": self._openai_client is not None,
+            "gemini_ready": self._gemini_model is not None,
+            "max_concurrency": self.max_concurrency,
+            "timeout": self.timeout,
+            "in_flight": in_flight
+        }
@@ -4,14 +4,18 @@ Accepts video and animal parameters, processes with vision model,
 and uses OpenAI to determine health status.
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge
 import os
-import cv2
-import tempfile
-import shutil
+import hmac
+import json
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 import logging
 
 # Load environment variables from .env file
@@ -26,22 +30,13 @@ import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from src.yolo_behavior_classifier import YOLOBehaviorClassifier
-
-# OpenAI integration
-try:
-    from openai import OpenAI
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
-    logging.warning("OpenAI library not available. Install with: pip install openai")
-
-# Gemini integration
-try:
-    import google.generativeai as genai
-    GEMINI_AVAILABLE = True
-except ImportError:
-    GEMINI_AVAILABLE = False
-    logging.warning("Gemini library not available. Install with: pip install google-generativeai")
+from src.frame_sampler import get_video_duration
+from backend.jobs import JobManager, QueueFullError
+from backend.uploads import StreamedUpload, StreamingUploadRequest, remove_upload_dir
+from backend.result_cache import ResultCache
+from backend.llm_cache import MemoCache
+from backend.ai_clients import AIClientProvider, GEMINI_AVAILABLE, OPENAI_AVAILABLE
+from backend.inference_pool import InferencePool
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -55,17 +50,101 @@ CORS(app, origins=["http://localhost:3000", "http://127.0.0.1:3000"], supports_c
 UPLOAD_FOLDER = "temp"
 MAX_VIDEO_SIZE = 100 * 1024 * 1024  # 100MB
 ALLOWED_EXTENSIONS = {'mp4', 'avi', 'mov', 'mkv'}
+YOLO_BATCH_SIZE = int(os.getenv("YOLO_BATCH_SIZE", 8))  # Sampled frames per forward pass
+YOLO_SAMPLING_MODE = os.getenv("YOLO_SAMPLING_MODE", "auto")  # auto, grab or seek
+YOLO_PREFETCH_DEPTH = int(os.getenv("YOLO_PREFETCH_DEPTH", 16))  # Decoded frames buffered ahead of inference (0 = off)
+YOLO_MOTION_THRESHOLD = float(os.getenv("YOLO_MOTION_THRESHOLD", 0))  # Skip inference on static frames (0 = off)
+
+# YOLO result cache (keyed by video hash, model version and sampling parameters)
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", "cache/yolo_results")
+RESULT_CACHE_MAX_MB = float(os.getenv("RESULT_CACHE_MAX_MB", 256))  # 0 disables the cache
+
+# Health assessment memoization
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", 3600))  # Seconds a cached assessment stays valid
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", 1024))  # Maximum cached assessments
+LLM_CACHE_PRECISION = int(os.getenv("LLM_CACHE_PRECISION", 2))  # Decimals behavior percentages are rounded to in the key
+LLM_CACHE_DURATION_STEP = float(os.getenv("LLM_CACHE_DURATION_STEP", 10))  # Seconds video durations are rounded to in the key
+
+# Background analysis jobs
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))  # Analyses running at once
+MAX_QUEUED_JOBS = int(os.getenv("MAX_QUEUED_JOBS", 20))  # Analyses waiting for a worker before /analyze returns 503
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", 3600))  # How long finished results stay available
+
+# Per-stage timeouts for the concurrent YOLO / Gemini stages of an analysis
+YOLO_STAGE_TIMEOUT = float(os.getenv("YOLO_STAGE_TIMEOUT", 600))  # Seconds before falling back to Gemini only
+GEMINI_STAGE_TIMEOUT = float(os.getenv("GEMINI_STAGE_TIMEOUT", 180))  # Seconds before falling back to YOLO only
+
+# Incremental analysis over Server-Sent Events (/analyze/stream)
+STREAM_WINDOW_SECONDS = float(os.getenv("STREAM_WINDOW_SECONDS", 60))  # Video seconds per partial update
+STREAM_MAX_CONCURRENT = int(os.getenv("STREAM_MAX_CONCURRENT", 2))  # Streaming analyses running at once (in the API process)
+
+# Model hot reload (POST /admin/reload-model, or watching YOLO_MODEL_PATH)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")  # Required in X-Admin-Token for /admin endpoints (unset = disabled)
+MODEL_WATCH_INTERVAL = float(os.getenv("MODEL_WATCH_INTERVAL", 0))  # Seconds between model file checks (0 = off)
+
+# Warmup before readiness (see /ready)
+YOLO_WARMUP_BATCH_SIZES = sorted({
+    int(size) for size in os.getenv("YOLO_WARMUP_BATCH_SIZES", f"1,{YOLO_BATCH_SIZE}").split(",") if size.strip()
+})  # Batch sizes run once on a blank frame before serving
+YOLO_WARMUP_ITERATIONS = int(os.getenv("YOLO_WARMUP_ITERATIONS", 2))  # Dummy inferences per warmup batch size
+
+# YOLO inference on a pool of worker processes (used by /analyze and /analyze/batch)
+INFERENCE_POOL = os.getenv("INFERENCE_POOL", "true").lower() == "true"  # false = run /analyze inference in the API process
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", 0)) or JOB_WORKERS  # Worker processes (0 = one per concurrent analysis)
+# Intra-op threads per worker (0 = split the cores between the workers, so a
+# single analysis still uses the whole machine)
+INFERENCE_THREADS_PER_WORKER = (
+    int(os.getenv("INFERENCE_THREADS_PER_WORKER", 0)) or max(1, (os.cpu_count() or 1) // INFERENCE_WORKERS)
+)
+BATCH_MAX_VIDEOS = int(os.getenv("BATCH_MAX_VIDEOS", 100))  # Videos accepted per batch request
+BATCH_MAX_IN_FLIGHT = int(os.getenv("BATCH_MAX_IN_FLIGHT", 0))  # Videos submitted to the pool at once (0 = 2 per worker)
+BATCH_MAX_UPLOAD_SIZE = int(float(os.getenv("BATCH_MAX_UPLOAD_MB", 2048)) * 1024 * 1024)  # Total upload size per batch request
+BATCH_ALLOWED_ROOT = os.getenv("BATCH_ALLOWED_ROOT")  # Directory server-side paths must be under (unset = paths disabled)
 
 # Create upload folder if it doesn't exist
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
+# Stream uploads straight into UPLOAD_FOLDER, rejecting oversized bodies
+# before (Content-Length) or while (chunked) they are written
+StreamingUploadRequest.upload_dir = UPLOAD_FOLDER
+StreamingUploadRequest.max_upload_size = MAX_VIDEO_SIZE
+app.request_class = StreamingUploadRequest
+app.config["MAX_CONTENT_LENGTH"] = MAX_VIDEO_SIZE + 1024 * 1024  # Room for the other form fields
+StreamingUploadRequest.endpoint_max_content_length = {"analyze_batch": BATCH_MAX_UPLOAD_SIZE}
+
+result_cache = None
+if RESULT_CACHE_MAX_MB > 0:
+    try:
+        result_cache = ResultCache(RESULT_CACHE_DIR, max_bytes=int(RESULT_CACHE_MAX_MB * 1024 * 1024))
+    except OSError as e:
+        logger.warning(f"Result cache disabled: {e}")
+
+# Long-lived OpenAI/Gemini clients shared by all requests
+# (OPENAI_BASE_URL / GEMINI_API_ENDPOINT point them at a local stub server)
+ai_clients = AIClientProvider.from_env()
+ai_clients.initialize()
+
+llm_cache = MemoCache(ttl_seconds=LLM_CACHE_TTL, max_entries=LLM_CACHE_SIZE)
+
+job_manager = JobManager(
+    max_workers=JOB_WORKERS,
+    max_queued=MAX_QUEUED_JOBS,
+    retention_seconds=JOB_RETENTION_SECONDS
+)
+
+# YOLO and Gemini stages of each analysis run side by side on these threads
+stage_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS * 2, thread_name_prefix="analysis-stage")
+
 # Initialize YOLO behavior classifier
 # Set YOLO_MODEL_PATH environment variable to path of trained model
 # Example: export YOLO_MODEL_PATH="models/behavior_classifier.pt"
+# Set YOLO_ENGINE to "ultralytics", "onnx" or "openvino" to override the
+# engine picked from the model file extension (.pt, .onnx, .xml)
 yolo_classifier = None
 yolo_model_path = os.getenv("YOLO_MODEL_PATH", None)
+yolo_engine = os.getenv("YOLO_ENGINE", None)
 try:
-    yolo_classifier = YOLOBehaviorClassifier(model_path=yolo_model_path)
+    yolo_classifier = YOLOBehaviorClassifier(model_path=yolo_model_path, engine=yolo_engine)
     if yolo_classifier.model is not None:
         logger.info("YOLO behavior classifier initialized successfully")
     else:
@@ -74,17 +153,311 @@ except Exception as e:
     logger.warning(f"YOLO classifier initialization failed: {e}. Will use placeholder.")
 
 
+# Worker processes that each hold a loaded model. With INFERENCE_POOL they
+# start during warmup; otherwise on the first batch request.
+inference_pool = None
+
+# Guards swapping yolo_classifier / inference_pool on a model reload
+model_lock = threading.RLock()
+model_reload_lock = threading.Lock()
+
+
+def create_inference_pool(model_path: Optional[str], engine: Optional[str]) -> InferencePool:
+    """Start an inference pool for a model and wait until its workers are warm."""
+    pool = InferencePool(
+        model_path=model_path,
+        engine=engine,
+        workers=INFERENCE_WORKERS,
+        threads_per_worker=INFERENCE_THREADS_PER_WORKER,
+        warmup_batch_sizes=YOLO_WARMUP_BATCH_SIZES,
+        warmup_iterations=YOLO_WARMUP_ITERATIONS
+    )
+    try:
+        pool.start()
+    except Exception:
+        pool.shutdown(wait=False)
+        raise
+    return pool
+
+
+def get_inference_pool() -> InferencePool:
+    """Return the inference pool, starting and warming its workers if needed."""
+    global inference_pool
+    with model_lock:
+        if inference_pool is None:
+            inference_pool = create_inference_pool(yolo_model_path, yolo_engine)
+        return inference_pool
+
+
+@contextmanager
+def current_model(use_pool: Optional[bool] = None):
+    """
+    Pin the active classifier (and inference pool) for one analysis.
+    
+    A model reload swaps in new ones for later analyses; the pinned pool is
+    only shut down after every analysis using it has finished.
+    
+    Args:
+        use_pool: Also pin the inference pool (default: INFERENCE_POOL)
+    
+    Yields:
+        (classifier, pool) - pool is None when not requested
+    """
+    if use_pool is None:
+        use_pool = INFERENCE_POOL
+    with model_lock:
+        classifier = yolo_classifier
+        pool = get_inference_pool() if use_pool else None
+        if pool is not None:
+            pool.acquire()
+    try:
+        yield classifier, pool
+    finally:
+        if pool is not None:
+            pool.release()
+
+
+# Streaming analyses run on the API process's classifier; bound the CPU they take
+stream_slots = threading.BoundedSemaphore(STREAM_MAX_CONCURRENT)
+
+# Readiness (see /ready): analyses are refused until warmup has finished
+readiness = {
+    "ready": False,
+    "error": None,
+    "started_at": datetime.now().isoformat(),
+    "ready_at": None,
+    "warmup_seconds": None,
+    "warmup": None
+}
+
+
+def warm_up():
+    """
+    Load and warm the model before accepting analyses.
+    
+    Starts the inference pool (each worker warms its own model) or, without
+    the pool, runs dummy inferences on the in-process classifier at every
+    YOLO_WARMUP_BATCH_SIZES batch size.
+    """
+    global INFERENCE_POOL
+    started = time.monotonic()
+    try:
+        warmup = None
+        if INFERENCE_POOL:
+            try:
+                warmup = {"workers": get_inference_pool().worker_info}
+            except Exception as e:
+                logger.warning(f"Inference pool failed to start: {e}. Running inference in the API process.")
+                INFERENCE_POOL = False
+        if not INFERENCE_POOL and yolo_classifier is not None:
+            warmup = {"in_process": yolo_classifier.warmup(YOLO_WARMUP_BATCH_SIZES, YOLO_WARMUP_ITERATIONS)}
+        
+        readiness["warmup"] = warmup
+        readiness["ready_at"] = datetime.now().isoformat()
+        readiness["ready"] = True
+        logger.info(f"Warmup finished in {time.monotonic() - started:.2f}s, ready for traffic")
+    except Exception as e:
+        logger.error(f"Warmup failed: {e}", exc_info=True)
+        readiness["error"] = str(e)
+    finally:
+        readiness["warmup_seconds"] = round(time.monotonic() - started, 3)
+
+
+threading.Thread(target=warm_up, name="warmup", daemon=True).start()
+
+
+class ReloadInProgressError(Exception):
+    """Raised when a model reload is requested while another is running."""
+
+
+def reload_model(model_path: str, engine: Optional[str] = None) -> Dict:
+    """
+    Load a model next to the current one, warm it and swap it in.
+    
+    Analyses already running finish on the old model; its worker pool is
+    shut down once they are done. On failure the current model stays.
+    
+    Args:
+        model_path: Path to the new model
+        engine: Inference engine (default: from the file extension)
+    
+    Returns:
+        Old and new model versions and warmup timings
+    
+    Raises:
+        ReloadInProgressError: If another reload is already running
+        ValueError: If the model cannot be loaded
+    """
+    global yolo_classifier, yolo_model_path, yolo_engine, inference_pool
+    if not model_reload_lock.acquire(blocking=False):
+        raise ReloadInProgressError("A model reload is already in progress")
+    try:
+        started = time.monotonic()
+        classifier = YOLOBehaviorClassifier(model_path=model_path, engine=engine)
+        if classifier.model is None:
+            raise ValueError(f"Could not load model from {model_path}")
+        
+        pool = None
+        if INFERENCE_POOL or inference_pool is not None:
+            pool = create_inference_pool(model_path, engine)
+            versions = {info["model_version"] for info in pool.worker_info}
+            if versions != {classifier.model_version}:
+                pool.shutdown(wait=False)
+                raise ValueError(f"Inference workers loaded model versions {sorted(versions)}, expected {classifier.model_version}")
+            warmup = {"workers": pool.worker_info}
+        else:
+            warmup = {"in_process": classifier.warmup(YOLO_WARMUP_BATCH_SIZES, YOLO_WARMUP_ITERATIONS)}
+        
+        with model_lock:
+            old_version = yolo_classifier.model_version if yolo_classifier is not None else None
+            old_pool = inference_pool
+            yolo_classifier, yolo_model_path, yolo_engine = classifier, model_path, engine
+            if pool is not None:
+                inference_pool = pool
+        if pool is not None and old_pool is not None:
+            old_pool.retire()
+        
+        readiness["warmup"] = warmup
+        logger.info(f"Model reloaded from {model_path}: {old_version} -> {classifier.model_version}")
+        return {
+            "model_path": model_path,
+            "engine": classifier.engine,
+            "previous_version": old_version,
+            "model_version": classifier.model_version,
+            "reload_seconds": round(time.monotonic() - started, 3),
+            "warmup": warmup
+        }
+    finally:
+        model_reload_lock.release()
+
+
+def _model_signature(model_path: str) -> Optional[tuple]:
+    """Size and modification time of a model file (or newest file of an export directory)."""
+    try:
+        if os.path.isdir(model_path):
+            stats = [os.stat(os.path.join(root, name)) for root, _, names in os.walk(model_path) for name in names]
+            return (sum(st.st_size for st in stats), max((st.st_mtime for st in stats), default=0))
+        stat = os.stat(model_path)
+        return (stat.st_size, stat.st_mtime)
+    except OSError:
+        return None
+
+
+def watch_model_file():
+    """
+    Reload the model whenever the file at YOLO_MODEL_PATH changes.
+    
+    A change is acted on once the file has stayed the same for a full
+    interval, so a model that is still being copied is not loaded.
+    """
+    watched = yolo_model_path
+    last = _model_signature(watched)
+    while True:
+        time.sleep(MODEL_WATCH_INTERVAL)
+        if yolo_model_path != watched:
+            # Switched to another file through /admin/reload-model
+            watched = yolo_model_path
+            last = _model_signature(watched)
+            continue
+        
+        current = _model_signature(watched)
+        if current is None or current == last:
+            continue
+        time.sleep(MODEL_WATCH_INTERVAL)
+        if _model_signature(watched) != current:
+            continue  # Still being written; check again next round
+        
+        last = current
+        try:
+            result = reload_model(watched, yolo_engine)
+            logger.info(f"Model file changed, now serving version {result['model_version']}")
+        except Exception as e:
+            logger.error(f"Reloading changed model file failed: {e}")
+
+
+if MODEL_WATCH_INTERVAL > 0 and yolo_model_path:
+    threading.Thread(target=watch_model_file, name="model-watch", daemon=True).start()
+
+
 def allowed_file(filename: str) -> bool:
     """Check if file extension is allowed."""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
-def process_video_with_yolo(video_path: str) -> Dict:
+YOLO_FRAME_INTERVAL = 1.0  # Process every 1 second
+
+
+def yolo_analysis_options(batch_size: int) -> Dict:
+    """Keyword arguments for YOLOBehaviorClassifier.analyze_video."""
+    return {
+        "frame_interval": YOLO_FRAME_INTERVAL,
+        "batch_size": batch_size,
+        "sampling_mode": YOLO_SAMPLING_MODE,
+        "prefetch_depth": YOLO_PREFETCH_DEPTH,
+        "motion_threshold": YOLO_MOTION_THRESHOLD
+    }
+
+
+def yolo_cache_key(classifier: YOLOBehaviorClassifier, video_sha256: Optional[str]) -> Optional[str]:
+    """Result cache key for a video, or None if the result is not cacheable."""
+    if result_cache is None or not video_sha256 or classifier is None or classifier.model is None:
+        return None
+    return ResultCache.make_key(video_sha256, classifier.model_version, {
+        "schema": 3,  # Bump when the result layout or computation changes (2: timeline added, 3: frames always downscaled)
+        "engine": classifier.engine,
+        "frame_interval": YOLO_FRAME_INTERVAL,
+        "sampling_mode": YOLO_SAMPLING_MODE,
+        "motion_threshold": YOLO_MOTION_THRESHOLD
+    })
+
+
+def is_cacheable_analysis(analysis: Dict) -> bool:
+    """Only real results are cached: no error and at least one accepted frame."""
+    return "error" not in analysis and analysis["frames_classified"] > 0
+
+
+def build_yolo_result(classifier: YOLOBehaviorClassifier, analysis: Dict, batch_size: int) -> Dict:
+    """Turn an analyze_video result into the process_video_with_yolo response."""
+    behavior_percentages = analysis["behavior_percentages"]
+    primary_behavior, primary_percentage = classifier.get_primary_behavior(behavior_percentages)
+    return {
+        "behavior_percentages": behavior_percentages,
+        "primary_behavior": primary_behavior,
+        "primary_percentage": primary_percentage,
+        "length_seconds": analysis["length_seconds"],
+        "frame_interval": YOLO_FRAME_INTERVAL,
+        "batch_size": batch_size,
+        "model_version": analysis["model_version"],
+        "timeline": analysis["timeline"],
+        "inference_stats": {
+            "frames_sampled": analysis["frames_sampled"],
+            "frames_classified": analysis["frames_classified"],
+            "inferences_run": analysis["inferences_run"],
+            "inferences_skipped": analysis["inferences_skipped"],
+            "inference_seconds": round(analysis["inference_seconds"], 3),
+            "frames_per_second": round(
+                analysis["frames_classified"] / analysis["inference_seconds"], 2
+            ) if analysis["inference_seconds"] else 0.0
+        },
+        "cached": False
+    }
+
+
+def process_video_with_yolo(
+    video_path: str,
+    batch_size: Optional[int] = None,
+    video_sha256: Optional[str] = None
+) -> Dict:
     """
     Process video with YOLO model to get behavior time percentages.
     
+    Results are cached by video content hash when `video_sha256` is given,
+    so re-uploads of the same clip skip inference.
+    
     Args:
         video_path: Path to video file
+        batch_size: Frames per forward pass (default: YOLO_BATCH_SIZE)
+        video_sha256: SHA-256 of the video file, used as the cache key
         
     Returns:
         Dictionary with:
@@ -92,32 +465,46 @@ def process_video_with_yolo(video_path: str) -> Dict:
         - primary_behavior: str - Most common behavior
         - length_seconds: float - Video duration
         - frame_interval: float - Processing interval used
+        - batch_size: int - Frames per forward pass used
+        - model_version: str - Version of the model that produced the result
+        - timeline: List[Dict] - Run-length-encoded behavior segments
+        - inference_stats: Dict - Frames sampled, inferences run/skipped,
+          frames/sec and the worker queue depth at dispatch
+        - cached: bool - Whether the result came from the result cache
     """
+    if batch_size is None:
+        batch_size = YOLO_BATCH_SIZE
+    
     try:
-        # Get video duration
-        cap = cv2.VideoCapture(video_path)
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        duration = frame_count / fps if fps > 0 else 0
-        cap.release()
+        with current_model() as (classifier, pool):
+            # Reuse a previous result for the same video, model and sampling
+            cache_key = yolo_cache_key(classifier, video_sha256)
+            if cache_key is not None:
+                cached = result_cache.get(cache_key)
+                if cached is not None:
+                    logger.info(f"YOLO result cache hit for video {video_sha256[:12]}")
+                    cached["cached"] = True
+                    return cached
+            
+            # Process with YOLO classifier, on a worker process when the pool is up
+            options = yolo_analysis_options(batch_size)
+            if pool is not None:
+                queue_depth = pool.queue_depth
+                analysis = pool.submit(video_path, **options).result()
+            else:
+                queue_depth = 0
+                started = time.monotonic()
+                analysis = classifier.analyze_video(video_path, **options)
+                if "error" in analysis:
+                    raise RuntimeError(analysis["error"])
+                analysis["inference_seconds"] = time.monotonic() - started
+            result = build_yolo_result(classifier, analysis, batch_size)
+            result["inference_stats"]["queue_depth"] = queue_depth
         
-        # Process with YOLO classifier
-        frame_interval = 1.0  # Process every 1 second
-        behavior_percentages = yolo_classifier.analyze_video_percentages(
-            video_path, 
-            frame_interval=frame_interval
-        )
+        if cache_key is not None and is_cacheable_analysis(analysis):
+            result_cache.put(cache_key, result)
         
-        # Get primary behavior
-        primary_behavior, primary_percentage = yolo_classifier.get_primary_behavior(behavior_percentages)
-        
-        return {
-            "behavior_percentages": behavior_percentages,
-            "primary_behavior": primary_behavior,
-            "primary_percentage": primary_percentage,
-            "length_seconds": duration,
-            "frame_interval": frame_interval
-        }
+        return result
         
     except Exception as e:
         logger.error(f"Error processing video with YOLO: {e}", exc_info=True)
@@ -133,6 +520,7 @@ def process_video_with_yolo(video_path: str) -> Dict:
             "primary_percentage": 0.0,
             "length_seconds": 0.0,
             "frame_interval": 1.0,
+            "batch_size": batch_size,
             "error": str(e)
         }
 
@@ -143,27 +531,15 @@ def analyze_video_with_gemini(
     age: Optional[str],
     diet: Optional[str],
     health_conditions: Optional[str]
-) -> Dict[str, float]:
+) -> Optional[Dict[str, float]]:
     """
     Analyze video directly with Gemini Vision API to get behavior percentages.
     
     Returns:
-        Dictionary with behavior percentages from Gemini
+        Dictionary with behavior percentages from Gemini, or None if the
+        analysis failed (callers must not treat a failure as percentages)
     """
     try:
-        gemini_key = os.getenv("GEMINI_API_KEY")
-        if not gemini_key:
-            raise ValueError("GEMINI_API_KEY not set")
-        
-        genai.configure(api_key=gemini_key)
-        model = genai.GenerativeModel('models/gemini-2.0-flash')
-        
-        # Read video file
-        import base64
-        with open(video_path, 'rb') as video_file:
-            video_data = video_file.read()
-            video_base64 = base64.b64encode(video_data).decode('utf-8')
-        
         # Create prompt for Gemini
         prompt = f"""You are analyzing a pig behavior video. Watch the video and estimate what percentage of time the pig spends in each of these 6 behaviors. The percentages must sum to 100%.
 
@@ -193,40 +569,17 @@ Respond ONLY with a JSON object in this exact format:
 
 The percentages must sum to 1.0 (100%)."""
         
-        # Send video to Gemini
-        import mimetypes
-        mime_type, _ = mimetypes.guess_type(video_path)
-        if not mime_type:
-            mime_type = 'video/mp4'
-        
         # For video, we need to use file upload or send frames
         # Gemini 2.0 supports video, but we'll use a workaround with video file
         try:
             # Try direct video upload
-            import pathlib
-            video_file = genai.upload_file(path=video_path)
-            
-            response = model.generate_content([
-                prompt,
-                video_file
-            ])
-            
-            genai.delete_file(video_file.name)
+            response_text = ai_clients.generate_with_video(prompt, video_path)
         except Exception as e:
-            logger.warning(f"Direct video upload failed: {e}, trying alternative method")
-            # Alternative: Extract key frames and send as images
-            # For now, return placeholder
-            return {
-                "tail_biting": 0.0,
-                "ear_biting": 0.0,
-                "aggression": 0.0,
-                "eating": 0.0,
-                "sleeping": 0.0,
-                "rooting": 1.0
-            }
+            logger.warning(f"Direct video upload failed: {e}")
+            # Alternative (not implemented yet): extract key frames and send as images
+            return None
         
         # Parse response
-        response_text = response.text.strip()
         import json
         import re
         
@@ -242,15 +595,7 @@ The percentages must sum to 1.0 (100%)."""
         
     except Exception as e:
         logger.error(f"Error analyzing video with Gemini: {e}", exc_info=True)
-        # Return placeholder on error
-        return {
-            "tail_biting": 0.0,
-            "ear_biting": 0.0,
-            "aggression": 0.0,
-            "eating": 0.0,
-            "sleeping": 0.0,
-            "rooting": 1.0
-        }
+        return None
 
 
 def combine_behavior_percentages(
@@ -300,6 +645,53 @@ def combine_behavior_percentages(
     return combined
 
 
+class UnparseableAssessmentError(ValueError):
+    """The LLM answered, but not with the requested JSON."""
+    
+    def __init__(self, response_text: str):
+        super().__init__("AI response is not valid JSON")
+        self.response_text = response_text
+
+
+def health_assessment_cache_key(
+    species: str,
+    age: Optional[str],
+    diet: Optional[str],
+    health_conditions: Optional[str],
+    behavior_percentages: Dict[str, float],
+    length_seconds: float,
+    use_gemini: bool
+) -> tuple:
+    """
+    Normalize health assessment inputs into a cache key.
+    
+    Text fields are case- and whitespace-normalized, behavior percentages
+    are rounded to LLM_CACHE_PRECISION decimals and the duration to
+    LLM_CACHE_DURATION_STEP seconds, so near-identical requests share one
+    assessment.
+    """
+    def normalize(value: Optional[str]) -> str:
+        return " ".join((value or "").lower().split())
+    
+    percentages = tuple(sorted(
+        (behavior, round(percentage, LLM_CACHE_PRECISION))
+        for behavior, percentage in behavior_percentages.items()
+    ))
+    duration = length_seconds
+    if LLM_CACHE_DURATION_STEP > 0:
+        duration = round(length_seconds / LLM_CACHE_DURATION_STEP) * LLM_CACHE_DURATION_STEP
+    
+    return (
+        "gemini" if use_gemini else "openai",
+        normalize(species),
+        normalize(age),
+        normalize(diet),
+        normalize(health_conditions),
+        percentages,
+        duration
+    )
+
+
 def determine_health_with_ai(
     species: str,
     age: Optional[str],
@@ -307,11 +699,16 @@ def determine_health_with_ai(
     health_conditions: Optional[str],
     behavior_percentages: Dict[str, float],
     length_seconds: float,
-    use_gemini: bool = False
+    use_gemini: bool = False,
+    key_percentages: Optional[Dict[str, float]] = None
 ) -> Dict:
     """
     Use OpenAI or Gemini API to determine if animal is healthy based on behavior percentages and parameters.
     
+    Successful assessments are memoized on normalized inputs (see
+    health_assessment_cache_key) for LLM_CACHE_TTL seconds. Failed calls
+    and unparseable responses are not cached.
+    
     Args:
         species: Animal species
         age: Animal age
@@ -320,6 +717,9 @@ def determine_health_with_ai(
         behavior_percentages: Dictionary with time percentages for each behavior
         length_seconds: Video duration in seconds
         use_gemini: If True, use Gemini instead of OpenAI
+        key_percentages: Percentages to key the cache on instead of
+                         behavior_percentages, e.g. the inputs before
+                         random noise was added
         
     Returns:
         Dictionary with health assessment
@@ -342,18 +742,71 @@ def determine_health_with_ai(
                 "recommendations": "Please configure OpenAI API key"
             }
     
+    # Identical (normalized) requests share one cached or in-flight LLM call
+    cache_key = health_assessment_cache_key(
+        species, age, diet, health_conditions, key_percentages or behavior_percentages, length_seconds, use_gemini
+    )
+    
     try:
-        # Build context for AI
-        length_minutes = length_seconds / 60.0
+        return llm_cache.get_or_compute(cache_key, lambda: request_health_assessment(
+            species=species,
+            age=age,
+            diet=diet,
+            health_conditions=health_conditions,
+            behavior_percentages=behavior_percentages,
+            length_seconds=length_seconds,
+            use_gemini=use_gemini
+        ))
         
-        # Format behavior percentages
-        behavior_summary = "\n".join([
-            f"- {behavior.capitalize()}: {percentage:.1%} of video time"
-            for behavior, percentage in behavior_percentages.items()
-        ])
+    except UnparseableAssessmentError as e:
+        # Fallback if JSON parsing fails (built outside the cache)
+        logger.warning("Failed to parse AI response as JSON, using fallback")
+        return {
+            "is_healthy": None,
+            "reasoning": e.response_text,
+            "recommendations": "Please review the reasoning above"
+        }
+    except Exception as e:
+        logger.error(f"Error calling AI API: {e}", exc_info=True)
+        return {
+            "is_healthy": None,
+            "reasoning": f"Error assessing health: {str(e)}",
+            "recommendations": "Please check API configuration"
+        }
+
+
+def request_health_assessment(
+    species: str,
+    age: Optional[str],
+    diet: Optional[str],
+    health_conditions: Optional[str],
+    behavior_percentages: Dict[str, float],
+    length_seconds: float,
+    use_gemini: bool = False
+) -> Dict:
+    """
+    Call OpenAI or Gemini for a health assessment (uncached).
+    
+    Takes the same arguments as determine_health_with_ai.
+    
+    Returns:
+        Dictionary with health assessment
         
-        system_prompt = "You are an expert zoo veterinarian. Always respond with valid JSON only."
-        user_prompt = f"""You are an expert zoo veterinarian analyzing animal behavior and health.
+    Raises:
+        UnparseableAssessmentError: If the response is not valid JSON
+        Exception: If the API call fails
+    """
+    # Build context for AI
+    length_minutes = length_seconds / 60.0
+    
+    # Format behavior percentages
+    behavior_summary = "\n".join([
+        f"- {behavior.capitalize()}: {percentage:.1%} of video time"
+        for behavior, percentage in behavior_percentages.items()
+    ])
+    
+    system_prompt = "You are an expert zoo veterinarian. Always respond with valid JSON only."
+    user_prompt = f"""You are an expert zoo veterinarian analyzing animal behavior and health.
 
 Animal Information:
 - Species: {species}
@@ -382,83 +835,292 @@ Respond in JSON format with:
     "reasoning": "Detailed explanation of your assessment based on behavior percentages",
     "recommendations": "Specific recommendations for the animal's care"
 }}"""
-        
-        import json
-        import re
-        
-        if use_gemini:
-            # Use Gemini API
-            gemini_key = os.getenv("GEMINI_API_KEY")
-            if not gemini_key:
-                raise ValueError("GEMINI_API_KEY not set in environment")
-            genai.configure(api_key=gemini_key)
-            # Use gemini-2.0-flash (fast and current) or gemini-2.5-flash
-            # Model names require 'models/' prefix
-            model = genai.GenerativeModel('models/gemini-2.0-flash')
-            
-            full_prompt = f"{system_prompt}\n\n{user_prompt}"
-            response = model.generate_content(full_prompt)
-            response_text = response.text.strip()
-            logger.info("Gemini API call successful")
-        else:
-            # Use OpenAI API
-            client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-            response = client.chat.completions.create(
-                model="gpt-4",  # or "gpt-3.5-turbo" for faster/cheaper
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.3,
-                max_tokens=500
-            )
-            response_text = response.choices[0].message.content.strip()
-        
-        # Parse response
-        # Remove markdown code blocks if present
-        response_text = re.sub(r'```json\s*', '', response_text)
-        response_text = re.sub(r'```\s*', '', response_text)
-        response_text = response_text.strip()
-        
-        try:
-            health_assessment = json.loads(response_text)
-        except json.JSONDecodeError:
-            # Fallback if JSON parsing fails
-            logger.warning("Failed to parse AI response as JSON, using fallback")
-            health_assessment = {
-                "is_healthy": None,
-                "reasoning": response_text,
-                "recommendations": "Please review the reasoning above"
-            }
-        
-        return health_assessment
-        
-    except Exception as e:
-        logger.error(f"Error calling AI API: {e}", exc_info=True)
-        return {
-            "is_healthy": None,
-            "reasoning": f"Error assessing health: {str(e)}",
-            "recommendations": "Please check API configuration"
-        }
+    
+    import json
+    import re
+    
+    if use_gemini:
+        # Use Gemini API (model set by GEMINI_MODEL, default gemini-2.0-flash)
+        full_prompt = f"{system_prompt}\n\n{user_prompt}"
+        response_text = ai_clients.generate(full_prompt)
+        logger.info("Gemini API call successful")
+    else:
+        # Use OpenAI API (model set by OPENAI_MODEL, default gpt-4)
+        response_text = ai_clients.chat(
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=0.3,
+            max_tokens=500
+        )
+    
+    # Parse response
+    # Remove markdown code blocks if present
+    response_text = re.sub(r'```json\s*', '', response_text)
+    response_text = re.sub(r'```\s*', '', response_text)
+    response_text = response_text.strip()
+    
+    try:
+        return json.loads(response_text)
+    except json.JSONDecodeError:
+        # Raise so the memo cache does not keep the unparseable response
+        raise UnparseableAssessmentError(response_text)
+
+
+@app.before_request
+def require_ready():
+    """Refuse analyses until warmup has finished (before the body is read)."""
+    if request.endpoint in ("analyze_animal", "analyze_batch", "analyze_stream") and not readiness["ready"]:
+        response = jsonify({"error": "Server is warming up. Try again shortly."})
+        response.headers["Retry-After"] = "5"
+        return response, 503
+
+
+@app.route("/ready", methods=["GET"])
+def readiness_check():
+    """
+    Readiness probe for load balancers.
+    
+    Returns 200 once the model is loaded and warmed, 503 before that or if
+    warmup failed. Includes warmup timings per batch size.
+    """
+    return jsonify(readiness), 200 if readiness["ready"] else 503
 
 
 @app.route("/health", methods=["GET"])
 def health_check():
-    """Health check endpoint."""
+    """Liveness check endpoint (see /ready for readiness)."""
     return jsonify({
         "status": "healthy",
         "yolo_classifier": yolo_classifier is not None and yolo_classifier.model is not None,
-        "yolo_model_path": os.getenv("YOLO_MODEL_PATH", "Not set"),
+        "yolo_model_path": yolo_model_path or "Not set",
+        "model_version": yolo_classifier.model_version if yolo_classifier is not None else None,
+        "yolo_engine": yolo_classifier.engine if yolo_classifier is not None else None,
         "openai_available": OPENAI_AVAILABLE,
-        "gemini_available": GEMINI_AVAILABLE
+        "gemini_available": GEMINI_AVAILABLE,
+        "jobs": job_manager.stats(),
+        "result_cache": result_cache.stats() if result_cache is not None else None,
+        "llm_cache": llm_cache.stats(),
+        "ai_clients": ai_clients.stats(),
+        "inference_pool": inference_pool.stats() if inference_pool is not None else None
     })
 
 
+def _stage_time_left(started: float, timeout: float) -> float:
+    """Seconds left of a stage timeout measured from when the stages started."""
+    return max(0.0, timeout - (time.monotonic() - started))
+
+
+def release_when_done(futures: List[Future], release: Callable[[], None]):
+    """Call `release` once every future has finished, even past a timeout."""
+    remaining = len(futures)
+    lock = threading.Lock()
+    
+    def done(_):
+        nonlocal remaining
+        with lock:
+            remaining -= 1
+            if remaining:
+                return
+        try:
+            release()
+        except Exception as e:
+            logger.warning(f"Releasing stage input failed: {e}")
+    
+    if not futures:
+        release()
+        return
+    for future in futures:
+        future.add_done_callback(done)
+
+
+def run_analysis(
+    video_path: str,
+    species: str,
+    age: Optional[str],
+    diet: Optional[str],
+    health_conditions: Optional[str],
+    video_sha256: Optional[str] = None,
+    include_timeline: bool = False,
+    release_video: Optional[Callable[[], None]] = None
+) -> Dict:
+    """
+    Run the full analysis pipeline on a saved video.
+    
+    Runs on a job worker (see /analyze). A stage that times out keeps
+    running in the background, so the video is released only once every
+    stage has finished, which can be after this returns.
+    
+    Args:
+        video_path: Path to the uploaded video, shared by every stage
+        species, age, diet, health_conditions: Animal parameters
+        video_sha256: Content hash computed while the upload streamed in
+        include_timeline: Add the YOLO behavior timeline to the response
+        release_video: Removes the video; called once no stage reads it any more
+    
+    Returns:
+        Analysis response (see analyze_animal)
+        
+    Raises:
+        RuntimeError: If YOLO processing fails and there is no Gemini
+                      result to fall back to
+    """
+    logger.info(f"Processing video: {os.path.basename(video_path)} for species: {species}")
+
+    # Steps 1 and 2a are independent, so run them concurrently and wait for
+    # both; each has its own timeout and falls back to the other's result
+    use_gemini = os.getenv("USE_GEMINI", "false").lower() == "true"
+    started = time.monotonic()
+
+    # Step 1: Process video with YOLO model to get behavior percentages
+    logger.info("Step 1: Processing video with YOLO behavior classifier...")
+    yolo_future = stage_executor.submit(process_video_with_yolo, video_path, video_sha256=video_sha256)
+
+    # Step 2a: Analyze video with Gemini to get behavior percentages
+    gemini_future = None
+    if use_gemini and GEMINI_AVAILABLE:
+        logger.info("Step 2a: Analyzing video with Gemini Vision API...")
+        gemini_future = stage_executor.submit(
+            analyze_video_with_gemini,
+            video_path=video_path,
+            species=species,
+            age=age,
+            diet=diet,
+            health_conditions=health_conditions
+        )
+
+    if release_video is not None:
+        release_when_done([f for f in (yolo_future, gemini_future) if f is not None], release_video)
+
+    gemini_percentages = None
+    if gemini_future is not None:
+        try:
+            gemini_percentages = gemini_future.result(timeout=_stage_time_left(started, GEMINI_STAGE_TIMEOUT))
+            if gemini_percentages is None:
+                logger.error("Gemini video analysis failed, continuing without it")
+            else:
+                logger.info(f"Gemini behavior percentages: {gemini_percentages}")
+        except FutureTimeoutError:
+            logger.error(f"Gemini video analysis timed out after {GEMINI_STAGE_TIMEOUT:.0f}s")
+        except Exception as e:
+            logger.error(f"Gemini video analysis failed: {e}", exc_info=True)
+
+    try:
+        yolo_result = yolo_future.result(timeout=_stage_time_left(started, YOLO_STAGE_TIMEOUT))
+    except FutureTimeoutError:
+        # The worker thread cannot be interrupted; it finishes in the background
+        yolo_result = {"error": f"timed out after {YOLO_STAGE_TIMEOUT:.0f}s"}
+
+    if "error" in yolo_result:
+        if not gemini_percentages:
+            raise RuntimeError(f"Video processing failed: {yolo_result['error']}")
+        # Fall back to the Gemini percentages alone
+        logger.error(f"YOLO stage failed ({yolo_result['error']}), using Gemini percentages only")
+        yolo_result = {
+            "behavior_percentages": gemini_percentages,
+            "length_seconds": get_video_duration(video_path),
+            "inference_stats": None,
+            "model_version": None,
+            "timeline": None,
+            "cached": False
+        }
+        gemini_percentages = None
+
+    behavior_percentages = yolo_result["behavior_percentages"]
+    length_seconds = yolo_result["length_seconds"]
+
+    yolo_percentages = behavior_percentages
+    logger.info(f"YOLO behavior percentages: {yolo_percentages}")
+    logger.info(f"Video duration: {length_seconds:.2f}s")
+    logger.info(f"Analysis stages finished in {time.monotonic() - started:.2f}s")
+
+    # Step 2b: Combine YOLO and Gemini percentages (80% Gemini, 20% YOLO) with ±5% noise
+    key_percentages = None
+    if gemini_percentages:
+        # The noise differs on every call, so the health assessment cache
+        # is keyed on the two noise-free inputs
+        key_percentages = {
+            **{f"yolo:{b}": p for b, p in yolo_percentages.items()},
+            **{f"gemini:{b}": p for b, p in gemini_percentages.items()}
+        }
+        logger.info("Step 2b: Combining YOLO and Gemini percentages (80% Gemini, 20% YOLO, ±5% noise)...")
+        behavior_percentages = combine_behavior_percentages(
+            yolo_percentages=yolo_percentages,
+            gemini_percentages=gemini_percentages,
+            gemini_weight=0.8,  # 80% Gemini, 20% YOLO (heavily weighted toward Gemini)
+            noise_percent=0.05  # ±5% random noise to reduce uniformity
+        )
+        logger.info(f"Combined behavior percentages: {behavior_percentages}")
+    else:
+        # Use only YOLO if Gemini not available or failed
+        behavior_percentages = yolo_percentages
+        logger.info("Using YOLO percentages only (Gemini not available or failed)")
+
+    # Recalculate primary behavior from combined percentages
+    primary_behavior = max(behavior_percentages.items(), key=lambda x: x[1])[0]
+    primary_percentage = behavior_percentages[primary_behavior]
+
+    # Step 3: Determine health status with OpenAI/Gemini using combined behavior percentages
+    ai_provider = "Gemini" if use_gemini else "OpenAI"
+    logger.info(f"Step 3: Assessing health with {ai_provider} using combined behavior percentages...")
+    health_assessment = determine_health_with_ai(
+        species=species,
+        age=age,
+        diet=diet,
+        health_conditions=health_conditions,
+        behavior_percentages=behavior_percentages,
+        length_seconds=length_seconds,
+        use_gemini=use_gemini,
+        key_percentages=key_percentages
+    )
+
+    # Step 4: Build response
+    response = {
+        "species": species,
+        "video_sha256": video_sha256,
+        "behavior_percentages": {
+            k: round(v, 4) for k, v in behavior_percentages.items()
+        },
+        "yolo_percentages": {
+            k: round(v, 4) for k, v in yolo_percentages.items()
+        } if gemini_percentages else None,
+        "gemini_percentages": {
+            k: round(v, 4) for k, v in gemini_percentages.items()
+        } if gemini_percentages else None,
+        "primary_behavior": primary_behavior,
+        "primary_behavior_percentage": round(primary_percentage, 4),
+        "length_seconds": round(length_seconds, 2),
+        "length_minutes": round(length_seconds / 60.0, 2),
+        "model_version": yolo_result.get("model_version"),
+        "inference_stats": yolo_result["inference_stats"],
+        "yolo_cached": yolo_result["cached"],
+        "timeline": yolo_result.get("timeline") if include_timeline else None,
+        "is_healthy": health_assessment.get("is_healthy"),
+        "reasoning": health_assessment.get("reasoning", ""),
+        "recommendations": health_assessment.get("recommendations", "")
+    }
+
+    logger.info(f"Analysis complete. Health status: {response['is_healthy']}")
+
+    return response
+
+
+@app.errorhandler(RequestEntityTooLarge)
+def handle_upload_too_large(e):
+    """Reject oversized uploads; anything already written is deleted."""
+    request.discard_uploads()
+    return jsonify({"error": f"Video file too large. Max size: {MAX_VIDEO_SIZE / 1024 / 1024}MB"}), 413
+
+
 @app.route("/analyze", methods=["POST"])
 def analyze_animal():
     """
     Main endpoint to analyze animal health from video and parameters.
     
+    The analysis runs in the background; poll GET /jobs/<job_id> for the
+    result.
+    
     Expected request:
     - Form data with 'video' file
     - JSON or form data with parameters:
@@ -466,8 +1128,16 @@ def analyze_animal():
       - age: str (optional)
       - diet: str (optional)
       - health_conditions: str (optional)
+      - include_timeline: "true" to add the behavior timeline (optional)
     
-    Returns:
+    Returns (202):
+    {
+        "job_id": str,
+        "status": "queued",
+        "status_url": str
+    }
+    
+    The finished job's "result" holds:
     {
         "species": str,
         "behavior_observed": str,
@@ -475,6 +1145,7 @@ def analyze_animal():
         "is_healthy": bool,
         "reasoning": str,
         "recommendations": str,
+        "timeline": [{"start_time", "end_time", "behavior", "mean_confidence", "frames"}] or null,
         "confidence": float
     }
     """
@@ -484,18 +1155,21 @@ def analyze_animal():
     # Check for video file
     if "video" not in request.files:
         logger.error("No video file in request.files")
+        request.discard_uploads()
         return jsonify({"error": "No video file provided"}), 400
     
     video_file = request.files["video"]
     
     if video_file.filename == "":
         logger.error("Video filename is empty")
+        request.discard_uploads()
         return jsonify({"error": "No video file selected"}), 400
     
     logger.info(f"Video file: {video_file.filename}, Content-Type: {video_file.content_type}")
     
     if not allowed_file(video_file.filename):
         logger.error(f"Invalid file type: {video_file.filename}")
+        request.discard_uploads()
         return jsonify({"error": f"Invalid file type. Allowed: {', '.join(ALLOWED_EXTENSIONS)}"}), 400
     
     # Get parameters
@@ -504,146 +1178,341 @@ def analyze_animal():
     
     if not species:
         logger.error("Species parameter is missing")
+        request.discard_uploads()
         return jsonify({"error": "Species parameter is required"}), 400
     
     age = request.form.get("age") or (request.json.get("age") if request.is_json else None)
     diet = request.form.get("diet") or (request.json.get("diet") if request.is_json else None)
     health_conditions = request.form.get("health_conditions") or (request.json.get("health_conditions") if request.is_json else None)
+    include_timeline = str(
+        request.form.get("include_timeline") or (request.json.get("include_timeline") if request.is_json else "")
+    ).lower() in ("true", "1", "yes")
     
-    # Save video to temporary file
-    temp_dir = tempfile.mkdtemp()
-    video_path = os.path.join(temp_dir, video_file.filename)
+    # The video was streamed to disk and hashed while the form was parsed
+    upload = video_file.stream
+    if not isinstance(upload, StreamedUpload):
+        return jsonify({"error": "Upload was not streamed to disk"}), 500
+    request.discard_uploads(keep=upload)
+    upload.close()
+    logger.info(f"Saved video: {upload.size / 1024 / 1024:.1f}MB, sha256 {upload.sha256}")
     
     try:
-        video_file.save(video_path)
-        
-        # Check file size
-        file_size = os.path.getsize(video_path)
-        if file_size > MAX_VIDEO_SIZE:
-            return jsonify({"error": f"Video file too large. Max size: {MAX_VIDEO_SIZE / 1024 / 1024}MB"}), 400
-        
-        logger.info(f"Processing video: {video_file.filename} for species: {species}")
-        
-        # Step 1: Process video with YOLO model to get behavior percentages
-        logger.info("Step 1: Processing video with YOLO behavior classifier...")
-        yolo_result = process_video_with_yolo(video_path)
-        
-        if "error" in yolo_result:
-            return jsonify({"error": f"Video processing failed: {yolo_result['error']}"}), 500
-        
-        behavior_percentages = yolo_result["behavior_percentages"]
-        primary_behavior = yolo_result["primary_behavior"]
-        primary_percentage = yolo_result["primary_percentage"]
-        length_seconds = yolo_result["length_seconds"]
-        
-        yolo_percentages = behavior_percentages
-        logger.info(f"YOLO behavior percentages: {yolo_percentages}")
-        logger.info(f"Primary behavior: {primary_behavior} ({primary_percentage:.1%})")
-        logger.info(f"Video duration: {length_seconds:.2f}s")
-        
-        # Step 2: Analyze video with Gemini to get behavior percentages
-        use_gemini = os.getenv("USE_GEMINI", "false").lower() == "true"
-        gemini_percentages = None
-        
-        if use_gemini and GEMINI_AVAILABLE:
-            logger.info("Step 2a: Analyzing video with Gemini Vision API...")
-            try:
-                gemini_percentages = analyze_video_with_gemini(
-                    video_path=video_path,
-                    species=species,
-                    age=age,
-                    diet=diet,
-                    health_conditions=health_conditions
-                )
-                logger.info(f"Gemini behavior percentages: {gemini_percentages}")
-            except Exception as e:
-                logger.error(f"Gemini video analysis failed: {e}", exc_info=True)
-                gemini_percentages = None
-        
-        # Step 2b: Combine YOLO and Gemini percentages (80% Gemini, 20% YOLO) with ±5% noise
-        if gemini_percentages:
-            logger.info("Step 2b: Combining YOLO and Gemini percentages (80% Gemini, 20% YOLO, ±5% noise)...")
-            behavior_percentages = combine_behavior_percentages(
-                yolo_percentages=yolo_percentages,
-                gemini_percentages=gemini_percentages,
-                gemini_weight=0.8,  # 80% Gemini, 20% YOLO (heavily weighted toward Gemini)
-                noise_percent=0.05  # ±5% random noise to reduce uniformity
-            )
-            logger.info(f"Combined behavior percentages: {behavior_percentages}")
-        else:
-            # Use only YOLO if Gemini not available or failed
-            behavior_percentages = yolo_percentages
-            logger.info("Using YOLO percentages only (Gemini not available or failed)")
-        
-        # Recalculate primary behavior from combined percentages
-        primary_behavior = max(behavior_percentages.items(), key=lambda x: x[1])[0]
-        primary_percentage = behavior_percentages[primary_behavior]
-        
-        # Step 3: Determine health status with OpenAI/Gemini using combined behavior percentages
-        ai_provider = "Gemini" if use_gemini else "OpenAI"
-        logger.info(f"Step 3: Assessing health with {ai_provider} using combined behavior percentages...")
-        health_assessment = determine_health_with_ai(
+        job_id = job_manager.submit(
+            run_analysis,
+            video_path=upload.path,
             species=species,
             age=age,
             diet=diet,
             health_conditions=health_conditions,
-            behavior_percentages=behavior_percentages,
-            length_seconds=length_seconds,
-            use_gemini=use_gemini
+            video_sha256=upload.sha256,
+            include_timeline=include_timeline,
+            # Not the job's cleanup: a timed-out stage may still be reading the file
+            release_video=lambda: remove_upload_dir(upload.temp_dir)
         )
         
-        # Step 4: Build response
-        response = {
-            "species": species,
-            "behavior_percentages": {
-                k: round(v, 4) for k, v in behavior_percentages.items()
-            },
-            "yolo_percentages": {
-                k: round(v, 4) for k, v in yolo_percentages.items()
-            } if gemini_percentages else None,
-            "gemini_percentages": {
-                k: round(v, 4) for k, v in gemini_percentages.items()
-            } if gemini_percentages else None,
-            "primary_behavior": primary_behavior,
-            "primary_behavior_percentage": round(primary_percentage, 4),
-            "length_seconds": round(length_seconds, 2),
-            "length_minutes": round(length_seconds / 60.0, 2),
-            "is_healthy": health_assessment.get("is_healthy"),
-            "reasoning": health_assessment.get("reasoning", ""),
-            "recommendations": health_assessment.get("recommendations", "")
-        }
-        
-        logger.info(f"Analysis complete. Health status: {response['is_healthy']}")
-        
-        return jsonify(response), 200
+    except QueueFullError as e:
+        upload.discard()
+        logger.warning(f"Rejecting analyze request: {e}")
+        return jsonify({"error": "Server is busy. Please try again later."}), 503, {"Retry-After": "30"}
         
     except Exception as e:
+        upload.discard()
         logger.error(f"Error in analyze endpoint: {e}", exc_info=True)
         return jsonify({"error": f"Internal server error: {str(e)}"}), 500
-        
-    finally:
-        # Clean up temporary files
-        try:
-            if os.path.exists(video_path):
-                os.remove(video_path)
-            if os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir)
-        except Exception as e:
-            logger.warning(f"Error cleaning up temp files: {e}")
+    
+    logger.info(f"Queued analysis job {job_id} for {video_file.filename}")
+    status_url = f"/jobs/{job_id}"
+    return jsonify({"job_id": job_id, "status": "queued", "status_url": status_url}), 202, {"Location": status_url}
+
+
+def sse_event(event: str, data: Dict) -> str:
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.route("/analyze/stream", methods=["GET", "POST"])
+def analyze_stream():
+    """
+    Analyze a video incrementally, streaming partial results as Server-Sent Events.
+    
+    Expected request, either:
+    - POST form data with a 'video' file
+    - GET ?path=... with a video path relative to BATCH_ALLOWED_ROOT
+      (usable from a browser EventSource)
+    Optional 'window_seconds' (form or query): video seconds per update
+    
+    Returns:
+        text/event-stream with:
+        - "window" events: window_start, window_end, window_percentages,
+          running_percentages, progress and counts so far
+        - a final "result" event with the YOLO result (see process_video_with_yolo)
+        - an "error" event if the analysis fails
+        Disconnecting stops the analysis.
+    """
+    upload = None
+    if request.method == "POST":
+        video_file = request.files.get("video")
+        if video_file is None or not allowed_file(video_file.filename):
+            request.discard_uploads()
+            return jsonify({"error": f"Send a 'video' file. Allowed: {', '.join(ALLOWED_EXTENSIONS)}"}), 400
+        upload = video_file.stream
+        request.discard_uploads(keep=upload)
+        upload.close()
+        video_path, video_sha256 = upload.path, upload.sha256
+    else:
+        if not BATCH_ALLOWED_ROOT:
+            return jsonify({"error": "Server-side paths are disabled (BATCH_ALLOWED_ROOT not set)"}), 403
+        video_path = resolve_batch_path(request.args.get("path", ""))
+        if video_path is None:
+            return jsonify({"error": f"Invalid video path: {request.args.get('path')}"}), 400
+        video_sha256 = None
+    
+    try:
+        window_seconds = float(request.values.get("window_seconds", STREAM_WINDOW_SECONDS))
+    except ValueError:
+        window_seconds = 0
+    if window_seconds <= 0:
+        if upload is not None:
+            upload.discard()
+        return jsonify({"error": "window_seconds must be a positive number"}), 400
+    
+    if not stream_slots.acquire(blocking=False):
+        if upload is not None:
+            upload.discard()
+        return jsonify({"error": "Too many streaming analyses. Please try again later."}), 503, {"Retry-After": "30"}
+    
+    batch_size = YOLO_BATCH_SIZE
+    
+    def generate():
+        with current_model(use_pool=False) as (classifier, _):
+            cache_key = yolo_cache_key(classifier, video_sha256)
+            started = time.monotonic()
+            try:
+                for update in classifier.iter_video_analysis(
+                    video_path,
+                    window_seconds=window_seconds,
+                    **yolo_analysis_options(batch_size)
+                ):
+                    if not update["done"]:
+                        yield sse_event("window", update)
+                        continue
+                    
+                    update["inference_seconds"] = time.monotonic() - started
+                    result = build_yolo_result(classifier, update, batch_size)
+                    if cache_key is not None and is_cacheable_analysis(update):
+                        result_cache.put(cache_key, result)
+                    yield sse_event("result", result)
+            except Exception as e:
+                logger.error(f"Streaming analysis failed: {e}", exc_info=True)
+                yield sse_event("error", {"error": str(e)})
+    
+    def cleanup():
+        stream_slots.release()
+        if upload is not None:
+            upload.discard()
+    
+    response = Response(generate(), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"  # Don't let proxies hold back events
+    # Runs once the stream ends or the client disconnects
+    response.call_on_close(cleanup)
+    return response
+
+
+@app.route("/admin/reload-model", methods=["POST"])
+def admin_reload_model():
+    """
+    Hot-swap the YOLO model without restarting.
+    
+    Expected request:
+    - Header 'X-Admin-Token' matching ADMIN_TOKEN
+    - Optional JSON {"model_path": "...", "engine": "..."}; defaults to
+      reloading the current model path (e.g. after it was overwritten)
+    
+    Returns:
+        Old and new model versions; 409 if a reload is already running,
+        422 if the new model fails to load (the old one keeps serving)
+    """
+    if not ADMIN_TOKEN:
+        return jsonify({"error": "Admin endpoints are disabled (ADMIN_TOKEN not set)"}), 403
+    if not hmac.compare_digest(request.headers.get("X-Admin-Token", ""), ADMIN_TOKEN):
+        return jsonify({"error": "Invalid admin token"}), 401
+    
+    body = request.get_json(silent=True) or {}
+    model_path = body.get("model_path") or yolo_model_path
+    engine = body.get("engine") or (yolo_engine if model_path == yolo_model_path else None)
+    if not model_path or not os.path.exists(model_path):
+        return jsonify({"error": f"Model not found: {model_path}"}), 400
+    
+    try:
+        return jsonify(reload_model(model_path, engine)), 200
+    except ReloadInProgressError as e:
+        return jsonify({"error": str(e)}), 409
+    except Exception as e:
+        logger.error(f"Model reload failed: {e}", exc_info=True)
+        return jsonify({"error": f"Model reload failed: {e}"}), 422
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id: str):
+    """
+    Get the status of an analysis job.
+    
+    Returns:
+    {
+        "job_id": str,
+        "status": "queued" | "running" | "succeeded" | "failed",
+        "created_at": str,
+        "started_at": str | null,
+        "finished_at": str | null,
+        "result": dict | null,   # analysis response once succeeded
+        "error": str | null      # failure reason once failed
+    }
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job), 200
+
+
+def resolve_batch_path(path: str) -> Optional[str]:
+    """
+    Resolve a client-supplied server-side path inside BATCH_ALLOWED_ROOT.
+    
+    Returns:
+        Absolute path, or None if it is outside the root or not a video file
+    """
+    root = os.path.realpath(BATCH_ALLOWED_ROOT)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        return None
+    if not os.path.isfile(resolved) or not allowed_file(resolved):
+        return None
+    return resolved
 
 
 @app.route("/analyze/batch", methods=["POST"])
 def analyze_batch():
     """
-    Analyze multiple videos in batch.
+    Analyze multiple videos in parallel on the inference worker pool.
     
-    Expected request:
-    - JSON with array of analysis requests
-    - Each request should have video file path and parameters
+    Each worker process loads the YOLO model once; at most
+    BATCH_MAX_IN_FLIGHT videos are queued on the pool at a time.
+    
+    Expected request, either:
+    - Form data with one or more 'videos' files
+    - JSON {"paths": [...]} (or repeated 'paths' form fields) with video
+      paths relative to BATCH_ALLOWED_ROOT on the server
     
-    Note: This is a placeholder for future batch processing.
+    Returns:
+        Newline-delimited JSON streamed as videos finish, one line per video:
+        {"index", "video", "status": "succeeded"/"failed", "result"/"error", "seconds"}
+        followed by {"done": true, "succeeded", "failed", "elapsed_seconds"}.
+        400 for invalid requests (e.g. 'paths' not a list), 503 if the
+        inference workers cannot be started.
     """
-    return jsonify({"error": "Batch processing not yet implemented"}), 501
+    uploads = request.files.getlist("videos")
+    body = request.get_json(silent=True)
+    paths = body.get("paths") if isinstance(body, dict) else None
+    if paths is None:
+        paths = request.form.getlist("paths")
+    
+    # Drop files sent under any other field name
+    used_uploads = [f.stream for f in uploads]
+    for upload in request.streamed_uploads:
+        if upload not in used_uploads:
+            upload.discard()
+    
+    def reject(message: str, status: int):
+        for upload in used_uploads:
+            upload.discard()
+        return jsonify({"error": message}), status
+    
+    if not isinstance(paths, list):
+        return reject("'paths' must be a list of video paths", 400)
+    if not uploads and not paths:
+        return reject("No videos provided. Send 'videos' files or a 'paths' list", 400)
+    if len(uploads) + len(paths) > BATCH_MAX_VIDEOS:
+        return reject(f"Too many videos. Max per batch: {BATCH_MAX_VIDEOS}", 400)
+    if paths and not BATCH_ALLOWED_ROOT:
+        return reject("Server-side paths are disabled (BATCH_ALLOWED_ROOT not set)", 403)
+    
+    # (index, display name, path on disk, content hash)
+    items = []
+    for video_file in uploads:
+        if not allowed_file(video_file.filename):
+            return reject(f"Invalid file type: {video_file.filename}. Allowed: {', '.join(ALLOWED_EXTENSIONS)}", 400)
+        upload = video_file.stream
+        upload.close()
+        items.append((len(items), video_file.filename, upload.path, upload.sha256))
+    for path in paths:
+        resolved = resolve_batch_path(str(path))
+        if resolved is None:
+            return reject(f"Invalid video path: {path}", 400)
+        items.append((len(items), path, resolved, None))
+    
+    batch_size = YOLO_BATCH_SIZE
+    
+    # The whole batch runs on the model that was active when it started.
+    # Pin it (starting the workers if needed) before the response is sent,
+    # so a failed start is still reported with a status code.
+    pinned = ExitStack()
+    try:
+        classifier, pool = pinned.enter_context(current_model(use_pool=True))
+    except Exception as e:
+        logger.error(f"Inference pool unavailable for batch: {e}", exc_info=True)
+        response, status = reject("Inference workers are unavailable. Please try again later.", 503)
+        return response, status, {"Retry-After": "30"}
+    
+    def line(payload: Dict) -> str:
+        return json.dumps(payload) + "\n"
+    
+    def generate():
+        started = time.monotonic()
+        counts = {"succeeded": 0, "failed": 0}
+        # Serve cached results straight away
+        to_run = []
+        for index, name, path, sha256 in items:
+            cache_key = yolo_cache_key(classifier, sha256)
+            cached = result_cache.get(cache_key) if cache_key is not None else None
+            if cached is not None:
+                cached["cached"] = True
+                counts["succeeded"] += 1
+                yield line({"index": index, "video": name, "status": "succeeded", "result": cached, "seconds": 0.0})
+            else:
+                to_run.append(((index, name, cache_key), path))
+        
+        results = pool.imap_unordered(
+            to_run,
+            max_in_flight=BATCH_MAX_IN_FLIGHT or None,
+            **yolo_analysis_options(batch_size)
+        )
+        for (index, name, cache_key), analysis, error, seconds in results:
+            if error is not None:
+                logger.error(f"Batch video {name} failed: {error}")
+                counts["failed"] += 1
+                yield line({"index": index, "video": name, "status": "failed", "error": str(error), "seconds": round(seconds, 2)})
+                continue
+            
+            result = build_yolo_result(classifier, analysis, batch_size)
+            if cache_key is not None and is_cacheable_analysis(analysis):
+                result_cache.put(cache_key, result)
+            counts["succeeded"] += 1
+            yield line({"index": index, "video": name, "status": "succeeded", "result": result, "seconds": round(seconds, 2)})
+        
+        yield line({"done": True, **counts, "elapsed_seconds": round(time.monotonic() - started, 2)})
+    
+    logger.info(f"Batch analysis of {len(items)} videos")
+    def cleanup():
+        # Release the pinned model even if the stream never started
+        pinned.close()
+        for upload in used_uploads:
+            upload.discard()
+    
+    response = Response(generate(), mimetype="application/x-ndjson")
+    # Runs once the stream ends or the client disconnects
+    response.call_on_close(cleanup)
+    return response
 
 
 if __name__ == "__main__":
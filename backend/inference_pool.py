@@ -0,0 +1,315 @@
+"""
+Inference worker pool for FaunaVision
+Runs YOLO video analysis in separate processes so CPU-bound inference
+does not serialize on the GIL. Each worker loads the model once, when it
+starts.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import logging
+
+from src.yolo_behavior_classifier import YOLOBehaviorClassifier
+
+logger = logging.getLogger(__name__)
+
+# Classifier owned by the current worker process, its warmup timings and
+# the pool's start barrier (set by _init_worker)
+_worker_classifier = None
+_worker_warmup = {}
+_worker_barrier = None
+
+
+def _init_worker(
+    model_path: Optional[str],
+    engine: Optional[str],
+    threads: int,
+    warmup_batch_sizes: Tuple[int, ...],
+    warmup_iterations: int,
+    barrier=None
+):
+    """Load and warm the model once per worker process."""
+    global _worker_classifier, _worker_warmup, _worker_barrier
+    _worker_barrier = barrier
+
+    # Keep workers from oversubscribing the cores with their own thread pools;
+    # the engine caps its own (torch is only imported for ultralytics models)
+    try:
+        import cv2
+        cv2.setNumThreads(threads)
+    except ImportError:
+        pass
+
+    _worker_classifier = YOLOBehaviorClassifier(model_path=model_path, engine=engine, num_threads=threads)
+    _worker_warmup = _worker_classifier.warmup(warmup_batch_sizes, warmup_iterations)
+    logger.info(f"Inference worker {os.getpid()} ready (model version {_worker_classifier.model_version})")
+
+
+def _analyze(video_path: str, options: Dict) -> Dict:
+    """
+    Run YOLOBehaviorClassifier.analyze_video in a worker.
+    
+    Raises:
+        RuntimeError: If the analysis failed, so the future reports the
+                      error instead of the placeholder result
+    """
+    started = time.monotonic()
+    analysis = _worker_classifier.analyze_video(video_path, **options)
+    if "error" in analysis:
+        raise RuntimeError(analysis["error"])
+    analysis["inference_seconds"] = time.monotonic() - started
+    return analysis
+
+
+def _worker_info(barrier_timeout: Optional[float] = None, wait: bool = False) -> Dict:
+    """
+    Report a worker's identity; used to start and check workers.
+    
+    With wait, block on the pool's start barrier until every worker holds a
+    ping, so no worker can answer more than one of them.
+    """
+    if wait:
+        _worker_barrier.wait(barrier_timeout)
+    return {
+        "pid": os.getpid(),
+        "model_version": _worker_classifier.model_version,
+        "warmup": _worker_warmup
+    }
+
+
+def _pool_context():
+    """
+    Start workers from a clean fork server where available, so they do not
+    inherit the parent's threads or re-run the Flask app module.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+class InferencePool:
+    """
+    Pool of processes that each hold a loaded YOLOBehaviorClassifier.
+
+    The app sizes the pool to its concurrent analyses: one worker per
+    analysis (INFERENCE_WORKERS, default JOB_WORKERS), each with the cores
+    divided between the workers as intra-op threads
+    (INFERENCE_THREADS_PER_WORKER, default cores / workers), so a single
+    analysis still uses the whole machine. `imap_unordered` keeps at most
+    `max_in_flight` videos submitted at once, which bounds the memory held
+    by queued work. `stats()` reports queue depth and throughput.
+    """
+
+    def __init__(
+        self,
+        model_path: Optional[str],
+        engine: Optional[str] = None,
+        workers: Optional[int] = None,
+        threads_per_worker: int = 1,
+        warmup_batch_sizes: Iterable[int] = (),
+        warmup_iterations: int = 2
+    ):
+        """
+        Initialize inference pool.
+
+        Args:
+            model_path: Model loaded by every worker
+            engine: Inference engine (see YOLOBehaviorClassifier)
+            workers: Number of worker processes (the app passes
+                     INFERENCE_WORKERS; default here: CPU count)
+            threads_per_worker: Intra-op threads per worker; workers x
+                                threads_per_worker should match the cores
+            warmup_batch_sizes: Batch sizes each worker warms after loading
+            warmup_iterations: Dummy inferences per warmup batch size
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.threads_per_worker = threads_per_worker
+        context = _pool_context()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(model_path, engine, threads_per_worker, tuple(warmup_batch_sizes), warmup_iterations,
+                      context.Barrier(self.workers))
+        )
+        logger.info(f"Inference pool: {self.workers} workers x {threads_per_worker} threads")
+
+        self.worker_info = []
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.frames_classified = 0
+        self.inference_seconds = 0.0
+        self._stats_lock = threading.Lock()
+
+        # Callers holding the pool (see acquire); a retired pool shuts down
+        # once the last one lets go
+        self._users = 0
+        self._users_changed = threading.Condition()
+
+    def start(self, timeout: Optional[float] = None) -> List[Dict]:
+        """
+        Start every worker and wait until each has loaded and warmed the model.
+
+        One ping is sent per worker and each ping blocks on a barrier until
+        all of them are held, so every worker must have initialized before
+        any answers.
+
+        Args:
+            timeout: Seconds to wait for the workers
+
+        Returns:
+            Info (pid, model version, warmup timings) of each worker; also
+            kept in `worker_info`
+
+        Raises:
+            RuntimeError: If fewer distinct workers answered than started
+        """
+        futures = [self._executor.submit(_worker_info, timeout, True) for _ in range(self.workers)]
+        workers = {}
+        for future in futures:
+            info = future.result(timeout=timeout)
+            workers[info["pid"]] = info
+        if len(workers) < self.workers:
+            raise RuntimeError(f"Only {len(workers)} of {self.workers} inference workers answered")
+        logger.info(f"Inference pool started: {len(workers)} workers ready")
+        self.worker_info = list(workers.values())
+        return self.worker_info
+
+    def acquire(self):
+        """Register a caller that will submit work; pair with release()."""
+        with self._users_changed:
+            self._users += 1
+
+    def release(self):
+        with self._users_changed:
+            self._users -= 1
+            self._users_changed.notify_all()
+
+    def retire(self):
+        """
+        Shut the pool down in the background once every caller has
+        released it and its queued work has finished.
+        """
+        def drain():
+            with self._users_changed:
+                self._users_changed.wait_for(lambda: self._users == 0)
+            self._executor.shutdown(wait=True)
+            logger.info("Retired inference pool shut down")
+
+        threading.Thread(target=drain, name="inference-pool-retire", daemon=True).start()
+
+    @property
+    def in_flight(self) -> int:
+        """Videos submitted and not yet finished."""
+        with self._stats_lock:
+            return self.submitted - self.completed - self.failed
+
+    @property
+    def queue_depth(self) -> int:
+        """Videos waiting for a free worker."""
+        return max(0, self.in_flight - self.workers)
+
+    def _record(self, future: Future):
+        with self._stats_lock:
+            if future.cancelled() or future.exception() is not None:
+                self.failed += 1
+                return
+            analysis = future.result()
+            self.completed += 1
+            self.frames_classified += analysis["frames_classified"]
+            self.inference_seconds += analysis["inference_seconds"]
+
+    def submit(self, video_path: str, **options) -> Future:
+        """
+        Analyze one video in a worker.
+
+        Args:
+            video_path: Path to video file
+            **options: Arguments for YOLOBehaviorClassifier.analyze_video
+
+        Returns:
+            Future resolving to the analyze_video result, plus
+            "inference_seconds" spent in the worker
+        """
+        with self._stats_lock:
+            self.submitted += 1
+        future = self._executor.submit(_analyze, video_path, options)
+        future.add_done_callback(self._record)
+        return future
+
+    def imap_unordered(
+        self,
+        items: Iterable[Tuple[object, str]],
+        max_in_flight: Optional[int] = None,
+        **options
+    ) -> Iterator[Tuple[object, Optional[Dict], Optional[BaseException], float]]:
+        """
+        Analyze many videos, yielding results as they finish.
+
+        Args:
+            items: (tag, video_path) pairs; the tag is passed back with the result
+            max_in_flight: Maximum videos submitted at once (default: 2 per worker)
+            **options: Arguments for YOLOBehaviorClassifier.analyze_video
+
+        Yields:
+            (tag, result, error, seconds) for each video; exactly one of
+            result and error is set
+        """
+        max_in_flight = max_in_flight or self.workers * 2
+        items = iter(items)
+        pending = {}  # Future -> (tag, submitted_at)
+
+        def fill():
+            while len(pending) < max_in_flight:
+                try:
+                    tag, video_path = next(items)
+                except StopIteration:
+                    return
+                pending[self.submit(video_path, **options)] = (tag, time.monotonic())
+
+        try:
+            fill()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    tag, submitted_at = pending.pop(future)
+                    elapsed = time.monotonic() - submitted_at
+                    try:
+                        result, error = future.result(), None
+                    except Exception as e:
+                        result, error = None, e
+                    yield tag, result, error, elapsed
+                fill()
+        finally:
+            # Consumer went away (e.g. client disconnected): drop queued work
+            for future in pending:
+                future.cancel()
+
+    def stats(self) -> Dict:
+        """Queue depth and throughput counters."""
+        with self._stats_lock:
+            in_flight = self.submitted - self.completed - self.failed
+            return {
+                "workers": self.workers,
+                "threads_per_worker": self.threads_per_worker,
+                "in_flight": in_flight,
+                "queue_depth": max(0, in_flight - self.workers),
+                "completed": self.completed,
+                "failed": self.failed,
+                "frames_classified": self.frames_classified,
+                # Per-worker rate; multiply by busy workers for total throughput
+                "frames_per_second": (
+                    self.frames_classified / self.inference_seconds if self.inference_seconds else 0.0
+                )
+            }
+
+    def shutdown(self, wait: bool = True):
+        """Stop the worker processes."""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
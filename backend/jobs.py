@@ -0,0 +1,144 @@
+"""
+Background job queue for FaunaVision
+Runs long analyses on a bounded worker pool so HTTP requests can return
+a job ID immediately and clients poll for the result.
+"""
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue already holds the maximum number of waiting jobs."""
+
+
+class JobManager:
+    """
+    Bounded pool of worker threads with job status tracking.
+
+    Jobs are kept in memory; finished jobs are forgotten after
+    `retention_seconds`.
+    """
+
+    def __init__(self, max_workers: int = 2, max_queued: int = 20, retention_seconds: float = 3600):
+        """
+        Initialize job manager.
+
+        Args:
+            max_workers: Jobs run concurrently
+            max_queued: Jobs allowed to wait for a worker; further
+                        submissions raise QueueFullError
+            retention_seconds: How long finished jobs stay available
+        """
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.retention_seconds = retention_seconds
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, func: Callable, *args, cleanup: Optional[Callable] = None, **kwargs) -> str:
+        """
+        Queue a job.
+
+        Args:
+            func: Function to run; its return value becomes the job result
+            *args, **kwargs: Arguments for func
+            cleanup: Optional function called after the job finishes,
+                     whether it succeeded or not
+
+        Returns:
+            Job ID
+
+        Raises:
+            QueueFullError: If max_queued jobs are already waiting
+        """
+        with self._lock:
+            self._expire_finished()
+            queued = sum(1 for job in self._jobs.values() if job["status"] == QUEUED)
+            if queued >= self.max_queued:
+                raise QueueFullError(f"Job queue is full ({queued} jobs waiting)")
+
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "status": QUEUED,
+                "created_at": datetime.now().isoformat(),
+                "started_at": None,
+                "finished_at": None,
+                "result": None,
+                "error": None,
+                "_finished": None  # monotonic finish time, used for expiry
+            }
+
+        self._executor.submit(self._run, job_id, func, args, kwargs, cleanup)
+        return job_id
+
+    def _run(self, job_id: str, func: Callable, args, kwargs, cleanup: Optional[Callable]):
+        self._update(job_id, status=RUNNING, started_at=datetime.now().isoformat())
+        try:
+            result = func(*args, **kwargs)
+            self._update(job_id, status=SUCCEEDED, result=result)
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}", exc_info=True)
+            self._update(job_id, status=FAILED, error=str(e))
+        finally:
+            self._update(job_id, finished_at=datetime.now().isoformat(), _finished=time.monotonic())
+            if cleanup is not None:
+                try:
+                    cleanup()
+                except Exception as e:
+                    logger.warning(f"Cleanup for job {job_id} failed: {e}")
+
+    def _update(self, job_id: str, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def _expire_finished(self):
+        """Drop finished jobs past their retention time. Caller holds the lock."""
+        cutoff = time.monotonic() - self.retention_seconds
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job["_finished"] is not None and job["_finished"] < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """
+        Get a job's status.
+
+        Returns:
+            Copy of the job record, or None if unknown or expired
+        """
+        with self._lock:
+            self._expire_finished()
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            return {k: v for k, v in job.items() if not k.startswith("_")}
+
+    def stats(self) -> Dict[str, int]:
+        """Count jobs by state."""
+        with self._lock:
+            counts = {QUEUED: 0, RUNNING: 0, SUCCEEDED: 0, FAILED: 0}
+            for job in self._jobs.values():
+                counts[job["status"]] += 1
+        counts["max_workers"] = self.max_workers
+        counts["max_queued"] = self.max_queued
+        return counts
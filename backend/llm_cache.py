@@ -0,0 +1,109 @@
+"""
+Memoization for LLM calls in FaunaVision
+In-memory TTL + LRU cache that also coalesces concurrent identical
+requests into a single in-flight call.
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class MemoCache:
+    """
+    Thread-safe memoization with expiry, a size bound and request coalescing.
+
+    Only successful results are cached. If the computation raises, the
+    exception is passed to every caller waiting on it and nothing is stored.
+    """
+
+    def __init__(self, ttl_seconds: float = 3600, max_entries: int = 1024):
+        """
+        Initialize memo cache.
+
+        Args:
+            ttl_seconds: How long a result stays valid
+            max_entries: Maximum cached results; least recently used are
+                         dropped first
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._in_flight = {}  # key -> Future
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Return the cached value for key, computing it at most once.
+
+        Args:
+            key: Hashable cache key
+            compute: Zero-argument function producing the value
+
+        Returns:
+            A copy of the cached or freshly computed value
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return copy.deepcopy(value)
+                del self._entries[key]
+
+            future = self._in_flight.get(key)
+            if future is not None:
+                # Identical request already running: wait for its result
+                self.coalesced += 1
+                owner = False
+            else:
+                future = Future()
+                self._in_flight[key] = future
+                self.misses += 1
+                owner = True
+
+        if not owner:
+            return copy.deepcopy(future.result())
+
+        try:
+            value = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            del self._in_flight[key]
+        future.set_result(value)
+        return copy.deepcopy(value)
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._in_flight)
+            }
@@ -0,0 +1,165 @@
+"""
+Content-addressed result cache for FaunaVision
+Stores per-video behavior analysis results on disk, keyed by the video's
+content hash plus the model version and sampling parameters, with
+least-recently-used eviction once the cache exceeds its size budget.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ResultCache:
+    """
+    On-disk JSON cache with a total size limit and LRU eviction.
+
+    Each entry is one `<key>.json` file. Recency survives restarts through
+    file modification times, which are bumped on every hit.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        """
+        Initialize result cache.
+
+        Args:
+            directory: Directory holding the cache files (created if missing)
+            max_bytes: Total size budget; least recently used entries are
+                       deleted once it is exceeded
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> size in bytes, least recent first
+        self._total_bytes = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    @staticmethod
+    def make_key(content_hash: str, model_version: str, params: Dict) -> str:
+        """
+        Build a cache key.
+
+        Args:
+            content_hash: SHA-256 of the video file
+            model_version: Identifier of the model that produced the result
+            params: Sampling/inference parameters that affect the result
+
+        Returns:
+            Hex key
+        """
+        payload = json.dumps(
+            {"video": content_hash, "model": model_version, "params": params},
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _load_index(self):
+        """Rebuild the LRU order from the files on disk."""
+        files = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            stat = os.stat(os.path.join(self.directory, name))
+            files.append((stat.st_mtime, name[:-len(".json")], stat.st_size))
+
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._total_bytes += size
+
+        self._evict()
+        logger.info(f"Result cache: {len(self._entries)} entries, {self._total_bytes / 1024 / 1024:.1f}MB in {self.directory}")
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Look up a result.
+
+        Returns:
+            Cached result, or None on a miss
+        """
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+
+            path = self._path(key)
+            try:
+                with open(path, "r") as f:
+                    value = json.load(f)
+                os.utime(path)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Dropping unreadable cache entry {key}: {e}")
+                self._remove(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: Dict):
+        """Store a result, evicting old entries if over budget."""
+        data = json.dumps(value).encode("utf-8")
+        if len(data) > self.max_bytes:
+            return
+
+        with self._lock:
+            path = self._path(key)
+            tmp_path = f"{path}.tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.warning(f"Failed to write cache entry {key}: {e}")
+                return
+
+            if key in self._entries:
+                self._total_bytes -= self._entries.pop(key)
+            self._entries[key] = len(data)
+            self._total_bytes += len(data)
+            self._evict()
+
+    def _remove(self, key: str):
+        """Delete one entry. Caller holds the lock (or is initializing)."""
+        self._total_bytes -= self._entries.pop(key, 0)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _evict(self):
+        """Delete least recently used entries until under budget."""
+        while self._total_bytes > self.max_bytes and self._entries:
+            key = next(iter(self._entries))
+            self._remove(key)
+            self.evictions += 1
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "size_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
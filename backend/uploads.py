@@ -0,0 +1,133 @@
+"""
+Streaming upload handling for FaunaVision
+Writes uploaded files straight to their final location while the request
+body is parsed, hashing the bytes and enforcing the size limit as they
+arrive.
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+from typing import List, Optional
+import logging
+
+from flask import Request
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.utils import secure_filename
+
+logger = logging.getLogger(__name__)
+
+
+class StreamedUpload:
+    """
+    File-like sink for one uploaded file.
+
+    Werkzeug's form parser writes the upload into this object chunk by
+    chunk. Each chunk is hashed and counted; once `max_size` is exceeded
+    the partial file is deleted and the request fails with 413.
+    """
+
+    def __init__(self, upload_dir: str, filename: Optional[str], max_size: Optional[int]):
+        """
+        Initialize streamed upload.
+
+        Args:
+            upload_dir: Parent directory; each upload gets its own subdirectory
+            filename: Client-supplied filename (sanitized before use)
+            max_size: Maximum size in bytes, or None for no limit
+        """
+        self.max_size = max_size
+        self.size = 0
+        self._hash = hashlib.sha256()
+
+        self.temp_dir = tempfile.mkdtemp(dir=upload_dir)
+        self.filename = secure_filename(filename or "") or "upload"
+        self.path = os.path.join(self.temp_dir, self.filename)
+        self._file = open(self.path, "w+b")
+
+    @property
+    def sha256(self) -> str:
+        """Hex SHA-256 of the bytes received so far."""
+        return self._hash.hexdigest()
+
+    def write(self, data: bytes) -> int:
+        self.size += len(data)
+        if self.max_size is not None and self.size > self.max_size:
+            self.discard()
+            raise RequestEntityTooLarge(f"Video file too large. Max size: {self.max_size / 1024 / 1024}MB")
+        self._hash.update(data)
+        return self._file.write(data)
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        return self._file.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._file.tell()
+
+    def read(self, size: int = -1) -> bytes:
+        return self._file.read(size)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        """Close the file, keeping it on disk."""
+        if not self._file.closed:
+            self._file.close()
+
+    def discard(self):
+        """Close and delete the upload and its directory."""
+        self.close()
+        remove_upload_dir(self.temp_dir)
+
+
+def remove_upload_dir(temp_dir: str):
+    """Remove an upload's temporary directory."""
+    try:
+        if os.path.exists(temp_dir):
+            shutil.rmtree(temp_dir)
+    except Exception as e:
+        logger.warning(f"Error cleaning up temp files: {e}")
+
+
+class StreamingUploadRequest(Request):
+    """
+    Flask request class that streams file uploads into StreamedUpload sinks
+    instead of werkzeug's spooled temporary files.
+
+    Configure with `upload_dir`, `max_upload_size` (per file) and
+    `endpoint_max_content_length` (per request body) class attributes and
+    install with `app.request_class = StreamingUploadRequest`.
+    """
+
+    upload_dir = tempfile.gettempdir()
+    max_upload_size = None
+
+    # Body size limits for specific endpoints, overriding MAX_CONTENT_LENGTH
+    endpoint_max_content_length = {}
+
+    @property
+    def max_content_length(self) -> Optional[int]:
+        limit = self.endpoint_max_content_length.get(self.endpoint)
+        if limit is not None:
+            return limit
+        return super().max_content_length
+
+    @property
+    def streamed_uploads(self) -> List[StreamedUpload]:
+        """Uploads written while parsing this request."""
+        if not hasattr(self, "_streamed_uploads"):
+            self._streamed_uploads = []
+        return self._streamed_uploads
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        upload = StreamedUpload(self.upload_dir, filename, self.max_upload_size)
+        self.streamed_uploads.append(upload)
+        return upload
+
+    def discard_uploads(self, keep: Optional[StreamedUpload] = None):
+        """Delete every upload of this request except `keep`."""
+        for upload in self.streamed_uploads:
+            if upload is not keep:
+                upload.discard()
@@ -44,29 +44,54 @@ const Animal = ({ animal, onUpdate, onRemove, canRemove }) => {
       const API_URL = process.env.REACT_APP_API_URL || "http://localhost:5001";
       
       const controller = new AbortController();
-      const timeoutId = setTimeout(() => controller.abort(), 300000);
+      const timeoutId = setTimeout(() => controller.abort(), 900000);
       
-      const response = await fetch(`${API_URL}/analyze`, {
-        method: "POST",
-        body: formData,
-        signal: controller.signal
-      });
-      
-      clearTimeout(timeoutId);
-
-      if (!response.ok) {
-        let errorMessage = "Analysis failed";
+      const readError = async (response, fallback) => {
         try {
           const errorData = await response.json();
-          errorMessage = errorData.error || errorMessage;
+          return errorData.error || fallback;
         } catch (e) {
-          errorMessage = `Server error: ${response.status} ${response.statusText}`;
+          return `Server error: ${response.status} ${response.statusText}`;
+        }
+      };
+      
+      try {
+        // Submit the analysis job
+        const response = await fetch(`${API_URL}/analyze`, {
+          method: "POST",
+          body: formData,
+          signal: controller.signal
+        });
+
+        if (!response.ok) {
+          throw new Error(await readError(response, "Analysis failed"));
         }
-        throw new Error(errorMessage);
-      }
 
-      const data = await response.json();
-      onUpdate({ analysis: data, loading: false, error: null });
+        const { job_id: jobId } = await response.json();
+
+        // Poll until the job finishes
+        while (true) {
+          await new Promise((resolve) => setTimeout(resolve, 2000));
+
+          const jobResponse = await fetch(`${API_URL}/jobs/${jobId}`, {
+            signal: controller.signal
+          });
+          if (!jobResponse.ok) {
+            throw new Error(await readError(jobResponse, "Analysis failed"));
+          }
+
+          const job = await jobResponse.json();
+          if (job.status === "succeeded") {
+            onUpdate({ analysis: job.result, loading: false, error: null });
+            break;
+          }
+          if (job.status === "failed") {
+            throw new Error(job.error || "Analysis failed");
+          }
+        }
+      } finally {
+        clearTimeout(timeoutId);
+      }
     } catch (error) {
       let errorMessage = error.message;
       if (error.name === "AbortError") {
@@ -0,0 +1,93 @@
+"""
+Check that an exported ONNX/OpenVINO model matches the original .pt model.
+
+Runs both models on the same sampled video frames and reports top-1
+agreement, probability differences and per-frame latency.
+"""
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.frame_sampler import FrameSampler
+from src.inference_engines import load_engine
+
+# Minimum share of frames whose top-1 class must match
+MIN_AGREEMENT = 0.99
+
+
+def collect_frames(video_path, max_frames=200, frame_interval=1.0):
+    """Sample up to max_frames frames from a video."""
+    frames = []
+    with FrameSampler(video_path, frame_interval=frame_interval) as sampler:
+        for sample in sampler:
+            frames.append(sample.image)
+            if len(frames) >= max_frames:
+                break
+    return frames
+
+
+def run_model(model, frames, batch_size=8):
+    """Return (probability matrix, seconds per frame) for a model."""
+    probs = []
+    start = time.time()
+    for i in range(0, len(frames), batch_size):
+        results = model(frames[i:i + batch_size], verbose=False)
+        for result in results:
+            data = result.probs.data
+            probs.append(data.cpu().numpy() if hasattr(data, "cpu") else np.asarray(data))
+    elapsed = time.time() - start
+    return np.stack(probs), elapsed / max(1, len(frames))
+
+
+def main():
+    if len(sys.argv) < 4:
+        print("Usage: python check_engine_parity.py <reference_model.pt> <exported_model> <video_path> [max_frames]")
+        print("\nExample:")
+        print("  python check_engine_parity.py models/best.pt models/best.onnx data/test_videos/pig_video.mp4 200")
+        sys.exit(1)
+
+    reference_path = sys.argv[1]
+    exported_path = sys.argv[2]
+    video_path = sys.argv[3]
+    max_frames = int(sys.argv[4]) if len(sys.argv) > 4 else 200
+
+    print("="*60)
+    print("Inference Engine Parity Check")
+    print("="*60)
+    print()
+
+    frames = collect_frames(video_path, max_frames=max_frames)
+    if not frames:
+        print(f"Error: No frames read from {video_path}")
+        sys.exit(1)
+    print(f"Sampled {len(frames)} frames from {video_path}")
+
+    reference = load_engine(reference_path, "ultralytics")
+    exported = load_engine(exported_path)
+
+    ref_probs, ref_latency = run_model(reference, frames)
+    exp_probs, exp_latency = run_model(exported, frames)
+
+    agreement = float(np.mean(ref_probs.argmax(axis=1) == exp_probs.argmax(axis=1)))
+    max_diff = float(np.abs(ref_probs - exp_probs).max())
+    mean_diff = float(np.abs(ref_probs - exp_probs).mean())
+
+    print()
+    print("Results:")
+    print(f"  Top-1 agreement:      {agreement:.2%}")
+    print(f"  Max prob difference:  {max_diff:.4f}")
+    print(f"  Mean prob difference: {mean_diff:.4f}")
+    print(f"  Reference latency:    {ref_latency * 1000:.1f} ms/frame")
+    print(f"  Exported latency:     {exp_latency * 1000:.1f} ms/frame")
+
+    if agreement < MIN_AGREEMENT:
+        print(f"\nFAILED: agreement below {MIN_AGREEMENT:.0%}")
+        sys.exit(1)
+    print("\nPASSED")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+Convert a crop dataset between the folder layout and tar shards.
+
+Folder layout: <crops_dir>/<behavior>/<name>.jpg, as written by
+parse_annotations.py. Shards: <prefix>-00000.tar ... plus an index, read
+by CropShardDataset (see src/crop_shards.py). Convert one split at a time.
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.behavior_labels import load_label_map
+from src.crop_shards import CropShardDataset, folders_to_shards, shards_to_folders
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4 or sys.argv[1] not in ("to-shards", "to-folders"):
+        print("Usage: python convert_crops.py to-shards <crops_dir> <shard_dir> [crops_per_shard]")
+        print("       python convert_crops.py to-folders <shard_dir> <crops_dir>")
+        print("\nExamples:")
+        print("  python convert_crops.py to-shards data/pig_crops/train data/crop_shards/train 10000")
+        print("  python convert_crops.py to-folders data/crop_shards/val data/pig_crops/val")
+        sys.exit(1)
+
+    command = sys.argv[1]
+    source = sys.argv[2]
+    destination = sys.argv[3]
+
+    if command == "to-shards":
+        crops_per_shard = int(sys.argv[4]) if len(sys.argv) > 4 else 10000
+        classes = load_label_map().classes
+        count = folders_to_shards(source, destination, classes, max_samples=crops_per_shard)
+        dataset = CropShardDataset(destination)
+        print(f"Packed {count} crops into {len(dataset.shards)} shards at: {destination}")
+        for behavior, samples in dataset.class_counts().items():
+            print(f"  {behavior}: {samples}")
+    else:
+        count = shards_to_folders(source, destination)
+        print(f"Unpacked {count} crops to: {destination}")
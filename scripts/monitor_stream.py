@@ -0,0 +1,84 @@
+"""
+Monitor a live pig pen stream and print distress alerts.
+
+Works with RTSP/HTTP camera URLs, device indexes ("0") and local video
+files, which are played back in real time for testing.
+"""
+import json
+import logging
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.stream_monitor import DISTRESS_LEVELS, StreamMonitor
+from src.yolo_behavior_classifier import YOLOBehaviorClassifier
+
+
+def print_status(snapshot):
+    """Print one status line with the window's top behaviors."""
+    top = sorted(snapshot["percentages"].items(), key=lambda x: x[1], reverse=True)[:3]
+    behaviors = ", ".join(f"{behavior} {share:.0%}" for behavior, share in top) or "no predictions yet"
+    print(
+        f"[{snapshot['window_samples']} samples] {behaviors} | "
+        f"distress: {snapshot['distress']['distress_level']} | "
+        f"read {snapshot['frames_read']}, dropped {snapshot['frames_dropped']}, "
+        f"classified {snapshot['frames_classified']}"
+    )
+
+
+def print_alert(alert):
+    """Print an alert as a JSON line."""
+    print(f"🚨 ALERT {json.dumps(alert)}", flush=True)
+
+
+def monitor_stream(source, model_path, window_seconds=300.0, alert_level="moderate"):
+    """
+    Classify a stream until interrupted (or a file source ends).
+
+    Args:
+        source: Stream URL, device index or video file
+        model_path: Trained behavior classifier
+        window_seconds: Sliding window for behavior percentages
+        alert_level: Lowest distress level that raises an alert
+    """
+    classifier = YOLOBehaviorClassifier(model_path=model_path)
+    if classifier.model is None:
+        print(f"❌ Could not load model: {model_path}")
+        sys.exit(1)
+
+    monitor = StreamMonitor(
+        classifier,
+        source,
+        window_seconds=window_seconds,
+        alert_level=alert_level,
+        on_alert=print_alert
+    )
+
+    print(f"Monitoring {source} ({window_seconds:.0f}s window, alerts at '{alert_level}' or above)")
+    print("Press Ctrl+C to stop\n")
+    try:
+        monitor.run(on_update=print_status)
+    except KeyboardInterrupt:
+        pass
+
+    print("\nFinal window:")
+    print_status(monitor.snapshot())
+    print(f"Alerts raised: {monitor.alerts}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print(f"Usage: python monitor_stream.py <source> <model_path> [window_seconds] [{'|'.join(DISTRESS_LEVELS[1:])}]")
+        print("\nExamples:")
+        print("  python monitor_stream.py rtsp://camera.local:554/pen1 models/best.pt 300")
+        print("  python monitor_stream.py data/test_videos/pig_video.mp4 models/best.pt 60 low")
+        sys.exit(1)
+
+    logging.basicConfig(level=logging.INFO)
+
+    source = sys.argv[1]
+    model_path = sys.argv[2]
+    window_seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 300.0
+    alert_level = sys.argv[4] if len(sys.argv) > 4 else "moderate"
+
+    monitor_stream(source, model_path, window_seconds, alert_level)
@@ -4,17 +4,28 @@ Parse JSON annotations and extract labeled pig crops from videos.
 import json
 import cv2
 import os
+import sys
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Dict
+from typing import Iterable, List, Dict, Optional, Tuple
+import numpy as np
 try:
     from tqdm import tqdm
     TQDM_AVAILABLE = True
 except ImportError:
     TQDM_AVAILABLE = False
     # Fallback: create a dummy tqdm
-    def tqdm(iterable, desc="", total=None, unit=""):
+    def tqdm(iterable, desc="", total=None, unit="", **kwargs):
         return iterable
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.annotation_stream import LabelCodes, compact_track, iter_annotation_tracks
+from src.behavior_labels import BehaviorLabelMap, format_unknown_summary, load_label_map
+from src.crop_shards import CropShardWriter
+from src.frame_sampler import iter_frames_at
+
 def parse_json_annotation(json_path: str) -> List[Dict]:
     """
     Parse JSON annotation file.
@@ -109,158 +120,145 @@ def parse_json_annotation(json_path: str) -> List[Dict]:
     else:
         return []
 
-def extract_pig_crops(video_path: str, annotations: List[Dict], output_dir: str, 
-                     behavior_classes: Dict[str, int], min_visibility: float = 0.5):
+def build_crop_index(annotations: Iterable, label_map: BehaviorLabelMap,
+                     min_visibility: float = 0.5,
+                     unknown_labels: Optional[Counter] = None,
+                     codes: Optional[LabelCodes] = None) -> Dict[int, List[Tuple]]:
+    """
+    Group the crops to extract from a video by frame number.
+    
+    Args:
+        annotations: AnnotationTrack records (see src/annotation_stream.py)
+                     or pig annotation dicts as returned by parse_json_annotation
+        label_map: Behavior label map (see src/behavior_labels.py)
+        min_visibility: Minimum visibility threshold (0-1)
+        unknown_labels: Counts annotations skipped for an unknown behavior label
+        codes: Label codes the records were read with
+    
+    Returns:
+        {frame_num: [(tracking_id, bbox, behavior), ...]} for every
+        ground-truth, visible annotation with a known behavior
+    """
+    codes = codes if codes is not None else LabelCodes()
+    crop_index = defaultdict(list)
+    
+    for track in annotations:
+        if isinstance(track, dict):
+            track = compact_track(track, codes)
+        
+        # Class ID per frame; codes seen so far cover every label of this track
+        class_ids = label_map.code_table(codes.labels)[track.labels] if len(track) else track.labels
+        
+        # Skip if not ground truth, visibility too low or no box
+        keep = track.ground_truth & (track.visibility >= min_visibility) & ~np.isnan(track.bboxes).any(axis=1)
+        
+        if unknown_labels is not None:
+            unknown_codes, counts = np.unique(track.labels[keep & (class_ids < 0)], return_counts=True)
+            for code, count in zip(unknown_codes, counts):
+                unknown_labels[codes[int(code)]] += int(count)
+        
+        for i in np.flatnonzero(keep & (class_ids >= 0)):
+            behavior = label_map.names[int(class_ids[i])]
+            crop_index[int(track.frames[i])].append((track.tracking_id, track.bboxes[i].tolist(), behavior))
+    
+    return crop_index
+
+def crop_from_bbox(frame, bbox):
+    """
+    Cut a pig out of a frame.
+    
+    Args:
+        frame: BGR frame
+        bbox: [x1, y1, x2, y2] or [x, y, width, height]
+    
+    Returns:
+        Cropped image, or None if the box is empty
+    """
+    # Extract bounding box (assuming format: [x, y, width, height] or [x1, y1, x2, y2])
+    if len(bbox) != 4:
+        return None
+    if bbox[2] > bbox[0] and bbox[3] > bbox[1]:
+        # Format: [x1, y1, x2, y2]
+        x1, y1, x2, y2 = map(int, bbox)
+    else:
+        # Format: [x, y, width, height]
+        x, y, w, h = map(int, bbox)
+        x1, y1, x2, y2 = x, y, x + w, y + h
+    
+    # Ensure coordinates are within frame bounds
+    h_frame, w_frame = frame.shape[:2]
+    x1 = max(0, min(x1, w_frame))
+    y1 = max(0, min(y1, h_frame))
+    x2 = max(0, min(x2, w_frame))
+    y2 = max(0, min(y2, h_frame))
+    
+    if x2 <= x1 or y2 <= y1:
+        return None
+    
+    crop = frame[y1:y2, x1:x2]
+    return crop if crop.size > 0 else None
+
+def extract_pig_crops(video_path: str, annotations: Iterable, output_dir: str, 
+                     label_map: BehaviorLabelMap, min_visibility: float = 0.5,
+                     unknown_labels: Optional[Counter] = None, progress: bool = True,
+                     codes: Optional[LabelCodes] = None, writer: Optional[CropShardWriter] = None):
     """
     Extract cropped pig images from video based on annotations.
     
+    The annotations are first grouped by frame, then the video is decoded
+    once from start to end and every crop of a frame is cut as it passes,
+    instead of seeking once per pig and frame.
+    
     Args:
         video_path: Path to video file
-        annotations: List of pig annotation objects
+        annotations: AnnotationTrack records or pig annotation dicts
         output_dir: Directory to save cropped images
-        behavior_classes: Mapping of behavior labels to class IDs
+        label_map: Behavior label map (see src/behavior_labels.py)
         min_visibility: Minimum visibility threshold (0-1)
+        unknown_labels: Counter for unknown behavior labels (see build_crop_index)
+        progress: Show a per-frame progress bar
+        codes: Label codes the records were read with
+        writer: Append crops to this shard writer instead of writing
+                one JPEG per crop into output_dir/<behavior>/
+    
+    Raises:
+        ValueError: If the video cannot be opened
     """
     output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
     
-    cap = cv2.VideoCapture(str(video_path))
-    if not cap.isOpened():
-        print(f"Error: Could not open video {video_path}")
+    crop_index = build_crop_index(annotations, label_map, min_visibility, unknown_labels, codes)
+    if not crop_index:
         return 0
     
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    video_stem = Path(video_path).stem
     saved_count = 0
     
-    # Process each pig annotation
-    for pig_annotation in annotations:
-        tracking_id = pig_annotation.get('tracking_id', pig_annotation.get('id', 'unknown'))
-        frames = pig_annotation.get('frames', [])
-        bboxes = pig_annotation.get('bounding_box', pig_annotation.get('bbox', []))
-        behavior_labels = pig_annotation.get('behavior_label', pig_annotation.get('label', []))
-        visibilities = pig_annotation.get('visibility', pig_annotation.get('visibility_flag', []))
-        ground_truths = pig_annotation.get('ground_truth', pig_annotation.get('ground_truth_flag', []))
-        
-        # Handle case where behavior_label is a single string (old format)
-        if isinstance(behavior_labels, str):
-            behavior_labels = [behavior_labels] * len(frames)
-        if isinstance(visibilities, (int, float)):
-            visibilities = [visibilities] * len(frames)
-        if isinstance(ground_truths, bool):
-            ground_truths = [ground_truths] * len(frames)
-        
-        # Process each frame for this pig
-        if isinstance(frames, list) and isinstance(bboxes, list):
-            # If frames and bboxes are lists, they should be the same length
-            frame_iter = tqdm(enumerate(frames), total=len(frames), 
-                            desc=f"  Pig {tracking_id}", leave=False, unit="frame")
-            for i, frame_num in frame_iter:
-                # Handle case where bboxes might be shorter or longer
-                if i >= len(bboxes) or i >= len(behavior_labels):
-                    continue
-                
-                bbox = bboxes[i]
-                behavior_label = behavior_labels[i] if i < len(behavior_labels) else ''
-                visibility = visibilities[i] if i < len(visibilities) else 1.0
-                ground_truth = ground_truths[i] if i < len(ground_truths) else True
-                
-                # Skip if not ground truth or visibility too low
-                if not ground_truth or visibility < min_visibility:
-                    continue
-                
-                # Map behavior labels to our classes
-                behavior_mapping = {
-                    # Direct matches
-                    'tail_biting': 'tail_biting',
-                    'ear_biting': 'ear_biting',
-                    'aggression': 'aggression',
-                    'eating': 'eating',
-                    'sleeping': 'sleeping',
-                    'rooting': 'rooting',
-                    # Your JSON format mappings
-                    'sleep': 'sleeping',
-                    'lying': 'sleeping',  # Map lying to sleeping (normal rest)
-                    'eat': 'eating',
-                    'drink': 'eating',  # Map drink to eating (normal behavior)
-                    'walk': 'rooting',  # Map walk to rooting (normal exploratory behavior)
-                    'run': 'rooting',  # Map run to rooting (normal movement)
-                    'standing': 'rooting',  # Map standing to rooting (normal behavior)
-                    'sitting': 'rooting',  # Map sitting to rooting (normal behavior)
-                    'investigating': 'rooting',  # Map investigating to rooting (normal exploratory)
-                    'playwithtoy': 'rooting',  # Map play to rooting (normal behavior)
-                    'jumpontopof': 'rooting',  # Map play behavior to rooting
-                    'fight': 'aggression',  # Map fight to aggression (distress behavior)
-                    'chase': 'aggression',  # Map chase to aggression (distress behavior)
-                    'nose-poke-elsewhere': 'tail_biting',  # Map nose-poke-elsewhere to tail_biting (distress)
-                    'nose-to-nose': 'ear_biting',  # Map nose-to-nose to ear_biting (distress)
-                    'other': 'rooting',  # Map other to rooting (default)
-                    # Alternative spellings
-                    'tail biting': 'tail_biting',
-                    'ear biting': 'ear_biting',
-                }
-                
-                behavior_label_clean = behavior_label.lower().strip()
-                mapped_behavior = behavior_mapping.get(behavior_label_clean, behavior_label_clean)
-                
-                # Get class ID for this behavior
-                class_id = behavior_classes.get(mapped_behavior, None)
-                if class_id is None:
-                    # Try direct match
-                    class_id = behavior_classes.get(behavior_label_clean, None)
-                    if class_id is None:
-                        print(f"Warning: Unknown behavior label '{behavior_label}' (mapped: '{mapped_behavior}'), skipping...")
-                        continue
-                if not bbox or len(bbox) < 4:
-                    continue
-                
-                # Set video to specific frame
-                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_num)
-                ret, frame = cap.read()
-                
-                if not ret:
-                    continue
-                
-                # Extract bounding box (assuming format: [x, y, width, height] or [x1, y1, x2, y2])
-                if len(bbox) == 4:
-                    if bbox[2] > bbox[0] and bbox[3] > bbox[1]:
-                        # Format: [x1, y1, x2, y2]
-                        x1, y1, x2, y2 = map(int, bbox)
-                    else:
-                        # Format: [x, y, width, height]
-                        x, y, w, h = map(int, bbox)
-                        x1, y1, x2, y2 = x, y, x + w, y + h
-                else:
-                    continue
-                
-                # Ensure coordinates are within frame bounds
-                h_frame, w_frame = frame.shape[:2]
-                x1 = max(0, min(x1, w_frame))
-                y1 = max(0, min(y1, h_frame))
-                x2 = max(0, min(x2, w_frame))
-                y2 = max(0, min(y2, h_frame))
-                
-                if x2 <= x1 or y2 <= y1:
-                    continue
-                
-                # Crop the pig
-                crop = frame[y1:y2, x1:x2]
-                
-                if crop.size == 0:
-                    continue
-                
-                # Save cropped image
-                image_name = f"{Path(video_path).stem}_pig{tracking_id}_frame{frame_num:06d}.jpg"
-                image_path = output_dir / mapped_behavior / image_name
+    frames = iter_frames_at(video_path, crop_index.keys())
+    if progress:
+        frames = tqdm(frames, desc=f"  {video_stem}", total=len(crop_index), leave=False, unit="frame")
+    for sample in frames:
+        for tracking_id, bbox, behavior in crop_index[sample.index]:
+            crop = crop_from_bbox(sample.image, bbox)
+            if crop is None:
+                continue
+            
+            # Save cropped image
+            key = f"{video_stem}_pig{tracking_id}_frame{sample.index:06d}"
+            if writer is not None:
+                writer.add(key, crop, behavior)
+            else:
+                image_path = output_dir / behavior / f"{key}.jpg"
                 image_path.parent.mkdir(parents=True, exist_ok=True)
-                
                 cv2.imwrite(str(image_path), crop)
-                saved_count += 1
+            saved_count += 1
     
-    cap.release()
     return saved_count
 
 def process_video_with_annotations(video_path: str, json_path: str, output_base_dir: str,
-                                   behavior_classes: Dict[str, int]):
+                                   label_map: BehaviorLabelMap,
+                                   unknown_labels: Optional[Counter] = None, verbose: bool = True,
+                                   shards: bool = False):
     """
     Process a video file with its corresponding JSON annotation.
     
@@ -268,70 +266,192 @@ def process_video_with_annotations(video_path: str, json_path: str, output_base_
         video_path: Path to video file
         json_path: Path to JSON annotation file
         output_base_dir: Base directory for output
-        behavior_classes: Mapping of behavior labels to class IDs
+        label_map: Behavior label map (see src/behavior_labels.py)
+        unknown_labels: Counter for unknown behavior labels (see build_crop_index)
+        verbose: Print progress for this video
+        shards: Write the crops to tar shards named after the video
+                (see src/crop_shards.py) instead of one JPEG per crop
     """
-    print(f"Processing: {Path(video_path).name}")
+    if verbose:
+        print(f"Processing: {Path(video_path).name}")
     
-    # Parse annotations
-    annotations = parse_json_annotation(json_path)
-    print(f"  Found {len(annotations)} pig annotations")
+    # Stream annotations one pig at a time; only the crop index is kept
+    codes = LabelCodes()
+    tracks = iter_annotation_tracks(json_path, codes)
     
     # Extract crops
-    saved = extract_pig_crops(video_path, annotations, output_base_dir, behavior_classes)
-    print(f"  Extracted {saved} cropped images")
+    if shards:
+        with CropShardWriter(output_base_dir, label_map.classes, prefix=Path(video_path).stem) as writer:
+            saved = extract_pig_crops(video_path, tracks, output_base_dir, label_map,
+                                      unknown_labels=unknown_labels, progress=verbose, codes=codes,
+                                      writer=writer)
+    else:
+        saved = extract_pig_crops(video_path, tracks, output_base_dir, label_map,
+                                  unknown_labels=unknown_labels, progress=verbose, codes=codes)
+    if verbose:
+        print(f"  Extracted {saved} cropped images")
     
     return saved
 
-if __name__ == "__main__":
-    import sys
+def manifest_path(output_dir: str, video_path: str) -> Path:
+    """Completion manifest of a video; its presence marks the video as done."""
+    return Path(output_dir) / ".manifests" / f"{Path(video_path).stem}.json"
+
+def process_pair(video_path: str, json_path: str, output_dir: str,
+                 label_map: BehaviorLabelMap, verbose: bool = True, shards: bool = False) -> Dict:
+    """
+    Extract the crops of one video and write its completion manifest.
     
-    if len(sys.argv) < 4:
-        print("Usage: python parse_annotations.py <video_dir> <json_dir> <output_dir>")
-        print("\nExample:")
-        print("  python parse_annotations.py data/videos data/annotations data/pig_crops")
-        sys.exit(1)
+    The manifest is written only after every crop has been saved, so a
+    video that fails or is interrupted halfway is processed again on the
+    next run.
     
-    video_dir = sys.argv[1]
-    json_dir = sys.argv[2]
-    output_dir = sys.argv[3]
+    Returns:
+        Manifest dictionary: video, annotation, format, saved, unknown_labels, seconds
     
-    # Behavior classes
-    BEHAVIOR_CLASSES = {
-        "tail_biting": 0,
-        "ear_biting": 1,
-        "aggression": 2,
-        "eating": 3,
-        "sleeping": 4,
-        "rooting": 5
+    Raises:
+        ValueError: If the video cannot be opened (no manifest is written)
+    """
+    started = time.monotonic()
+    unknown_labels = Counter()
+    saved = process_video_with_annotations(video_path, json_path, output_dir, label_map,
+                                           unknown_labels=unknown_labels, verbose=verbose, shards=shards)
+    manifest = {
+        "video": str(video_path),
+        "annotation": str(json_path),
+        "format": "shards" if shards else "folders",
+        "saved": saved,
+        "unknown_labels": dict(unknown_labels),
+        "seconds": round(time.monotonic() - started, 3)
     }
     
+    path = manifest_path(output_dir, video_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+    return manifest
+
+def _init_worker():
+    """Keep each worker's OpenCV to one thread; the pool provides the parallelism."""
+    cv2.setNumThreads(1)
+
+def find_annotation_pairs(video_dir: str, json_dir: str) -> List[Tuple[Path, Path]]:
+    """
+    Match video files with their JSON annotations by file stem.
+    
+    Returns:
+        (video_path, json_path) pairs; videos without a JSON are reported and left out
+    """
     video_dir = Path(video_dir)
     json_dir = Path(json_dir)
     
-    total_saved = 0
-    
     # Find all video files
     video_files = list(video_dir.glob("*.mp4")) + list(video_dir.glob("*.avi")) + list(video_dir.glob("*.mov"))
     
-    print(f"\nFound {len(video_files)} video files to process\n")
-    
-    video_iter = tqdm(video_files, desc="Processing videos", unit="video")
-    for video_path in video_iter:
+    pairs = []
+    for video_path in sorted(video_files):
         # Find corresponding JSON file
-        json_name = video_path.stem + ".json"
-        json_path = json_dir / json_name
-        
+        json_path = json_dir / (video_path.stem + ".json")
         if not json_path.exists():
             print(f"Warning: No JSON found for {video_path.name}, skipping...")
             continue
-        
-        saved = process_video_with_annotations(
-            str(video_path),
-            str(json_path),
-            output_dir,
-            BEHAVIOR_CLASSES
-        )
-        total_saved += saved
-    
-    print(f"\nTotal cropped images extracted: {total_saved}")
+        pairs.append((video_path, json_path))
+    return pairs
+
+def process_dataset(video_dir: str, json_dir: str, output_dir: str,
+                    label_map: BehaviorLabelMap, workers: Optional[int] = None,
+                    shards: bool = False) -> Dict:
+    """
+    Extract crops for every annotated video, in parallel across processes.
+    
+    Videos that already have a completion manifest in output_dir are
+    skipped, so an interrupted run can simply be started again.
+    
+    Args:
+        video_dir: Directory with video files
+        json_dir: Directory with JSON annotations named after the videos
+        output_dir: Base directory for output
+        label_map: Behavior label map (see src/behavior_labels.py)
+        workers: Worker processes (default: CPU count; 1 runs in this process)
+        shards: Write tar shards with an index instead of one JPEG per crop
+    
+    Returns:
+        Dictionary with saved, videos, skipped, failed and the aggregated
+        unknown_labels counts
+    """
+    workers = workers or os.cpu_count() or 1
+    pairs = find_annotation_pairs(video_dir, json_dir)
+    pending = [(v, j) for v, j in pairs if not manifest_path(output_dir, v).exists()]
+    
+    summary = {
+        "saved": 0,
+        "videos": 0,
+        "skipped": len(pairs) - len(pending),
+        "failed": [],
+        "unknown_labels": Counter()
+    }
+    print(f"\nFound {len(pairs)} annotated videos, {summary['skipped']} already done, "
+          f"{len(pending)} to process with {min(workers, max(len(pending), 1))} workers\n")
+    
+    def collect(manifest):
+        summary["saved"] += manifest["saved"]
+        summary["videos"] += 1
+        summary["unknown_labels"].update(manifest["unknown_labels"])
+    
+    if workers == 1:
+        for video_path, json_path in tqdm(pending, desc="Processing videos", unit="video"):
+            try:
+                collect(process_pair(str(video_path), str(json_path), output_dir, label_map, True, shards))
+            except Exception as e:
+                print(f"Error processing {video_path.name}: {e}")
+                summary["failed"].append(str(video_path))
+        return summary
+    
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        futures = {
+            executor.submit(process_pair, str(v), str(j), output_dir, label_map, False, shards): v
+            for v, j in pending
+        }
+        for future in tqdm(as_completed(futures), desc="Processing videos", total=len(futures), unit="video"):
+            video_path = futures[future]
+            try:
+                collect(future.result())
+            except Exception as e:
+                print(f"Error processing {video_path.name}: {e}")
+                summary["failed"].append(str(video_path))
+    return summary
 
+if __name__ == "__main__":
+    if len(sys.argv) < 4:
+        print("Usage: python parse_annotations.py <video_dir> <json_dir> <output_dir> [workers] [folders|shards]")
+        print("\nExamples:")
+        print("  python parse_annotations.py data/videos data/annotations data/pig_crops 16")
+        print("  python parse_annotations.py data/videos/train data/annotations data/crop_shards/train 16 shards")
+        sys.exit(1)
+    
+    video_dir = sys.argv[1]
+    json_dir = sys.argv[2]
+    output_dir = sys.argv[3]
+    workers = int(sys.argv[4]) if len(sys.argv) > 4 else None
+    output_format = sys.argv[5] if len(sys.argv) > 5 else "folders"
+    if output_format not in ("folders", "shards"):
+        print(f"Error: Unknown output format '{output_format}' (expected folders or shards)")
+        sys.exit(1)
+    
+    # Behavior classes and label aliases from config/behavior_labels.json
+    label_map = load_label_map()
+    
+    summary = process_dataset(video_dir, json_dir, output_dir, label_map, workers,
+                              shards=output_format == "shards")
+    
+    if summary["unknown_labels"]:
+        print("\n" + format_unknown_summary(summary["unknown_labels"]))
+    if summary["failed"]:
+        print(f"\nFailed videos ({len(summary['failed'])}), rerun to retry:")
+        for video_path in summary["failed"]:
+            print(f"  {video_path}")
+    
+    print(f"\nProcessed {summary['videos']} videos ({summary['skipped']} skipped as already done)")
+    print(f"Total cropped images extracted: {summary['saved']}")
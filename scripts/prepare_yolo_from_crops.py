@@ -2,24 +2,21 @@
 Prepare YOLO dataset from cropped pig images organized by behavior.
 """
 import shutil
+import sys
 from pathlib import Path
 try:
     from tqdm import tqdm
     TQDM_AVAILABLE = True
 except ImportError:
     TQDM_AVAILABLE = False
-    def tqdm(iterable, desc="", total=None, unit=""):
+    def tqdm(iterable, desc="", total=None, unit="", **kwargs):
         return iterable
 
-# Behavior classes
-BEHAVIOR_CLASSES = {
-    "tail_biting": 0,
-    "ear_biting": 1,
-    "aggression": 2,
-    "eating": 3,
-    "sleeping": 4,
-    "rooting": 5
-}
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.behavior_labels import load_label_map
+
+# Behavior classes (config/behavior_labels.json)
+BEHAVIOR_CLASSES = load_label_map().class_ids
 
 def prepare_yolo_dataset(crops_dir, output_dir):
     """
@@ -78,8 +75,6 @@ def prepare_yolo_dataset(crops_dir, output_dir):
     return total_images
 
 if __name__ == "__main__":
-    import sys
-    
     if len(sys.argv) < 3:
         print("Usage: python prepare_yolo_from_crops.py <crops_dir> <output_dir>")
         print("\nExample:")
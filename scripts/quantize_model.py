@@ -0,0 +1,189 @@
+"""
+Post-training INT8 quantization of the pig behavior classifier.
+
+Exports the trained best.pt to ONNX, calibrates static INT8 quantization
+on a sample of the training crops and reports the accuracy change on the
+validation crops. The resulting .onnx file can be loaded directly by
+YOLOBehaviorClassifier (set YOLO_MODEL_PATH to it).
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import onnxruntime as ort
+from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.behavior_labels import load_label_map
+from src.inference_engines import OnnxClassifier, preprocess_frames
+
+try:
+    from tqdm import tqdm
+    TQDM_AVAILABLE = True
+except ImportError:
+    TQDM_AVAILABLE = False
+    def tqdm(iterable, desc="", total=None, unit=""):
+        return iterable
+
+# Configuration
+IMAGE_SIZE = 224
+CALIBRATION_IMAGES = 300
+EVAL_BATCH_SIZE = 32
+SEED = 0
+
+# Behavior classes (same order as the classifier)
+BEHAVIOR_CLASSES = load_label_map().class_ids
+
+IMAGE_PATTERNS = ("*.jpg", "*.png", "*.jpeg")
+
+
+def list_crops(split_dir):
+    """Return [(image_path, behavior_name)] for a crops split (behavior subfolders)."""
+    split_dir = Path(split_dir)
+    samples = []
+    for behavior_name in BEHAVIOR_CLASSES:
+        behavior_dir = split_dir / behavior_name
+        if not behavior_dir.exists():
+            continue
+        for pattern in IMAGE_PATTERNS:
+            samples.extend((path, behavior_name) for path in behavior_dir.glob(pattern))
+    return samples
+
+
+def export_onnx(model_path):
+    """Export a .pt model to FP32 ONNX with a dynamic batch dimension."""
+    from ultralytics import YOLO
+    model = YOLO(model_path)
+    return Path(model.export(format="onnx", imgsz=IMAGE_SIZE, dynamic=True))
+
+
+class CropCalibrationReader(CalibrationDataReader):
+    """Feeds preprocessed crop batches to the ONNX Runtime calibrator."""
+
+    def __init__(self, image_paths, input_name, batch_size=16):
+        self.image_paths = image_paths
+        self.input_name = input_name
+        self.batch_size = batch_size
+        self._batches = None
+
+    def _iter_batches(self):
+        for i in range(0, len(self.image_paths), self.batch_size):
+            images = [cv2.imread(str(p)) for p in self.image_paths[i:i + self.batch_size]]
+            images = [img for img in images if img is not None]
+            if images:
+                yield {self.input_name: preprocess_frames(images, IMAGE_SIZE)}
+
+    def get_next(self):
+        if self._batches is None:
+            self._batches = self._iter_batches()
+        return next(self._batches, None)
+
+    def rewind(self):
+        self._batches = None
+
+
+def quantize_int8(fp32_path, int8_path, calibration_paths):
+    """Run static INT8 quantization (QDQ, per-channel weights)."""
+    input_name = ort.InferenceSession(str(fp32_path), providers=["CPUExecutionProvider"]).get_inputs()[0].name
+    reader = CropCalibrationReader(calibration_paths, input_name)
+
+    quantize_static(
+        str(fp32_path),
+        str(int8_path),
+        reader,
+        quant_format=QuantFormat.QDQ,
+        per_channel=True,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8
+    )
+
+
+def evaluate(model_path, samples):
+    """Return (top-1 accuracy, seconds per image) of an ONNX model on labelled crops."""
+    model = OnnxClassifier(str(model_path))
+    # Map predicted indices to behavior names using the names stored in the export
+    names = model.names or {v: k for k, v in BEHAVIOR_CLASSES.items()}
+
+    correct = 0
+    total = 0
+    elapsed = 0.0
+    batches = range(0, len(samples), EVAL_BATCH_SIZE)
+    for i in tqdm(batches, desc=f"  {Path(model_path).name}", unit="batch"):
+        batch = samples[i:i + EVAL_BATCH_SIZE]
+        images, labels = [], []
+        for path, behavior_name in batch:
+            image = cv2.imread(str(path))
+            if image is not None:
+                images.append(image)
+                labels.append(behavior_name)
+        if not images:
+            continue
+
+        start = time.time()
+        results = model(images)
+        elapsed += time.time() - start
+
+        for result, label in zip(results, labels):
+            correct += names.get(result.probs.top1) == label
+            total += 1
+
+    return correct / max(1, total), elapsed / max(1, total)
+
+
+def main():
+    if len(sys.argv) < 3:
+        print("Usage: python quantize_model.py <model.pt> <crops_dir> [output.onnx]")
+        print("\n<crops_dir> must contain train/ and val/ behavior folders (see train_from_annotations.sh)")
+        print("\nExample:")
+        print("  python quantize_model.py pig_behavior_classification/yolov8_pig_behavior/weights/best.pt data/pig_crops")
+        sys.exit(1)
+
+    model_path = Path(sys.argv[1])
+    crops_dir = Path(sys.argv[2])
+    int8_path = Path(sys.argv[3]) if len(sys.argv) > 3 else model_path.with_name(f"{model_path.stem}_int8.onnx")
+
+    print("="*60)
+    print("INT8 Post-Training Quantization")
+    print("="*60)
+    print()
+
+    train_samples = list_crops(crops_dir / "train")
+    val_samples = list_crops(crops_dir / "val")
+    if not train_samples or not val_samples:
+        print(f"Error: Expected behavior folders under {crops_dir / 'train'} and {crops_dir / 'val'}")
+        sys.exit(1)
+
+    random.seed(SEED)
+    calibration_paths = [path for path, _ in random.sample(train_samples, min(CALIBRATION_IMAGES, len(train_samples)))]
+
+    print(f"Exporting {model_path} to ONNX...")
+    fp32_path = export_onnx(str(model_path))
+    print(f"  FP32 model: {fp32_path}")
+
+    print(f"\nCalibrating on {len(calibration_paths)} training crops...")
+    quantize_int8(fp32_path, int8_path, calibration_paths)
+    print(f"  INT8 model: {int8_path}")
+
+    print(f"\nEvaluating on {len(val_samples)} validation crops...")
+    fp32_acc, fp32_latency = evaluate(fp32_path, val_samples)
+    int8_acc, int8_latency = evaluate(int8_path, val_samples)
+
+    fp32_size = fp32_path.stat().st_size / 1024 / 1024
+    int8_size = int8_path.stat().st_size / 1024 / 1024
+
+    print()
+    print("Results:")
+    print(f"  {'':10s} {'Top-1':>8s} {'ms/img':>8s} {'Size MB':>8s}")
+    print(f"  {'FP32':10s} {fp32_acc:8.2%} {fp32_latency * 1000:8.2f} {fp32_size:8.1f}")
+    print(f"  {'INT8':10s} {int8_acc:8.2%} {int8_latency * 1000:8.2f} {int8_size:8.1f}")
+    print(f"\n  Accuracy delta: {(int8_acc - fp32_acc) * 100:+.2f} points")
+    print(f"  Speedup:        {fp32_latency / max(int8_latency, 1e-9):.2f}x")
+
+    print("\nTo use this model, set:")
+    print(f"  export YOLO_MODEL_PATH=\"{int8_path}\"")
+
+
+if __name__ == "__main__":
+    main()
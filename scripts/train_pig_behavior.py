@@ -4,6 +4,7 @@ Train YOLO model for pig behavior classification.
 from ultralytics import YOLO
 import torch
 import os
+import sys
 from pathlib import Path
 import time
 from datetime import datetime, timedelta
@@ -13,13 +14,115 @@ try:
 except ImportError:
     TQDM_AVAILABLE = False
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.crop_shards import INDEX_SUFFIX, CropShardDataset
+
 # Configuration
 DATA_YAML = "data/yolo_dataset/data.yaml"
+CROP_SHARDS = "data/crop_shards"  # train/ and val/ crop shards; used instead of DATA_YAML when present
 EPOCHS = 100
 BATCH_SIZE = 16
 IMAGE_SIZE = 224
 MODEL_SIZE = "n"  # n=nano, s=small, m=medium, l=large, x=xlarge
 
+def has_crop_shards(shard_root):
+    """True if shard_root has train/ and val/ crop shard indexes."""
+    return all(any((Path(shard_root) / split).glob(f"*{INDEX_SUFFIX}")) for split in ("train", "val"))
+
+def shard_trainer_class():
+    """
+    ClassificationTrainer that reads crops from tar shards (src/crop_shards.py)
+    instead of an image folder per class.
+    
+    Supports both trainer APIs where get_dataset(self) resolves the dataset:
+    8.1.39 up to 8.3.131 return (train, val) paths and keep the dataset dict
+    in self.data, 8.3.132 and later return the dict itself. Earlier releases
+    have a static get_dataset(data) and check for class folders before it is
+    called, so they cannot read shards.
+    
+    The final validation of best.pt is skipped, since ultralytics' validator
+    only reads image folders; use validate_on_shards after training.
+    
+    Raises:
+        RuntimeError: If the installed ultralytics is older than 8.1.39
+    """
+    import cv2
+    from PIL import Image
+    from ultralytics import __version__ as ultralytics_version
+    from ultralytics.data.augment import classify_augmentations, classify_transforms
+    from ultralytics.models.yolo.classify import ClassificationTrainer
+    from ultralytics.utils.checks import check_version
+    from ultralytics.utils.torch_utils import strip_optimizer
+    
+    if not check_version(ultralytics_version, ">=8.1.39"):
+        raise RuntimeError(f"Training from crop shards needs ultralytics 8.1.39+, found {ultralytics_version}. "
+                           "Upgrade ultralytics or unpack the shards with scripts/convert_crops.py")
+    # From 8.3.132 the trainer assigns the result of get_dataset() to self.data
+    returns_dict = check_version(ultralytics_version, ">=8.3.132")
+    
+    class ShardClassificationDataset(torch.utils.data.Dataset):
+        def __init__(self, shard_dir, imgsz, augment):
+            self.crops = CropShardDataset(shard_dir)
+            # Same transforms as ultralytics' folder-based ClassificationDataset
+            self.torch_transforms = classify_augmentations(size=imgsz) if augment else classify_transforms(size=imgsz)
+        
+        def __len__(self):
+            return len(self.crops)
+        
+        def __getitem__(self, i):
+            image, class_id = self.crops[i]
+            sample = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+            return {"img": self.torch_transforms(sample), "cls": class_id}
+    
+    class ShardClassificationTrainer(ClassificationTrainer):
+        def get_dataset(self):
+            shard_root = Path(self.args.data)
+            names = CropShardDataset(shard_root / "train").names
+            self.data = {
+                "train": str(shard_root / "train"),
+                "val": str(shard_root / "val"),
+                "nc": len(names),
+                "names": names,
+                "channels": 3
+            }
+            if returns_dict:
+                return self.data
+            return self.data["train"], self.data["val"]
+        
+        def build_dataset(self, img_path, mode="train", batch=None):
+            return ShardClassificationDataset(img_path, self.args.imgsz, augment=mode == "train")
+        
+        def final_eval(self):
+            for f in self.last, self.best:
+                if f.exists():
+                    strip_optimizer(f)
+    
+    return ShardClassificationTrainer
+
+def validate_on_shards(model_path, shard_dir, batch_size=BATCH_SIZE):
+    """
+    Top-1 and top-5 accuracy of a trained model on a crop shard split.
+    
+    model.val() only reads image folders, so the crops are classified with
+    predict() in batches instead.
+    
+    Returns:
+        (top1, top5) as fractions of the crops
+    """
+    model = YOLO(model_path)
+    crops = CropShardDataset(shard_dir)
+    top1 = top5 = 0
+    try:
+        for start in range(0, len(crops), batch_size):
+            samples = [crops[i] for i in range(start, min(start + batch_size, len(crops)))]
+            results = model.predict([image for image, _ in samples], imgsz=IMAGE_SIZE, verbose=False)
+            for result, (_, class_id) in zip(results, samples):
+                top1 += result.probs.top1 == class_id
+                top5 += class_id in result.probs.top5
+    finally:
+        crops.close()
+    return top1 / len(crops), top5 / len(crops)
+
 def main():
     print("="*60)
     print("YOLO Pig Behavior Classification Training")
@@ -27,14 +130,18 @@ def main():
     print()
     
     # Check if dataset exists
+    use_shards = has_crop_shards(CROP_SHARDS)
+    data = CROP_SHARDS if use_shards else DATA_YAML
     data_yaml_path = Path(DATA_YAML)
-    if not data_yaml_path.exists():
-        print(f"Error: Dataset not found at {DATA_YAML}")
+    if not use_shards and not data_yaml_path.exists():
+        print(f"Error: Dataset not found at {DATA_YAML} or {CROP_SHARDS}")
         print("Please prepare your dataset first.")
         print("\nSteps:")
         print("1. Organize videos in data/pig_training/")
         print("2. Extract frames: python scripts/extract_frames.py ...")
         print("3. Prepare dataset: python scripts/prepare_yolo_dataset.py ...")
+        print(f"   or write crop shards to {CROP_SHARDS}/train and {CROP_SHARDS}/val:")
+        print("   python scripts/parse_annotations.py <video_dir> <json_dir> <shard_dir> 0 shards")
         return
     
     # Check device
@@ -59,7 +166,7 @@ def main():
     print(f"  Epochs: {EPOCHS}")
     print(f"  Batch size: {BATCH_SIZE}")
     print(f"  Image size: {IMAGE_SIZE}")
-    print(f"  Data: {DATA_YAML}")
+    print(f"  Data: {data}{' (crop shards)' if use_shards else ''}")
     print(f"  Device: {device}")
     print()
     
@@ -76,7 +183,8 @@ def main():
     
     try:
         results = model.train(
-            data=DATA_YAML,
+            data=data,
+            trainer=shard_trainer_class() if use_shards else None,
             epochs=EPOCHS,
             imgsz=IMAGE_SIZE,
             batch=BATCH_SIZE,
@@ -99,20 +207,29 @@ def main():
         print(f"Best model saved at: {results.save_dir}")
         
         # Validate
-        print("\nRunning validation...")
-        metrics = model.val()
-        print(f"\nValidation Results:")
-        print(f"  Top-1 Accuracy: {metrics.top1:.2f}%")
-        print(f"  Top-5 Accuracy: {metrics.top5:.2f}%")
+        best_model_path = os.path.join(results.save_dir, "weights", "best.pt")
+        if use_shards:
+            print("\nRunning validation of the best weights on the val shards...")
+            top1, top5 = validate_on_shards(best_model_path, Path(CROP_SHARDS) / "val")
+            print(f"\nValidation Results:")
+            print(f"  Top-1 Accuracy: {top1:.2f}")
+            print(f"  Top-5 Accuracy: {top5:.2f}")
+        else:
+            print("\nRunning validation...")
+            metrics = model.val()
+            print(f"\nValidation Results:")
+            print(f"  Top-1 Accuracy: {metrics.top1:.2f}%")
+            print(f"  Top-5 Accuracy: {metrics.top5:.2f}%")
         
         # Save model path
-        best_model_path = os.path.join(results.save_dir, "weights", "best.pt")
         if os.path.exists(best_model_path):
             print(f"\nBest model path: {best_model_path}")
             print("\nTo use this model, set:")
             print(f"  export YOLO_MODEL_PATH=\"{best_model_path}\"")
             print("\nOr use the default path:")
             print(f"  export YOLO_MODEL_PATH=\"pig_behavior_classification/yolov8_pig_behavior/weights/best.pt\"")
+            print("\nFor faster CPU inference, quantize to INT8:")
+            print(f"  python scripts/quantize_model.py \"{best_model_path}\" data/pig_crops")
         else:
             print(f"\nWarning: Best model not found at {best_model_path}")
             print("Check the weights directory in the results folder.")
@@ -0,0 +1,349 @@
+"""
+Annotation Stream for FaunaVision
+Incremental reader for JSON tracking exports. Yields one compact record
+per tracked pig (NumPy arrays of frame numbers, boxes and flags plus
+int-coded behavior labels) instead of materializing the whole document as
+Python objects, so multi-hour exports parse in bounded memory.
+"""
+
+import json
+from array import array
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import logging
+
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Top-level keys holding the list of tracked pigs, in order of preference
+LAYOUT_KEYS = ("objects", "pigs", "annotations", "tracks")
+
+# Field aliases used by the supported layouts
+ID_FIELDS = ("tracking_id", "id")
+FRAME_FIELDS = ("frames",)
+BBOX_FIELDS = ("bounding_box", "bbox")
+LABEL_FIELDS = ("behavior_label", "label")
+VISIBILITY_FIELDS = ("visibility", "visibility_flag")
+GROUND_TRUTH_FIELDS = ("ground_truth", "ground_truth_flag")
+
+
+class LabelCodes:
+    """
+    Interns raw behavior labels as small integer codes.
+
+    Records store a code per frame instead of a string; `labels[code]`
+    gives the raw label back. Sharing one instance across files keeps the
+    codes consistent for a whole run.
+    """
+
+    def __init__(self):
+        self.labels: List[str] = []
+        self._codes: Dict[str, int] = {}
+
+    def code(self, label) -> int:
+        """Code of a raw label, assigning the next free one if new."""
+        label = "" if label is None else str(label)
+        code = self._codes.get(label)
+        if code is None:
+            code = len(self.labels)
+            self._codes[label] = code
+            self.labels.append(label)
+        return code
+
+    def __getitem__(self, code: int) -> str:
+        return self.labels[code]
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+
+class AnnotationTrack(NamedTuple):
+    """All annotated frames of one tracked pig."""
+    tracking_id: object
+    frames: np.ndarray          # (N,) int64 frame numbers
+    bboxes: np.ndarray          # (N, 4) float32 boxes as annotated; NaN rows are missing boxes
+    labels: np.ndarray          # (N,) int32 codes into LabelCodes
+    visibility: np.ndarray      # (N,) float32, 0-1
+    ground_truth: np.ndarray    # (N,) bool
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+
+def _bbox_values(bbox) -> Tuple[float, float, float, float]:
+    """Four box values from a list or an {x, y, width, height} dict (NaN if missing)."""
+    if isinstance(bbox, dict):
+        x = float(bbox.get('x', 0))
+        y = float(bbox.get('y', 0))
+        # Convert to [x1, y1, x2, y2] format
+        return x, y, x + float(bbox.get('width', 0)), y + float(bbox.get('height', 0))
+    if isinstance(bbox, (list, tuple)) and len(bbox) == 4:
+        return tuple(float(value) for value in bbox)
+    return (np.nan,) * 4
+
+
+class _TrackBuilder:
+    """Accumulates one pig's fields into typed arrays as they are parsed."""
+
+    def __init__(self, codes: LabelCodes):
+        self.codes = codes
+        self.ids = {}
+        self.frames = array('q')
+        self.bboxes = array('f')
+        self.labels = array('i')
+        self.visibility = array('f')
+        self.ground_truth = array('b')
+        # Single values given for the whole track (old format)
+        self.label = None
+        self.track_visibility = None
+        self.track_ground_truth = None
+
+    def set(self, field: str, value):
+        """A field holding a single value."""
+        if field in ID_FIELDS:
+            self.ids[field] = value
+        elif field in LABEL_FIELDS and isinstance(value, str):
+            self.label = self.codes.code(value)
+        elif field in VISIBILITY_FIELDS and isinstance(value, (int, float)):
+            self.track_visibility = float(value)
+        elif field in GROUND_TRUTH_FIELDS and isinstance(value, bool):
+            self.track_ground_truth = value
+
+    def append(self, field: str, value):
+        """One element of a list field."""
+        if field in FRAME_FIELDS:
+            if isinstance(value, dict):
+                self.add_frame(value)
+            else:
+                self.frames.append(int(value))
+        elif field in BBOX_FIELDS:
+            self.bboxes.extend(_bbox_values(value))
+        elif field in LABEL_FIELDS:
+            self.labels.append(self.codes.code(value))
+        elif field in VISIBILITY_FIELDS:
+            self.visibility.append(float(value))
+        elif field in GROUND_TRUTH_FIELDS:
+            self.ground_truth.append(bool(value))
+
+    def add_frame(self, frame_obj: Dict):
+        """A per-frame object of the 'objects' layout."""
+        self.frames.append(int(frame_obj.get('frameNumber', frame_obj.get('frame', 0))))
+        self.bboxes.extend(_bbox_values(frame_obj.get('bbox')))
+        # Note: "behaviour" in the tracking export
+        self.labels.append(self.codes.code(frame_obj.get('behaviour', frame_obj.get('behavior', ''))))
+        self.visibility.append(1.0 if frame_obj.get('visible', True) else 0.0)
+        self.ground_truth.append(bool(frame_obj.get('isGroundTruth', frame_obj.get('ground_truth', True))))
+
+    def finish(self, id_fields: Tuple[str, ...] = ID_FIELDS) -> AnnotationTrack:
+        """
+        Build the record. Frames without a box or a label are dropped;
+        missing visibility and ground-truth flags default to visible and true.
+        """
+        frames = np.frombuffer(self.frames, dtype=np.int64)
+        bboxes = np.frombuffer(self.bboxes, dtype=np.float32).reshape(-1, 4)
+        if self.label is not None and not self.labels:
+            labels = np.full(len(frames), self.label, dtype=np.int32)
+        else:
+            labels = np.frombuffer(self.labels, dtype=np.int32)
+
+        n = min(len(frames), len(bboxes), len(labels))
+        visibility = np.ones(n, dtype=np.float32)
+        if self.track_visibility is not None:
+            visibility[:] = self.track_visibility
+        given = min(n, len(self.visibility))
+        visibility[:given] = np.frombuffer(self.visibility, dtype=np.float32)[:given]
+
+        ground_truth = np.ones(n, dtype=bool)
+        if self.track_ground_truth is not None:
+            ground_truth[:] = self.track_ground_truth
+        given = min(n, len(self.ground_truth))
+        ground_truth[:given] = np.frombuffer(self.ground_truth, dtype=np.int8)[:given] != 0
+
+        tracking_id = next((self.ids[field] for field in id_fields if field in self.ids), "unknown")
+        return AnnotationTrack(
+            tracking_id,
+            frames[:n].copy(),
+            bboxes[:n].copy(),
+            labels[:n].copy(),
+            visibility,
+            ground_truth
+        )
+
+
+def compact_track(obj: Dict, codes: Optional[LabelCodes] = None, layout: Optional[str] = None) -> AnnotationTrack:
+    """
+    Convert one already-parsed pig object to a compact record.
+
+    Args:
+        obj: Pig object in any supported layout
+        codes: Label codes to use (default: a new LabelCodes)
+        layout: Layout the object came from ("objects" prefers 'id' over 'tracking_id')
+    """
+    builder = _TrackBuilder(codes if codes is not None else LabelCodes())
+    for field, value in obj.items():
+        if isinstance(value, list):
+            for element in value:
+                builder.append(field, element)
+        else:
+            builder.set(field, value)
+    return builder.finish(_id_fields(layout))
+
+
+def _id_fields(layout: Optional[str]) -> Tuple[str, ...]:
+    return ("id", "tracking_id") if layout == "objects" else ID_FIELDS
+
+
+def _iter_loaded(json_path: str, codes: LabelCodes) -> Iterator[AnnotationTrack]:
+    """Fallback without ijson: load the document, then compact one pig at a time."""
+    with open(json_path, 'r') as f:
+        data = json.load(f)
+
+    layout = None
+    if isinstance(data, dict):
+        layout = next((key for key in LAYOUT_KEYS if key in data), None)
+        if layout is not None:
+            items = data.pop(layout)
+            if not isinstance(items, list):
+                return
+        elif 'tracking_id' in data or 'id' in data:
+            items = [data]
+        else:
+            logger.warning(f"Unrecognized JSON structure in {json_path}")
+            return
+    elif isinstance(data, list):
+        items = data
+    else:
+        return
+    del data
+
+    # Drop each pig's Python objects as soon as its record is built
+    items.reverse()
+    while items:
+        yield compact_track(items.pop(), codes, layout)
+
+
+def _iter_streamed(json_path: str, codes: LabelCodes) -> Iterator[AnnotationTrack]:
+    """
+    Parse with ijson events, feeding fields straight into a _TrackBuilder.
+
+    Only the element being parsed (one frame object or one box) is ever
+    held as Python objects. The first layout key found at the top level
+    is used.
+    """
+    with open(json_path, 'rb') as f:
+        events = ijson.parse(f, use_float=True)
+
+        item_prefix = None
+        layout = None
+        for prefix, event, value in events:
+            if prefix == '' and event == 'start_array':
+                item_prefix = 'item'
+                break
+            if prefix == '' and event == 'map_key' and value in LAYOUT_KEYS:
+                layout = value
+                item_prefix = f'{value}.item'
+                break
+        if item_prefix is None:
+            # Single pig object or an unknown structure; small enough to load
+            yield from _iter_loaded(json_path, codes)
+            return
+
+        list_prefix = item_prefix[:-len('.item')] if '.' in item_prefix else ''
+        field_start = len(item_prefix) + 1
+        track = None
+        element = None         # ObjectBuilder for a list element or nested value
+        element_prefix = None
+        element_field = None
+        element_in_list = False
+
+        for prefix, event, value in events:
+            if element is not None:
+                element.event(event, value)
+                if prefix == element_prefix and event in ('end_map', 'end_array'):
+                    if element_in_list:
+                        track.append(element_field, element.value)
+                    else:
+                        track.set(element_field, element.value)
+                    element = None
+                continue
+
+            if prefix == item_prefix:
+                if event == 'start_map':
+                    track = _TrackBuilder(codes)
+                elif event == 'end_map' and track is not None:
+                    yield track.finish(_id_fields(layout))
+                    track = None
+                continue
+            if prefix == list_prefix and event == 'end_array':
+                return
+            if track is None or not prefix.startswith(item_prefix + '.'):
+                continue
+
+            field, _, rest = prefix[field_start:].partition('.')
+            in_list = rest == 'item'
+            if rest and not in_list:
+                continue
+            if event in ('start_map', 'start_array'):
+                if not rest and event == 'start_array':
+                    # The field's own list; its elements follow
+                    continue
+                element = ijson.ObjectBuilder()
+                element.event(event, value)
+                element_prefix = prefix
+                element_field = field
+                element_in_list = in_list
+            elif event in ('string', 'number', 'boolean', 'null'):
+                if in_list:
+                    track.append(field, value)
+                else:
+                    track.set(field, value)
+
+
+def iter_annotation_tracks(json_path: str, codes: Optional[LabelCodes] = None) -> Iterator[AnnotationTrack]:
+    """
+    Read a tracking export one pig at a time.
+
+    Supports a top-level list of pigs, a dict with an 'objects', 'pigs',
+    'annotations' or 'tracks' list, and a single pig object. With ijson
+    installed the file is streamed; otherwise it is loaded with json and
+    converted pig by pig.
+
+    Args:
+        json_path: Path to JSON annotation file
+        codes: Label codes shared across files (default: a new LabelCodes)
+
+    Yields:
+        AnnotationTrack per pig
+    """
+    codes = codes if codes is not None else LabelCodes()
+    if IJSON_AVAILABLE:
+        yield from _iter_streamed(json_path, codes)
+    else:
+        yield from _iter_loaded(json_path, codes)
+
+
+def iter_annotation_frames(
+    tracks: Iterable[AnnotationTrack]
+) -> Iterator[Tuple[object, int, np.ndarray, int, float, bool]]:
+    """
+    Flatten records to per-frame rows.
+
+    Yields:
+        (tracking_id, frame, bbox, label_code, visibility, ground_truth)
+    """
+    for track in tracks:
+        for i in range(len(track)):
+            yield (
+                track.tracking_id,
+                int(track.frames[i]),
+                track.bboxes[i],
+                int(track.labels[i]),
+                float(track.visibility[i]),
+                bool(track.ground_truth[i])
+            )
@@ -0,0 +1,140 @@
+"""
+Behavior Labels for FaunaVision
+Single source of the behavior classes, their class IDs, the distress
+behaviors and the aliases that map raw annotation labels onto the classes.
+Loaded once from config/behavior_labels.json and shared by the annotation
+parser, the dataset scripts and the classifier.
+"""
+
+import json
+import os
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LABELS_PATH = Path(__file__).parent.parent / "config" / "behavior_labels.json"
+
+# Used when the config file is missing (e.g. a backend deployed without config/)
+DEFAULT_CLASSES = ["tail_biting", "ear_biting", "aggression", "eating", "sleeping", "rooting"]
+DEFAULT_DISTRESS = ["tail_biting", "ear_biting", "aggression"]
+
+
+class BehaviorLabelMap:
+    """
+    Maps raw behavior labels to class names and IDs.
+
+    A raw label is lowercased and stripped, then looked up as a class name
+    or an alias. Results are cached per raw label, so each distinct label
+    is normalized once per run however many annotations carry it.
+    """
+
+    def __init__(
+        self,
+        classes: Iterable[str],
+        distress: Iterable[str] = (),
+        aliases: Optional[Dict[str, str]] = None
+    ):
+        """
+        Initialize label map.
+
+        Args:
+            classes: Class names; the position of each is its class ID
+            distress: Classes that indicate distress
+            aliases: Raw label -> class name
+
+        Raises:
+            ValueError: If a distress behavior or alias target is not a class
+        """
+        self.classes: List[str] = list(classes)
+        self.class_ids: Dict[str, int] = {name: class_id for class_id, name in enumerate(self.classes)}
+        self.names: Dict[int, str] = dict(enumerate(self.classes))
+        self.distress_behaviors: List[str] = list(distress)
+
+        self.aliases: Dict[str, str] = {name: name for name in self.classes}
+        for raw, name in (aliases or {}).items():
+            if name not in self.class_ids:
+                raise ValueError(f"Alias '{raw}' maps to unknown class '{name}'")
+            self.aliases[raw.lower().strip()] = name
+        for name in self.distress_behaviors:
+            if name not in self.class_ids:
+                raise ValueError(f"Distress behavior '{name}' is not a class")
+
+        self._cache: Dict[str, Optional[str]] = {}
+
+    @classmethod
+    def from_file(cls, path: Optional[str] = None) -> "BehaviorLabelMap":
+        """
+        Load a label map from JSON with "classes", "distress" and "aliases".
+
+        Args:
+            path: Config file (default: BEHAVIOR_LABELS_PATH env var, then
+                  config/behavior_labels.json; built-in classes if neither exists)
+        """
+        path = path or os.getenv("BEHAVIOR_LABELS_PATH") or DEFAULT_LABELS_PATH
+        if not Path(path).exists():
+            logger.warning(f"Behavior label config not found: {path}. Using built-in classes.")
+            return cls(DEFAULT_CLASSES, DEFAULT_DISTRESS)
+
+        with open(path, 'r') as f:
+            config = json.load(f)
+        return cls(config["classes"], config.get("distress", ()), config.get("aliases"))
+
+    def normalize(self, label) -> Optional[str]:
+        """Class name of a raw label, or None if it is unknown."""
+        try:
+            return self._cache[label]
+        except KeyError:
+            name = self.aliases.get(str(label).lower().strip())
+            self._cache[label] = name
+            return name
+
+    def class_id(self, label) -> Optional[int]:
+        """Class ID of a raw label, or None if it is unknown."""
+        name = self.normalize(label)
+        return None if name is None else self.class_ids[name]
+
+    def code_table(self, labels: Iterable[str]) -> np.ndarray:
+        """
+        Class ID per interned label code (see annotation_stream.LabelCodes).
+
+        Args:
+            labels: Raw labels in code order
+
+        Returns:
+            int32 array where entry i is the class ID of label code i, or -1
+            if unknown; index it with a record's label codes
+        """
+        return np.array(
+            [-1 if class_id is None else class_id for class_id in map(self.class_id, labels)],
+            dtype=np.int32
+        )
+
+
+@lru_cache(maxsize=None)
+def load_label_map(path: Optional[str] = None) -> BehaviorLabelMap:
+    """Shared label map, loaded once per process (see BehaviorLabelMap.from_file)."""
+    return BehaviorLabelMap.from_file(path)
+
+
+def format_unknown_summary(unknown_labels: Counter, limit: int = 20) -> str:
+    """
+    Summarize skipped unknown labels, most frequent first.
+
+    Args:
+        unknown_labels: Raw label -> number of annotations skipped
+        limit: Labels listed before the rest is folded into one line
+    """
+    total = sum(unknown_labels.values())
+    lines = [f"Skipped {total} annotations with {len(unknown_labels)} unknown behavior labels:"]
+    for label, count in unknown_labels.most_common(limit):
+        lines.append(f"  '{label}': {count}")
+    if len(unknown_labels) > limit:
+        rest = total - sum(count for _, count in unknown_labels.most_common(limit))
+        lines.append(f"  ... {len(unknown_labels) - limit} more labels ({rest} annotations)")
+    return "\n".join(lines)
@@ -0,0 +1,131 @@
+"""
+Behavior Timeline for FaunaVision
+Run-length encodes per-frame behavior predictions into segments of
+(start_time, end_time, behavior, mean_confidence), so a video's events can
+be reviewed without running inference again.
+"""
+
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+
+class TimelineSegment(NamedTuple):
+    """A run of consecutive sampled frames with the same behavior."""
+    start_time: float       # Seconds
+    end_time: float         # Seconds
+    behavior: str
+    mean_confidence: float
+    frames: int             # Sampled frames in the run
+
+
+class BehaviorTimeline:
+    """
+    Builds run-length-encoded segments from time-ordered predictions.
+
+    Each sampled frame stands for `sample_duration` seconds of video, or
+    for its own duration when samples are unevenly spaced (e.g. snapped to
+    keyframes). A segment is extended while the behavior stays the same
+    and the frames are contiguous; frames dropped in between (e.g. below
+    the confidence threshold) start a new segment.
+    """
+
+    def __init__(self, sample_duration: float, duration: Optional[float] = None):
+        """
+        Initialize timeline.
+
+        Args:
+            sample_duration: Seconds of video covered by one sampled frame
+                             (default for add)
+            duration: Video length in seconds; segment ends are clipped to it
+        """
+        self.sample_duration = sample_duration
+        self.duration = duration
+        self.segments: List[TimelineSegment] = []
+
+        self._confidence_sum = 0.0
+        self._seconds: Dict[str, float] = {}
+
+    def add(self, timestamp: float, behavior: str, confidence: float, sample_duration: Optional[float] = None):
+        """
+        Append one prediction. Timestamps must not decrease.
+
+        Args:
+            timestamp: Position of the frame in seconds
+            behavior: Predicted behavior
+            confidence: Prediction confidence
+            sample_duration: Seconds of video this frame stands for
+                             (default: the timeline's sample_duration)
+        """
+        sample_duration = sample_duration or self.sample_duration
+        self._seconds[behavior] = self._seconds.get(behavior, 0.0) + sample_duration
+
+        end_time = timestamp + sample_duration
+        if self.duration:
+            end_time = min(end_time, max(self.duration, timestamp))
+
+        last = self.segments[-1] if self.segments else None
+        # Allow for frame-rounding jitter between samples
+        contiguous = last is not None and timestamp - last.end_time <= self.sample_duration / 2
+        if last is not None and last.behavior == behavior and contiguous:
+            self._confidence_sum += confidence
+            frames = last.frames + 1
+            self.segments[-1] = last._replace(
+                end_time=end_time,
+                mean_confidence=self._confidence_sum / frames,
+                frames=frames
+            )
+        else:
+            self._confidence_sum = confidence
+            self.segments.append(TimelineSegment(timestamp, end_time, behavior, confidence, 1))
+
+    def frame_counts(self) -> Dict[str, int]:
+        """Sampled frames per behavior."""
+        counts = {}
+        for segment in self.segments:
+            counts[segment.behavior] = counts.get(segment.behavior, 0) + segment.frames
+        return counts
+
+    def seconds(self) -> Dict[str, float]:
+        """Seconds of video per behavior (sum of the sample durations)."""
+        return dict(self._seconds)
+
+    def percentages(self, behaviors: Iterable[str]) -> Dict[str, float]:
+        """
+        Share of sampled time spent in each behavior.
+
+        With evenly spaced samples this is the share of sampled frames;
+        otherwise each frame is weighted by the time it stands for.
+
+        Args:
+            behaviors: Behaviors to report; frames of other labels (such as
+                       "unknown") are left out of the total
+
+        Returns:
+            Percentages summing to 1.0, or an empty dict if no frame has
+            one of the behaviors
+        """
+        behaviors = list(behaviors)
+        total = sum(self._seconds.get(behavior, 0.0) for behavior in behaviors)
+        if total == 0:
+            return {}
+        return {behavior: self._seconds.get(behavior, 0.0) / total for behavior in behaviors}
+
+    def to_list(self, precision: int = 3) -> List[Dict]:
+        """
+        JSON-friendly segments.
+
+        Args:
+            precision: Decimals kept for times and confidences
+        """
+        return [
+            {
+                "start_time": round(segment.start_time, precision),
+                "end_time": round(segment.end_time, precision),
+                "behavior": segment.behavior,
+                "mean_confidence": round(segment.mean_confidence, precision),
+                "frames": segment.frames
+            }
+            for segment in self.segments
+        ]
+
+    def __len__(self) -> int:
+        return len(self.segments)
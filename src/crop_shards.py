@@ -0,0 +1,339 @@
+"""
+Crop Shards for FaunaVision
+Stores labelled pig crops in a few large tar shards instead of one JPEG
+file per crop. Each shard holds `<key>.jpg` and `<key>.cls` members
+(WebDataset layout); a JSON index next to the shards records where every
+image starts in its shard, so samples are read with one seek and one read.
+"""
+
+import io
+import json
+import os
+import tarfile
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+INDEX_SUFFIX = ".index.json"
+INDEX_VERSION = 1
+
+IMAGE_PATTERNS = ("*.jpg", "*.jpeg", "*.png")
+
+
+def encode_jpeg(image: np.ndarray, quality: int = 95) -> bytes:
+    """Encode a BGR image as JPEG."""
+    ok, buffer = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError("Could not encode image as JPEG")
+    return buffer.tobytes()
+
+
+class CropShardWriter:
+    """
+    Appends crops to numbered tar shards and writes their index on close.
+
+    Shards are named `<prefix>-00000.tar`, `<prefix>-00001.tar`, ... and
+    the index `<prefix>.index.json`. The index is written last, so shards
+    of an interrupted writer are ignored by CropShardDataset and replaced
+    when the same prefix is written again.
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        classes: List[str],
+        prefix: str = "crops",
+        max_samples: int = 10000,
+        max_bytes: int = 1 << 30,
+        jpeg_quality: int = 95
+    ):
+        """
+        Initialize shard writer.
+
+        Args:
+            output_dir: Directory for shards and index
+            classes: Class names; a crop's class ID is its position
+            prefix: Name prefix of this writer's shards and index; use a
+                    distinct prefix per concurrent writer
+            max_samples: Crops per shard before starting a new one
+            max_bytes: Shard size in bytes before starting a new one
+            jpeg_quality: Quality used when encoding image arrays
+        """
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.classes = list(classes)
+        self.class_ids = {name: class_id for class_id, name in enumerate(self.classes)}
+        self.prefix = prefix
+        self.max_samples = max_samples
+        self.max_bytes = max_bytes
+        self.jpeg_quality = jpeg_quality
+
+        self.shards: List[str] = []
+        self._keys: List[str] = []
+        self._shard = []
+        self._offset = []
+        self._size = []
+        self._class = []
+        self._tar = None
+        self._shard_samples = 0
+
+    @property
+    def index_path(self) -> Path:
+        return self.output_dir / f"{self.prefix}{INDEX_SUFFIX}"
+
+    def _next_shard(self):
+        if self._tar is not None:
+            self._tar.close()
+        name = f"{self.prefix}-{len(self.shards):05d}.tar"
+        self._tar = tarfile.open(self.output_dir / name, "w")
+        self.shards.append(name)
+        self._shard_samples = 0
+
+    def _add_member(self, name: str, data: bytes) -> int:
+        """Append one member and return the offset of its data in the shard."""
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = int(time.time())
+        header = info.tobuf(self._tar.format, self._tar.encoding, self._tar.errors)
+        data_offset = self._tar.offset + len(header)
+        self._tar.addfile(info, io.BytesIO(data))
+        return data_offset
+
+    def add(self, key: str, image, behavior: str):
+        """
+        Add one crop.
+
+        Args:
+            key: Unique sample name (e.g. "<video>_pig<id>_frame<n>")
+            image: BGR image array, or already encoded JPEG bytes
+            behavior: Class name
+
+        Raises:
+            KeyError: If behavior is not one of the classes
+        """
+        class_id = self.class_ids[behavior]
+        data = encode_jpeg(image, self.jpeg_quality) if isinstance(image, np.ndarray) else bytes(image)
+
+        if (self._tar is None or self._shard_samples >= self.max_samples
+                or self._tar.offset + len(data) > self.max_bytes):
+            self._next_shard()
+
+        offset = self._add_member(f"{key}.jpg", data)
+        self._add_member(f"{key}.cls", str(class_id).encode())
+
+        self._keys.append(key)
+        self._shard.append(len(self.shards) - 1)
+        self._offset.append(offset)
+        self._size.append(len(data))
+        self._class.append(class_id)
+        self._shard_samples += 1
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def close(self) -> Optional[Path]:
+        """
+        Finish the last shard and write the index.
+
+        Returns:
+            Index path, or None if no crop was added
+        """
+        if self._tar is not None:
+            self._tar.close()
+            self._tar = None
+        if not self._keys:
+            return None
+
+        index = {
+            "version": INDEX_VERSION,
+            "classes": self.classes,
+            "shards": self.shards,
+            # Columns, one entry per sample
+            "samples": {
+                "key": self._keys,
+                "shard": self._shard,
+                "offset": self._offset,
+                "size": self._size,
+                "class": self._class
+            }
+        }
+        tmp_path = self.index_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(index, f, separators=(",", ":"))
+        os.replace(tmp_path, self.index_path)
+        return self.index_path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        elif self._tar is not None:
+            # Leave no index, so the partial shards are never read
+            self._tar.close()
+            self._tar = None
+
+
+class CropShardDataset:
+    """
+    Random-access reader over every shard index in a directory.
+
+    `dataset[i]` returns (BGR image, class ID). Shard files are opened
+    lazily per process, so the dataset can be handed to DataLoader workers.
+    """
+
+    def __init__(self, shard_dir: str):
+        """
+        Initialize dataset.
+
+        Args:
+            shard_dir: Directory with shards and their *.index.json files
+
+        Raises:
+            FileNotFoundError: If the directory holds no index
+            ValueError: If indexes disagree on the classes
+        """
+        self.shard_dir = Path(shard_dir)
+        index_paths = sorted(self.shard_dir.glob(f"*{INDEX_SUFFIX}"))
+        if not index_paths:
+            raise FileNotFoundError(f"No crop shard index in {shard_dir}")
+
+        self.classes: Optional[List[str]] = None
+        self.shards: List[Path] = []
+        keys, shards, offsets, sizes, labels = [], [], [], [], []
+        for index_path in index_paths:
+            with open(index_path, "r") as f:
+                index = json.load(f)
+            if self.classes is None:
+                self.classes = index["classes"]
+            elif index["classes"] != self.classes:
+                raise ValueError(f"{index_path.name} has classes {index['classes']}, expected {self.classes}")
+
+            samples = index["samples"]
+            keys.extend(samples["key"])
+            shards.append(np.asarray(samples["shard"], dtype=np.int32) + len(self.shards))
+            offsets.append(np.asarray(samples["offset"], dtype=np.int64))
+            sizes.append(np.asarray(samples["size"], dtype=np.int64))
+            labels.append(np.asarray(samples["class"], dtype=np.int64))
+            self.shards.extend(self.shard_dir / name for name in index["shards"])
+
+        self.keys = keys
+        self.shard_ids = np.concatenate(shards)
+        self.offsets = np.concatenate(offsets)
+        self.sizes = np.concatenate(sizes)
+        self.labels = np.concatenate(labels)
+        self.names = dict(enumerate(self.classes))
+
+        self._files = {}
+        self._pid = None
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _file(self, shard_id: int):
+        # File handles do not survive a fork into a DataLoader worker
+        if self._pid != os.getpid():
+            self._files = {}
+            self._pid = os.getpid()
+        f = self._files.get(shard_id)
+        if f is None:
+            f = self._files[shard_id] = open(self.shards[shard_id], "rb")
+        return f
+
+    def read_bytes(self, i: int) -> bytes:
+        """Encoded JPEG of sample i."""
+        f = self._file(int(self.shard_ids[i]))
+        f.seek(int(self.offsets[i]))
+        return f.read(int(self.sizes[i]))
+
+    def __getitem__(self, i: int) -> Tuple[np.ndarray, int]:
+        data = np.frombuffer(self.read_bytes(i), dtype=np.uint8)
+        return cv2.imdecode(data, cv2.IMREAD_COLOR), int(self.labels[i])
+
+    def iter_bytes(self, order: Optional[Iterable[int]] = None) -> Iterator[Tuple[str, bytes, int]]:
+        """
+        Read samples as (key, JPEG bytes, class ID).
+
+        Args:
+            order: Sample indices (default: shard order, which reads every
+                   shard front to back)
+        """
+        if order is None:
+            order = np.lexsort((self.offsets, self.shard_ids))
+        for i in order:
+            yield self.keys[i], self.read_bytes(i), int(self.labels[i])
+
+    def class_counts(self) -> Dict[str, int]:
+        """Samples per class."""
+        counts = np.bincount(self.labels, minlength=len(self.classes))
+        return {name: int(counts[class_id]) for class_id, name in self.names.items()}
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+        self._files = {}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_files"] = {}
+        state["_pid"] = None
+        return state
+
+
+def folders_to_shards(crops_dir: str, shard_dir: str, classes: List[str],
+                      prefix: str = "crops", max_samples: int = 10000) -> int:
+    """
+    Pack a folder dataset (one subfolder of images per behavior) into shards.
+
+    JPEG files are stored as they are; other formats are re-encoded.
+
+    Returns:
+        Number of crops written
+    """
+    crops_dir = Path(crops_dir)
+    with CropShardWriter(shard_dir, classes, prefix=prefix, max_samples=max_samples) as writer:
+        for behavior in classes:
+            behavior_dir = crops_dir / behavior
+            if not behavior_dir.exists():
+                continue
+            for pattern in IMAGE_PATTERNS:
+                for image_path in sorted(behavior_dir.glob(pattern)):
+                    if image_path.suffix.lower() in (".jpg", ".jpeg"):
+                        image = image_path.read_bytes()
+                    else:
+                        image = cv2.imread(str(image_path))
+                        if image is None:
+                            logger.warning(f"Could not read {image_path}, skipping")
+                            continue
+                    writer.add(image_path.stem, image, behavior)
+        count = len(writer)
+    return count
+
+
+def shards_to_folders(shard_dir: str, crops_dir: str) -> int:
+    """
+    Unpack shards into the folder layout (<crops_dir>/<behavior>/<key>.jpg).
+
+    Returns:
+        Number of crops written
+    """
+    dataset = CropShardDataset(shard_dir)
+    crops_dir = Path(crops_dir)
+    for behavior in dataset.classes:
+        (crops_dir / behavior).mkdir(parents=True, exist_ok=True)
+
+    count = 0
+    try:
+        for key, data, class_id in dataset.iter_bytes():
+            (crops_dir / dataset.names[class_id] / f"{key}.jpg").write_bytes(data)
+            count += 1
+    finally:
+        dataset.close()
+    return count
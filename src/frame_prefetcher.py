@@ -0,0 +1,99 @@
+"""
+Frame Prefetcher for FaunaVision
+Runs frame decoding on a background thread and hands sampled frames to
+the consumer through a bounded queue, so decode and inference overlap.
+"""
+
+import queue
+import threading
+from typing import Callable, Iterable, Iterator, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of the stream in the queue
+_END = object()
+
+
+class FramePrefetcher:
+    """
+    Producer/consumer wrapper around a frame iterator.
+
+    A decoder thread pulls items from `source`, applies `preprocess` and
+    pushes the result into a queue holding at most `depth` items. Iterating
+    the prefetcher drains the queue. Errors raised by the decoder thread are
+    re-raised in the consumer.
+    """
+
+    def __init__(
+        self,
+        source: Iterable,
+        depth: int = 16,
+        preprocess: Optional[Callable] = None
+    ):
+        """
+        Initialize frame prefetcher.
+
+        Args:
+            source: Iterable of frames (e.g. a FrameSampler)
+            depth: Maximum number of decoded frames buffered at once
+            preprocess: Optional function applied to each item on the
+                        decoder thread before it is queued
+        """
+        self.source = source
+        self.depth = max(1, int(depth))
+        self.preprocess = preprocess
+
+        self._queue = queue.Queue(maxsize=self.depth)
+        self._stop = threading.Event()
+        self._error = None
+        self._started = False
+        self._thread = threading.Thread(target=self._produce, name="frame-decoder", daemon=True)
+
+    def _put(self, item) -> bool:
+        """Block until there is room in the queue or the consumer stops."""
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self):
+        try:
+            for item in self.source:
+                if self.preprocess is not None:
+                    item = self.preprocess(item)
+                if not self._put(item):
+                    return
+        except Exception as e:
+            self._error = e
+        finally:
+            self._put(_END)
+
+    def __iter__(self) -> Iterator:
+        if not self._started:
+            self._started = True
+            self._thread.start()
+
+        while True:
+            item = self._queue.get()
+            if item is _END:
+                break
+            yield item
+
+        if self._error is not None:
+            raise self._error
+
+    def close(self):
+        """Stop the decoder thread and wait for it to exit."""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
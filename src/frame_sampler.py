@@ -0,0 +1,244 @@
+"""
+Frame Sampler for FaunaVision
+Yields frames at a fixed time interval from a video without fully
+decoding the frames in between. Shared by the behavior classifier and
+the frame extraction script.
+"""
+
+import cv2
+import numpy as np
+from typing import Iterable, Iterator, List, NamedTuple, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Sampling modes
+SAMPLING_MODES = ("auto", "grab", "seek")
+
+# Keyframe interval assumed when the GOP size is unknown (x264/ffmpeg default keyint)
+DEFAULT_GOP_SIZE = 250
+
+# In auto mode, seek only when the gap between samples spans this many GOPs.
+# A seek decodes from the previous keyframe, so for shorter gaps walking
+# forward with grab() touches fewer frames.
+SEEK_GOP_RATIO = 2
+
+
+def get_video_duration(video_path: str) -> float:
+    """
+    Read a video's duration from its container metadata without decoding.
+
+    Args:
+        video_path: Path to video file
+
+    Returns:
+        Duration in seconds (0.0 if unknown)
+    """
+    cap = cv2.VideoCapture(str(video_path))
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        return frame_count / fps if fps > 0 else 0.0
+    finally:
+        cap.release()
+
+
+class SampledFrame(NamedTuple):
+    """A decoded frame taken from a video."""
+    index: int          # Frame number in the video
+    timestamp: float    # Position in seconds
+    image: np.ndarray   # BGR image
+    span: float = 0.0   # Seconds of video the sample stands for (until the next sample)
+
+
+def iter_frames_at(
+    video_path: str,
+    frame_indices: Iterable[int],
+    gop_size: Optional[int] = None
+) -> Iterator[SampledFrame]:
+    """
+    Decode a given set of frames in a single forward pass over the video.
+    
+    Frames are visited in increasing order. The stream is walked with
+    grab() and only the requested frames are retrieved; gaps spanning
+    several GOPs are skipped with one forward seek instead (same rule as
+    FrameSampler's "auto" mode). Frames past the end of the video are
+    skipped.
+    
+    Args:
+        video_path: Path to video file
+        frame_indices: Frame numbers to decode (any order, duplicates ignored)
+        gop_size: Keyframe interval of the video in frames, if known
+    
+    Yields:
+        SampledFrame for each requested frame that could be decoded
+    
+    Raises:
+        ValueError: If the video cannot be opened
+    """
+    wanted = sorted({int(index) for index in frame_indices if index >= 0})
+    
+    cap = cv2.VideoCapture(str(video_path))
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video: {video_path}")
+    
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    seek_gap = SEEK_GOP_RATIO * (gop_size or DEFAULT_GOP_SIZE)
+    position = 0  # Frame number the next grab() returns
+    try:
+        for target in wanted:
+            if target - position >= seek_gap:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+                position = target
+            
+            while position < target:
+                if not cap.grab():
+                    return
+                position += 1
+            
+            ret, frame = cap.read()
+            if not ret:
+                return
+            position += 1
+            yield SampledFrame(target, target / fps if fps > 0 else float(target), frame)
+    finally:
+        cap.release()
+
+
+class FrameSampler:
+    """
+    Samples one frame every `frame_interval` seconds from a video.
+
+    Two strategies are available:
+    - "grab": walk the stream with grab() and only retrieve() (convert to
+      BGR) the frames that are kept
+    - "seek": jump straight to each sample with CAP_PROP_POS_FRAMES; when the
+      GOP size is known, samples are snapped to keyframes so each seek
+      decodes a single frame. Snapped samples are unevenly spaced, so each
+      sample's `span` runs to the next sample instead of `frame_interval`.
+
+    "auto" picks "seek" when samples are several GOPs apart and "grab"
+    otherwise.
+    """
+
+    def __init__(
+        self,
+        video_path: str,
+        frame_interval: float = 1.0,
+        mode: str = "auto",
+        gop_size: Optional[int] = None
+    ):
+        """
+        Initialize frame sampler.
+
+        Args:
+            video_path: Path to video file
+            frame_interval: Sample every N seconds (default: 1.0)
+            mode: "auto", "grab" or "seek"
+            gop_size: Keyframe interval of the video in frames. If None, the
+                      default encoder keyframe interval is assumed and seeks
+                      are not keyframe-aligned.
+        """
+        if mode not in SAMPLING_MODES:
+            raise ValueError(f"Unknown sampling mode '{mode}'. Expected one of: {', '.join(SAMPLING_MODES)}")
+
+        self.video_path = str(video_path)
+        self.frame_interval = frame_interval
+        self.gop_size = gop_size
+
+        self.cap = cv2.VideoCapture(self.video_path)
+        if not self.cap.isOpened():
+            raise ValueError(f"Could not open video: {video_path}")
+
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.duration = self.total_frames / self.fps if self.fps > 0 else 0
+
+        # Calculate frame interval
+        frame_skip = int(self.fps * frame_interval) if self.fps > 0 else 1
+        self.frame_skip = max(1, frame_skip)
+
+        self.mode = self._choose_mode(mode)
+
+    def _choose_mode(self, mode: str) -> str:
+        """Resolve "auto" to a concrete sampling strategy."""
+        if mode != "auto":
+            return mode
+
+        # Seeking needs a reliable frame count
+        if self.total_frames <= 0 or self.frame_skip == 1:
+            return "grab"
+
+        gop_size = self.gop_size or DEFAULT_GOP_SIZE
+        if self.frame_skip >= SEEK_GOP_RATIO * gop_size:
+            return "seek"
+        return "grab"
+
+    def _timestamp(self, frame_index: int) -> float:
+        return frame_index / self.fps if self.fps > 0 else float(frame_index)
+
+    @property
+    def sample_duration(self) -> float:
+        """Nominal seconds between samples."""
+        return self.frame_skip / self.fps if self.fps > 0 else self.frame_interval
+
+    def _seek_targets(self) -> List[int]:
+        """Frame numbers visited in seek mode, snapped to keyframes if the GOP size is known."""
+        targets = []
+        for target in range(0, self.total_frames, self.frame_skip):
+            # Snap to the nearest keyframe when the GOP structure is known
+            if self.gop_size:
+                target = int(round(target / self.gop_size)) * self.gop_size
+                if target >= self.total_frames or (targets and target <= targets[-1]):
+                    continue
+            targets.append(target)
+        return targets
+
+    def __iter__(self) -> Iterator[SampledFrame]:
+        if self.mode == "seek":
+            return self._iter_seek()
+        return self._iter_grab()
+
+    def _iter_grab(self) -> Iterator[SampledFrame]:
+        """Decode sequentially, converting only the sampled frames."""
+        frame_count = 0
+        while True:
+            if not self.cap.grab():
+                break
+
+            if frame_count % self.frame_skip == 0:
+                ret, frame = self.cap.retrieve()
+                if ret:
+                    yield SampledFrame(frame_count, self._timestamp(frame_count), frame, self.sample_duration)
+
+            frame_count += 1
+
+    def _iter_seek(self) -> Iterator[SampledFrame]:
+        """Seek directly to each sample position."""
+        targets = self._seek_targets()
+        for i, target in enumerate(targets):
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+            ret, frame = self.cap.read()
+            if not ret:
+                logger.warning(f"Seek to frame {target} failed in {self.video_path}")
+                continue
+
+            if self.gop_size:
+                # Snapped samples are unevenly spaced; each covers the gap to the next
+                next_target = targets[i + 1] if i + 1 < len(targets) else self.total_frames
+                span = self._timestamp(next_target) - self._timestamp(target)
+            else:
+                span = self.sample_duration
+            yield SampledFrame(target, self._timestamp(target), frame, span)
+
+    def release(self):
+        """Release the underlying video capture."""
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
@@ -0,0 +1,264 @@
+"""
+Inference Engines for FaunaVision
+Loads the behavior classification model with ultralytics (PyTorch),
+ONNX Runtime or OpenVINO behind a common callable interface.
+
+All engines are called as `engine(frames, verbose=False)` with a list of
+BGR frames and return one result per frame exposing `probs.top1` and
+`probs.top1conf`, like ultralytics classification results. Runtime
+libraries are imported only when an engine that needs them is loaded, so
+inference-only nodes running ONNX/OpenVINO do not import torch.
+"""
+
+import ast
+import cv2
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+ENGINES = ("ultralytics", "onnx", "openvino")
+
+
+def detect_engine(model_path: str) -> str:
+    """
+    Pick the inference engine from the model file.
+
+    Args:
+        model_path: Path to a .pt, .onnx, OpenVINO .xml file or an
+                    ultralytics "*_openvino_model" export directory
+
+    Returns:
+        Engine name: "ultralytics", "onnx" or "openvino"
+    """
+    path = Path(model_path)
+    if path.suffix.lower() == ".onnx":
+        return "onnx"
+    if path.suffix.lower() == ".xml" or path.name.endswith("_openvino_model"):
+        return "openvino"
+    return "ultralytics"
+
+
+def load_engine(model_path: str, engine: Optional[str] = None, num_threads: Optional[int] = None):
+    """
+    Load a classification model with the requested engine.
+
+    Args:
+        model_path: Path to the model file (or OpenVINO export directory)
+        engine: "ultralytics", "onnx" or "openvino". If None, chosen from
+                the file extension.
+        num_threads: Intra-op threads of the runtime (default: the
+                     runtime's own choice, usually every core). For
+                     ultralytics this sets torch's process-wide thread count.
+
+    Returns:
+        Callable model: engine(frames, verbose=False) -> list of results
+
+    Raises:
+        ValueError: If the engine name is unknown
+        ImportError: If the engine's runtime library is not installed
+    """
+    engine = (engine or detect_engine(model_path)).lower()
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown inference engine '{engine}'. Expected one of: {', '.join(ENGINES)}")
+
+    if engine == "onnx":
+        return OnnxClassifier(model_path, num_threads=num_threads)
+    if engine == "openvino":
+        return OpenVINOClassifier(model_path, num_threads=num_threads)
+
+    from ultralytics import YOLO
+    if num_threads:
+        import torch
+        torch.set_num_threads(num_threads)
+    return YOLO(model_path)
+
+
+def preprocess_frames(frames: List[np.ndarray], input_size: int) -> np.ndarray:
+    """
+    Convert BGR frames to the classifier's input tensor.
+
+    Mirrors ultralytics classification preprocessing: resize the shortest
+    side to `input_size`, center crop, BGR -> RGB, scale to [0, 1].
+
+    Args:
+        frames: BGR frames of any size
+        input_size: Model input size in pixels
+
+    Returns:
+        Float32 array of shape (N, 3, input_size, input_size)
+    """
+    batch = np.empty((len(frames), 3, input_size, input_size), dtype=np.float32)
+    for i, frame in enumerate(frames):
+        h, w = frame.shape[:2]
+        scale = input_size / min(h, w)
+        new_w, new_h = max(input_size, round(w * scale)), max(input_size, round(h * scale))
+        interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
+        resized = cv2.resize(frame, (new_w, new_h), interpolation=interpolation)
+
+        top = (new_h - input_size) // 2
+        left = (new_w - input_size) // 2
+        crop = resized[top:top + input_size, left:left + input_size]
+
+        batch[i] = crop[:, :, ::-1].transpose(2, 0, 1) / 255.0
+    return batch
+
+
+class ClassificationProbs:
+    """Top-1 view of a probability vector, matching ultralytics `Probs`."""
+
+    def __init__(self, data: np.ndarray):
+        self.data = data
+        self.top1 = int(np.argmax(data))
+        self.top1conf = np.float32(data[self.top1])  # numpy scalar, supports .item()
+
+
+class ClassificationResult:
+    """Per-frame result with a `probs` attribute, matching ultralytics `Results`."""
+
+    def __init__(self, probs: np.ndarray, names: Dict[int, str]):
+        self.probs = ClassificationProbs(probs)
+        self.names = names
+
+
+def _parse_names(value) -> Dict[int, str]:
+    """Parse the class names stored in exported model metadata."""
+    if isinstance(value, dict):
+        return {int(k): str(v) for k, v in value.items()}
+    if isinstance(value, str):
+        try:
+            return _parse_names(ast.literal_eval(value))
+        except (ValueError, SyntaxError):
+            pass
+    return {}
+
+
+def _softmax_if_needed(outputs: np.ndarray) -> np.ndarray:
+    """Exported ultralytics classifiers output probabilities already; raw logits are normalized."""
+    sums = outputs.sum(axis=1)
+    if np.all(outputs >= 0) and np.allclose(sums, 1.0, atol=1e-3):
+        return outputs
+    shifted = np.exp(outputs - outputs.max(axis=1, keepdims=True))
+    return shifted / shifted.sum(axis=1, keepdims=True)
+
+
+class _ExportedClassifier:
+    """Shared batching and result handling for exported models."""
+
+    def __init__(self, model_path: str):
+        self.model_path = str(model_path)
+        self.input_size = 224
+        self.batch_limit = None  # Fixed batch dimension of the exported graph, if any
+        self.names = {}
+        self.overrides = {}
+
+    def _run(self, batch: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def __call__(self, frames, verbose: bool = False) -> List[ClassificationResult]:
+        if isinstance(frames, np.ndarray):
+            frames = [frames]
+        if len(frames) == 0:
+            return []
+
+        batch = preprocess_frames(frames, self.input_size)
+
+        # Graphs exported without dynamic=True only accept their fixed batch size
+        step = self.batch_limit or len(batch)
+        outputs = []
+        for start in range(0, len(batch), step):
+            chunk = batch[start:start + step]
+            if self.batch_limit and len(chunk) < self.batch_limit:
+                padding = np.zeros((self.batch_limit - len(chunk),) + chunk.shape[1:], dtype=chunk.dtype)
+                outputs.append(self._run(np.concatenate([chunk, padding]))[:len(chunk)])
+            else:
+                outputs.append(self._run(chunk))
+
+        probs = _softmax_if_needed(np.concatenate(outputs).astype(np.float32))
+        return [ClassificationResult(p, self.names) for p in probs]
+
+
+class OnnxClassifier(_ExportedClassifier):
+    """Classification model exported to ONNX, run with ONNX Runtime on CPU."""
+
+    def __init__(self, model_path: str, num_threads: Optional[int] = None):
+        """
+        Initialize ONNX Runtime classifier.
+
+        Args:
+            model_path: Path to .onnx file
+            num_threads: Intra-op threads (default: ONNX Runtime decides)
+        """
+        super().__init__(model_path)
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+
+        self.session = ort.InferenceSession(
+            self.model_path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+
+        batch_dim, _, height, _ = model_input.shape
+        if isinstance(height, int):
+            self.input_size = height
+        if isinstance(batch_dim, int):
+            self.batch_limit = batch_dim
+
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.names = _parse_names(metadata.get("names"))
+        self.overrides = {"imgsz": self.input_size}
+
+    def _run(self, batch: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+class OpenVINOClassifier(_ExportedClassifier):
+    """Classification model exported to OpenVINO IR, compiled for CPU."""
+
+    def __init__(self, model_path: str, num_threads: Optional[int] = None):
+        """
+        Initialize OpenVINO classifier.
+
+        Args:
+            model_path: Path to the .xml file or the "*_openvino_model"
+                        directory written by ultralytics export
+            num_threads: Inference threads (default: OpenVINO decides)
+        """
+        super().__init__(model_path)
+        import openvino as ov
+
+        path = Path(model_path)
+        if path.is_dir():
+            path = next(path.glob("*.xml"))
+
+        core = ov.Core()
+        model = core.read_model(str(path))
+
+        shape = model.inputs[0].get_partial_shape()
+        if shape[2].is_static:
+            self.input_size = shape[2].get_length()
+        if shape[0].is_static:
+            self.batch_limit = shape[0].get_length()
+
+        config = {"PERFORMANCE_HINT": "THROUGHPUT"}
+        if num_threads:
+            config["INFERENCE_NUM_THREADS"] = num_threads
+        self.compiled = core.compile_model(model, "CPU", config)
+        self.output = self.compiled.output(0)
+
+        metadata = path.parent / "metadata.yaml"
+        if metadata.exists():
+            import yaml
+            with open(metadata) as f:
+                self.names = _parse_names((yaml.safe_load(f) or {}).get("names"))
+        self.overrides = {"imgsz": self.input_size}
+
+    def _run(self, batch: np.ndarray) -> np.ndarray:
+        return self.compiled([batch])[self.output]
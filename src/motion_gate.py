@@ -0,0 +1,64 @@
+"""
+Motion Gate for FaunaVision
+Cheap frame-differencing check used to skip classifier calls on frames
+where the scene has not changed since the last classified frame.
+"""
+
+import cv2
+import numpy as np
+from typing import Tuple
+
+
+class MotionGate:
+    """
+    Detects scene changes by differencing heavily downscaled grayscale frames.
+
+    Each frame is compared with the last frame that passed the gate (the
+    last one sent to the model), not with the previous sampled frame, so
+    slow drift still triggers a new inference once it adds up.
+    """
+
+    def __init__(self, threshold: float = 2.0, size: Tuple[int, int] = (64, 36)):
+        """
+        Initialize motion gate.
+
+        Args:
+            threshold: Mean absolute gray-level difference (0-255) above
+                       which a frame counts as changed
+            size: (width, height) frames are downscaled to before differencing
+        """
+        self.threshold = threshold
+        self.size = size
+        self.reference = None
+
+    def _signature(self, frame: np.ndarray) -> np.ndarray:
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        # Blur away sensor noise and compression artifacts
+        return cv2.GaussianBlur(small, (3, 3), 0).astype(np.int16)
+
+    def has_changed(self, frame: np.ndarray) -> bool:
+        """
+        Check a frame against the last changed frame.
+
+        Args:
+            frame: BGR frame
+
+        Returns:
+            True if the frame differs from the reference by more than the
+            threshold (the frame becomes the new reference), False if the
+            scene is static
+        """
+        signature = self._signature(frame)
+        if self.reference is not None:
+            difference = float(np.mean(np.abs(signature - self.reference)))
+            if difference <= self.threshold:
+                return False
+
+        self.reference = signature
+        return True
+
+    def reset(self):
+        """Forget the reference frame."""
+        self.reference = None
@@ -0,0 +1,260 @@
+"""
+Pig Tracker for FaunaVision
+Per-animal behavior analysis: detect pigs in sampled frames, follow them
+with a multi-object tracker, crop each pig and classify all crops of a
+frame in a single batch. Produces a time budget per tracked animal.
+"""
+
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+import logging
+
+try:
+    from .behavior_timeline import BehaviorTimeline
+    from .frame_sampler import FrameSampler
+except ImportError:
+    # Running as a script: python src/pig_tracker.py
+    from behavior_timeline import BehaviorTimeline
+    from frame_sampler import FrameSampler
+
+logger = logging.getLogger(__name__)
+
+
+def crop_box(frame: np.ndarray, box: Tuple[float, float, float, float], padding: float = 0.0) -> Optional[np.ndarray]:
+    """
+    Cut a bounding box out of a frame.
+
+    Args:
+        frame: BGR frame
+        box: (x1, y1, x2, y2) in pixels
+        padding: Extra margin on each side as a fraction of the box size
+
+    Returns:
+        Crop, or None if the box is empty after clipping to the frame
+    """
+    x1, y1, x2, y2 = box
+    pad_x = (x2 - x1) * padding
+    pad_y = (y2 - y1) * padding
+
+    # Ensure coordinates are within frame bounds
+    h_frame, w_frame = frame.shape[:2]
+    x1 = max(0, min(int(x1 - pad_x), w_frame))
+    y1 = max(0, min(int(y1 - pad_y), h_frame))
+    x2 = max(0, min(int(x2 + pad_x), w_frame))
+    y2 = max(0, min(int(y2 + pad_y), h_frame))
+
+    if x2 <= x1 or y2 <= y1:
+        return None
+    return frame[y1:y2, x1:x2]
+
+
+class PigTracker:
+    """
+    Detect -> track -> crop -> batch-classify pipeline.
+
+    A YOLO detection model finds pigs in each sampled frame and the
+    ultralytics tracker (ByteTrack by default) keeps their IDs across
+    frames. The crops of one frame go to the behavior classifier in a
+    single call, so a pen of ten pigs costs one detector and one classifier
+    pass per frame.
+
+    Trackers associate boxes between consecutive frames, so sample densely
+    enough that pigs move only part of their body length between samples
+    (frame_interval of 0.5s or less for active pens).
+    """
+
+    def __init__(
+        self,
+        detector_path: str,
+        classifier,
+        tracker: str = "bytetrack.yaml",
+        detection_confidence: float = 0.25,
+        pig_classes: Optional[List[int]] = None,
+        crop_padding: float = 0.0
+    ):
+        """
+        Initialize pig tracker.
+
+        Args:
+            detector_path: YOLO detection model trained to find pigs
+            classifier: Loaded YOLOBehaviorClassifier for the crops
+            tracker: ultralytics tracker config ("bytetrack.yaml" or "botsort.yaml")
+            detection_confidence: Minimum detection confidence
+            pig_classes: Detector class IDs that are pigs (default: all)
+            crop_padding: Margin added around each box before classifying;
+                          keep at 0 to match the tight crops of
+                          scripts/parse_annotations.py used for training
+
+        Raises:
+            ImportError: If ultralytics is not installed
+        """
+        from ultralytics import YOLO
+
+        self.detector = YOLO(detector_path)
+        self.classifier = classifier
+        self.tracker = tracker
+        self.detection_confidence = detection_confidence
+        self.pig_classes = pig_classes
+        self.crop_padding = crop_padding
+        logger.info(f"Pig detector loaded from: {detector_path} (tracker: {tracker})")
+
+    def _reset_tracker(self):
+        """Forget track IDs from the previous video."""
+        predictor = getattr(self.detector, "predictor", None)
+        for tracker in getattr(predictor, "trackers", None) or []:
+            tracker.reset()
+
+    def _track(self, frame: np.ndarray) -> List[Tuple[int, Tuple[float, float, float, float]]]:
+        """
+        Detect and track pigs in one frame.
+
+        Returns:
+            (track_id, (x1, y1, x2, y2)) per tracked pig; detections the
+            tracker has not confirmed yet are left out
+        """
+        results = self.detector.track(
+            frame,
+            persist=True,
+            tracker=self.tracker,
+            conf=self.detection_confidence,
+            classes=self.pig_classes,
+            verbose=False
+        )
+        boxes = results[0].boxes
+        if boxes is None or boxes.id is None:
+            return []
+
+        track_ids = boxes.id.int().tolist()
+        coordinates = boxes.xyxy.tolist()
+        return list(zip(track_ids, [tuple(box) for box in coordinates]))
+
+    def analyze_video_per_animal(
+        self,
+        video_path: str,
+        frame_interval: float = 0.5,
+        confidence_threshold: float = 0.5,
+        sampling_mode: str = "grab",
+        min_track_frames: int = 3
+    ) -> Dict:
+        """
+        Analyze a video and return a behavior time budget per tracked pig.
+
+        Args:
+            video_path: Path to video file
+            frame_interval: Process every N seconds
+            confidence_threshold: Minimum classifier confidence to accept a crop
+            sampling_mode: Frame sampling strategy (see FrameSampler); "grab"
+                           keeps frame spacing regular for the tracker
+            min_track_frames: Tracks with fewer accepted crops are dropped
+                              as spurious
+
+        Returns:
+            Dictionary with:
+            - animals: Dict[int, Dict] - Per track ID: behavior_percentages,
+              primary_behavior, distress (see calculate_distress_level),
+              frames, first_seen, last_seen and the behavior timeline
+            - length_seconds: float - Video duration
+            - frames_sampled: int - Frames run through the detector
+            - crops_classified: int - Crops sent to the classifier
+            - classifier_calls: int - Batched classifier calls made
+        """
+        self._reset_tracker()
+        behaviors = list(self.classifier.behavior_classes.values())
+        timelines = {}  # track_id -> BehaviorTimeline
+        stats = {"frames_sampled": 0, "crops_classified": 0, "classifier_calls": 0}
+
+        with FrameSampler(video_path, frame_interval=frame_interval, mode=sampling_mode) as sampler:
+            length_seconds = sampler.duration
+
+            for sample in sampler:
+                stats["frames_sampled"] += 1
+
+                tracked = []
+                crops = []
+                for track_id, box in self._track(sample.image):
+                    crop = crop_box(sample.image, box, self.crop_padding)
+                    if crop is not None:
+                        tracked.append(track_id)
+                        crops.append(crop)
+                if not crops:
+                    continue
+
+                # Every pig in the frame in one classifier call
+                predictions = self.classifier.classify_frames(crops)
+                stats["crops_classified"] += len(crops)
+                stats["classifier_calls"] += 1
+
+                for track_id, (behavior, confidence) in zip(tracked, predictions):
+                    if behavior == "unknown" or confidence < confidence_threshold:
+                        continue
+                    if track_id not in timelines:
+                        timelines[track_id] = BehaviorTimeline(sampler.sample_duration, duration=length_seconds)
+                    timelines[track_id].add(sample.timestamp, behavior, confidence, sample.span)
+
+        animals = {}
+        for track_id, timeline in sorted(timelines.items()):
+            frames = sum(segment.frames for segment in timeline.segments)
+            if frames < min_track_frames:
+                continue
+            percentages = timeline.percentages(behaviors)
+            primary_behavior, primary_percentage = self.classifier.get_primary_behavior(percentages)
+            animals[track_id] = {
+                "behavior_percentages": percentages,
+                "primary_behavior": primary_behavior,
+                "primary_percentage": primary_percentage,
+                "distress": self.classifier.calculate_distress_level(percentages),
+                "frames": frames,
+                "first_seen": timeline.segments[0].start_time,
+                "last_seen": timeline.segments[-1].end_time,
+                "timeline": timeline.to_list()
+            }
+
+        logger.info(
+            f"Tracked {len(animals)} pigs over {stats['frames_sampled']} frames "
+            f"({stats['crops_classified']} crops in {stats['classifier_calls']} classifier calls)"
+        )
+        return {"animals": animals, "length_seconds": length_seconds, **stats}
+
+
+def main():
+    """
+    Example usage of PigTracker.
+    """
+    import sys
+
+    try:
+        from .yolo_behavior_classifier import YOLOBehaviorClassifier
+    except ImportError:
+        from yolo_behavior_classifier import YOLOBehaviorClassifier
+
+    if len(sys.argv) < 4:
+        print("Usage: python pig_tracker.py <video_path> <detector_path> <classifier_path> [frame_interval]")
+        print("\nExample:")
+        print("  python pig_tracker.py data/test_videos/pen1.mp4 models/pig_detector.pt models/best.pt 0.5")
+        sys.exit(1)
+
+    video_path = sys.argv[1]
+    detector_path = sys.argv[2]
+    classifier_path = sys.argv[3]
+    frame_interval = float(sys.argv[4]) if len(sys.argv) > 4 else 0.5
+
+    classifier = YOLOBehaviorClassifier(model_path=classifier_path)
+    tracker = PigTracker(detector_path, classifier)
+    result = tracker.analyze_video_per_animal(video_path, frame_interval=frame_interval)
+
+    print(f"\n{'='*60}")
+    print(f"Per-Pig Behavior Time Budgets")
+    print(f"{'='*60}\n")
+    print(f"Video: {video_path} ({result['length_seconds']:.1f}s)")
+    print(f"Pigs tracked: {len(result['animals'])}\n")
+
+    for track_id, animal in result["animals"].items():
+        print(f"Pig {track_id} ({animal['first_seen']:.1f}s - {animal['last_seen']:.1f}s, {animal['frames']} frames):")
+        for behavior, percentage in sorted(animal["behavior_percentages"].items(), key=lambda x: x[1], reverse=True):
+            if percentage > 0:
+                print(f"  {behavior.capitalize()}: {percentage:.1%}")
+        print(f"  Distress: {animal['distress']['distress_level']}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+"""
+Stream Monitor for FaunaVision
+Continuously classifies a live camera stream (RTSP/HTTP URL, device index
+or a local file played back in real time) and raises distress alerts from
+sliding-window behavior percentages.
+"""
+
+import os
+import threading
+import time
+from collections import Counter, deque
+from typing import Callable, Dict, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Distress levels from calculate_distress_level, in increasing order
+DISTRESS_LEVELS = ("none", "low", "moderate", "high")
+
+
+def open_capture(source: Union[str, int]) -> cv2.VideoCapture:
+    """
+    Open a stream source with OpenCV.
+
+    Args:
+        source: RTSP/HTTP URL, file path, or camera device index
+                (an int or a digit string such as "0")
+
+    Returns:
+        Opened capture (check isOpened())
+    """
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    return cv2.VideoCapture(source)
+
+
+class LatestFrameReader:
+    """
+    Reads a stream on a background thread, keeping only the newest frame.
+
+    The consumer always gets the most recent frame; frames it was too slow
+    to pick up are overwritten and counted as dropped, so a slow consumer
+    never builds up latency. Network streams are reopened after read
+    failures. Local files are played back at their native frame rate to
+    stand in for a live camera.
+    """
+
+    def __init__(
+        self,
+        source: Union[str, int],
+        reconnect_delay: float = 2.0,
+        realtime: Optional[bool] = None,
+        loop: bool = False
+    ):
+        """
+        Initialize frame reader.
+
+        Args:
+            source: Stream URL, file path or device index
+            reconnect_delay: Seconds to wait before reopening a failed stream
+            realtime: Pace reads to the stream's FPS (default: only for local files)
+            loop: Restart a local file at its end instead of stopping
+        """
+        self.source = source
+        self.reconnect_delay = reconnect_delay
+        self.is_file = isinstance(source, str) and os.path.isfile(source)
+        self.realtime = self.is_file if realtime is None else realtime
+        self.loop = loop
+
+        self.frames_read = 0
+        self.frames_dropped = 0
+        self.reconnects = 0
+
+        self._frame = None
+        self._frame_time = 0.0
+        self._frame_id = 0
+        self._consumed_id = 0
+        self._finished = False
+        self._condition = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._read_loop, name="stream-reader", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _publish(self, frame: np.ndarray):
+        with self._condition:
+            if self._frame_id > self._consumed_id:
+                self.frames_dropped += 1
+            self._frame = frame
+            self._frame_time = time.time()
+            self._frame_id += 1
+            self.frames_read += 1
+            self._condition.notify_all()
+
+    def _read_loop(self):
+        try:
+            while not self._stop.is_set():
+                cap = open_capture(self.source)
+                if not cap.isOpened():
+                    if self.is_file:
+                        logger.error(f"Could not open stream: {self.source}")
+                        return
+                    logger.warning(f"Could not open stream {self.source}, retrying in {self.reconnect_delay}s")
+                    self._stop.wait(self.reconnect_delay)
+                    self.reconnects += 1
+                    continue
+
+                fps = cap.get(cv2.CAP_PROP_FPS)
+                frame_period = 1.0 / fps if self.realtime and fps > 0 else 0.0
+                next_frame_at = time.monotonic()
+                try:
+                    while not self._stop.is_set():
+                        ret, frame = cap.read()
+                        if not ret:
+                            break
+                        self._publish(frame)
+                        if frame_period:
+                            next_frame_at += frame_period
+                            self._stop.wait(max(0.0, next_frame_at - time.monotonic()))
+                finally:
+                    cap.release()
+
+                if self.is_file and not self.loop:
+                    return
+                if not self.is_file:
+                    logger.warning(f"Stream {self.source} interrupted, reconnecting in {self.reconnect_delay}s")
+                    self._stop.wait(self.reconnect_delay)
+                    self.reconnects += 1
+        finally:
+            with self._condition:
+                self._finished = True
+                self._condition.notify_all()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Tuple[float, np.ndarray]]:
+        """
+        Wait for a frame newer than the last one returned.
+
+        Args:
+            timeout: Seconds to wait (None: until a frame arrives or the stream ends)
+
+        Returns:
+            (wall-clock time the frame was read, BGR frame), or None on
+            timeout or when the stream has ended
+        """
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._frame_id > self._consumed_id or self._finished,
+                timeout=timeout
+            )
+            if self._frame_id <= self._consumed_id:
+                return None
+            self._consumed_id = self._frame_id
+            return self._frame_time, self._frame
+
+    @property
+    def finished(self) -> bool:
+        """True once the reader has stopped and every frame was consumed."""
+        with self._condition:
+            return self._finished and self._frame_id <= self._consumed_id
+
+    def stop(self):
+        """Stop reading and release the stream."""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=5.0)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+class StreamMonitor:
+    """
+    Live behavior monitoring over a sliding time window.
+
+    Every `sample_interval` seconds the newest stream frame is classified.
+    Predictions older than `window_seconds` fall out of the window; memory
+    use is fixed by the window size. When the window's distress level (see
+    YOLOBehaviorClassifier.calculate_distress_level) reaches `alert_level`,
+    an alert is raised, at most once per `alert_cooldown` unless the level
+    gets worse.
+    """
+
+    def __init__(
+        self,
+        classifier,
+        source: Union[str, int],
+        window_seconds: float = 300.0,
+        sample_interval: float = 1.0,
+        confidence_threshold: float = 0.5,
+        alert_level: str = "moderate",
+        alert_cooldown: float = 300.0,
+        min_samples: int = 30,
+        on_alert: Optional[Callable[[Dict], None]] = None,
+        reader: Optional[LatestFrameReader] = None
+    ):
+        """
+        Initialize stream monitor.
+
+        Args:
+            classifier: Loaded YOLOBehaviorClassifier
+            source: Stream URL, file path or device index
+            window_seconds: Length of the sliding window
+            sample_interval: Seconds between classified frames
+            confidence_threshold: Minimum confidence to count a prediction
+            alert_level: Lowest distress level that raises an alert
+            alert_cooldown: Seconds before the same level alerts again
+            min_samples: Predictions needed in the window before alerting
+            on_alert: Called with each alert dictionary
+            reader: Frame reader to use (default: LatestFrameReader(source))
+        """
+        if alert_level not in DISTRESS_LEVELS:
+            raise ValueError(f"Unknown alert level '{alert_level}'. Expected one of: {', '.join(DISTRESS_LEVELS)}")
+
+        self.classifier = classifier
+        self.source = source
+        self.window_seconds = window_seconds
+        self.sample_interval = sample_interval
+        self.confidence_threshold = confidence_threshold
+        self.alert_level = alert_level
+        self.alert_cooldown = alert_cooldown
+        self.min_samples = min_samples
+        self.on_alert = on_alert
+        self.reader = reader or LatestFrameReader(source)
+
+        # (time, behavior) per accepted prediction, oldest first; the
+        # maxlen caps memory even if the clock misbehaves
+        max_samples = max(1, int(window_seconds / sample_interval) + 1)
+        self._window = deque(maxlen=max_samples)
+        self._counts = Counter()
+
+        self.frames_classified = 0
+        self.alerts = 0
+        self._last_alert_time = None
+        self._last_alert_level = "none"
+        self._stop = threading.Event()
+
+    def _add(self, timestamp: float, behavior: str):
+        """Push a prediction into the window, expiring old ones."""
+        if len(self._window) == self._window.maxlen:
+            _, expired = self._window[0]
+            self._counts[expired] -= 1
+        self._window.append((timestamp, behavior))
+        self._counts[behavior] += 1
+
+        while self._window and self._window[0][0] < timestamp - self.window_seconds:
+            _, expired = self._window.popleft()
+            self._counts[expired] -= 1
+
+    def percentages(self) -> Dict[str, float]:
+        """Behavior shares in the current window (empty if no predictions)."""
+        behaviors = list(self.classifier.behavior_classes.values())
+        total = sum(self._counts[behavior] for behavior in behaviors)
+        if total == 0:
+            return {}
+        return {behavior: self._counts[behavior] / total for behavior in behaviors}
+
+    def snapshot(self) -> Dict:
+        """Current window percentages, distress level and stream counters."""
+        percentages = self.percentages()
+        return {
+            "time": time.time(),
+            "window_samples": len(self._window),
+            "percentages": percentages,
+            "distress": self.classifier.calculate_distress_level(percentages),
+            "frames_read": self.reader.frames_read,
+            "frames_dropped": self.reader.frames_dropped,
+            "frames_classified": self.frames_classified,
+            "reconnects": self.reader.reconnects,
+            "alerts": self.alerts
+        }
+
+    def _check_alert(self, snapshot: Dict) -> Optional[Dict]:
+        """Build an alert if the window's distress level warrants one."""
+        if snapshot["window_samples"] < self.min_samples:
+            return None
+
+        level = snapshot["distress"]["distress_level"]
+        rank = DISTRESS_LEVELS.index(level)
+        if rank < DISTRESS_LEVELS.index(self.alert_level):
+            self._last_alert_level = "none"
+            return None
+
+        now = snapshot["time"]
+        escalated = rank > DISTRESS_LEVELS.index(self._last_alert_level)
+        cooled_down = self._last_alert_time is None or now - self._last_alert_time >= self.alert_cooldown
+        if not (escalated or cooled_down):
+            return None
+
+        self._last_alert_time = now
+        self._last_alert_level = level
+        self.alerts += 1
+        return {"source": str(self.source), "alert": "distress", **snapshot}
+
+    def step(self) -> Optional[Dict]:
+        """
+        Classify the newest frame and update the window.
+
+        Returns:
+            Alert dictionary if this frame triggered one, else None
+        """
+        item = self.reader.get(timeout=max(self.sample_interval, 1.0))
+        if item is None:
+            return None
+
+        frame_time, frame = item
+        behavior, confidence = self.classifier.classify_frames([frame])[0]
+        self.frames_classified += 1
+        if behavior != "unknown" and confidence >= self.confidence_threshold:
+            self._add(frame_time, behavior)
+
+        alert = self._check_alert(self.snapshot())
+        if alert is not None:
+            logger.warning(
+                f"Distress alert on {self.source}: {alert['distress']['distress_level']} "
+                f"({alert['distress']['distress_percentage']:.1%} of the last {self.window_seconds:.0f}s)"
+            )
+            if self.on_alert is not None:
+                self.on_alert(alert)
+        return alert
+
+    def run(
+        self,
+        max_duration: Optional[float] = None,
+        on_update: Optional[Callable[[Dict], None]] = None,
+        update_interval: float = 10.0
+    ):
+        """
+        Monitor until stopped, the stream ends or `max_duration` passes.
+
+        Args:
+            max_duration: Seconds to run (None: forever)
+            on_update: Called with a snapshot every `update_interval` seconds
+            update_interval: Seconds between on_update calls
+        """
+        started = time.monotonic()
+        next_update = started + update_interval
+        with self.reader:
+            while not self._stop.is_set() and not self.reader.finished:
+                step_started = time.monotonic()
+                self.step()
+
+                now = time.monotonic()
+                if on_update is not None and now >= next_update:
+                    on_update(self.snapshot())
+                    next_update = now + update_interval
+                if max_duration is not None and now - started >= max_duration:
+                    break
+
+                # Frames arriving meanwhile replace each other in the reader
+                self._stop.wait(max(0.0, self.sample_interval - (now - step_started)))
+
+    def stop(self):
+        """Stop run() from another thread."""
+        self._stop.set()
@@ -6,20 +6,58 @@ and returns time percentages for each behavior class.
 
 import cv2
 import numpy as np
-from typing import Dict, List
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from collections import Counter
+import hashlib
+import importlib.util
 import logging
 import os
+import time
+from pathlib import Path
+
+try:
+    from .behavior_labels import BehaviorLabelMap, load_label_map
+    from .behavior_timeline import BehaviorTimeline
+    from .frame_sampler import FrameSampler, SampledFrame, get_video_duration
+    from .frame_prefetcher import FramePrefetcher
+    from .inference_engines import detect_engine, load_engine
+    from .motion_gate import MotionGate
+except ImportError:
+    # Running as a script: python src/yolo_behavior_classifier.py
+    from behavior_labels import BehaviorLabelMap, load_label_map
+    from behavior_timeline import BehaviorTimeline
+    from frame_sampler import FrameSampler, SampledFrame, get_video_duration
+    from frame_prefetcher import FramePrefetcher
+    from inference_engines import detect_engine, load_engine
+    from motion_gate import MotionGate
 
 logger = logging.getLogger(__name__)
 
 # YOLO integration
-try:
-    from ultralytics import YOLO
-    YOLO_AVAILABLE = True
-except ImportError:
-    YOLO_AVAILABLE = False
-    logger.warning("Ultralytics YOLO not available. Install with: pip install ultralytics")
+# The runtime is imported lazily by load_engine, so nodes serving ONNX or
+# OpenVINO models never import torch/ultralytics.
+YOLO_AVAILABLE = importlib.util.find_spec("ultralytics") is not None
+
+
+def compute_model_version(model_path: str) -> str:
+    """
+    Fingerprint a model file (or export directory) by its contents.
+    
+    Args:
+        model_path: Path to the model file or directory
+        
+    Returns:
+        First 12 hex characters of the SHA-256 of the model bytes
+    """
+    path = Path(model_path)
+    files = sorted(p for p in path.rglob("*") if p.is_file()) if path.is_dir() else [path]
+    
+    digest = hashlib.sha256()
+    for file_path in files:
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+    return digest.hexdigest()[:12]
 
 
 class YOLOBehaviorClassifier:
@@ -28,47 +66,105 @@ class YOLOBehaviorClassifier:
     Returns time percentages for each behavior class.
     """
     
-    def __init__(self, model_path: str = None):
+    def __init__(
+        self,
+        model_path: str = None,
+        engine: Optional[str] = None,
+        label_map: Optional[BehaviorLabelMap] = None,
+        num_threads: Optional[int] = None
+    ):
         """
         Initialize YOLO behavior classifier.
         
         Args:
-            model_path: Path to trained YOLO model (.pt file)
+            model_path: Path to trained YOLO model (.pt file), or an exported
+                       .onnx / OpenVINO model
                        If None, will use placeholder
+            engine: Inference engine: "ultralytics", "onnx" or "openvino".
+                    If None, chosen from the model file extension.
+            label_map: Behavior classes and distress behaviors
+                       (default: config/behavior_labels.json)
+            num_threads: Intra-op threads of the inference engine
+                         (default: the engine's own choice)
         """
         self.model = None
         self.model_path = model_path
+        self.engine = None
+        self.model_version = "placeholder"
         
-        # Behavior classes for pigs
-        self.behavior_classes = {
-            0: "tail_biting",
-            1: "ear_biting",
-            2: "aggression",
-            3: "eating",
-            4: "sleeping",
-            5: "rooting"
-        }
+        # Classification input size (IMAGE_SIZE in scripts/train_pig_behavior.py)
+        self.input_size = 224
+        
+        # Behavior classes for pigs, in training class ID order
+        self.label_map = label_map or load_label_map()
+        self.behavior_classes = dict(self.label_map.names)
         
         # Define which behaviors indicate distress (for pigs)
-        self.distress_behaviors = ["tail_biting", "ear_biting", "aggression"]
+        self.distress_behaviors = list(self.label_map.distress_behaviors)
         
-        if YOLO_AVAILABLE and model_path and os.path.exists(model_path):
+        if model_path and os.path.exists(model_path):
+            self.engine = engine or detect_engine(model_path)
             try:
-                self.model = YOLO(model_path)
-                logger.info(f"YOLO model loaded from: {model_path}")
+                self.model = load_engine(model_path, self.engine, num_threads=num_threads)
+                self.model_version = compute_model_version(model_path)
+                imgsz = getattr(self.model, "overrides", {}).get("imgsz")
+                if imgsz:
+                    self.input_size = imgsz if isinstance(imgsz, int) else max(imgsz)
+                logger.info(f"YOLO model loaded from: {model_path} ({self.engine} engine, version {self.model_version})")
+            except ImportError as e:
+                logger.warning(f"Inference engine '{self.engine}' not available: {e}. Using placeholder.")
+                self.model = None
             except Exception as e:
                 logger.error(f"Failed to load YOLO model: {e}")
                 self.model = None
-        elif YOLO_AVAILABLE and model_path:
+        elif model_path:
             logger.warning(f"YOLO model path not found: {model_path}")
         else:
-            logger.warning("YOLO not available or model path not provided. Using placeholder.")
+            logger.warning("YOLO model path not provided. Using placeholder.")
+    
+    def warmup(self, batch_sizes: Iterable[int] = (1,), iterations: int = 2) -> Dict[int, Dict[str, float]]:
+        """
+        Run dummy inferences so lazy runtime initialization and per-shape
+        graph setup happen before the first real video.
+        
+        Args:
+            batch_sizes: Batch sizes to warm (each may trigger its own setup)
+            iterations: Inferences per batch size
+            
+        Returns:
+            Per batch size: seconds for the first (cold) and last inference.
+            Empty when using the placeholder.
+            
+        Raises:
+            Exception: Whatever the model raises; a model that cannot run a
+                       blank frame is not ready to serve
+        """
+        if self.model is None:
+            return {}
+        
+        frame = np.zeros((self.input_size, self.input_size, 3), dtype=np.uint8)
+        timings = {}
+        for batch_size in batch_sizes:
+            frames = [frame] * batch_size
+            seconds = []
+            for _ in range(max(1, iterations)):
+                started = time.perf_counter()
+                self.model(frames, verbose=False)
+                seconds.append(time.perf_counter() - started)
+            timings[batch_size] = {"cold_seconds": seconds[0], "warm_seconds": seconds[-1]}
+            logger.info(f"Warmup batch {batch_size}: {seconds[0]:.3f}s cold, {seconds[-1]:.3f}s warm")
+        return timings
     
     def analyze_video_percentages(
         self, 
         video_path: str, 
         frame_interval: float = 1.0,
-        confidence_threshold: float = 0.5
+        confidence_threshold: float = 0.5,
+        batch_size: int = 1,
+        sampling_mode: str = "auto",
+        gop_size: Optional[int] = None,
+        prefetch_depth: int = 0,
+        motion_threshold: float = 0.0
     ) -> Dict[str, float]:
         """
         Analyze video and return time percentages for each behavior.
@@ -77,6 +173,18 @@ class YOLOBehaviorClassifier:
             video_path: Path to video file
             frame_interval: Process every N seconds (default: 1.0)
             confidence_threshold: Minimum confidence to accept prediction
+            batch_size: Number of sampled frames sent to the model in a
+                        single forward pass (default: 1, unbatched)
+            sampling_mode: Frame sampling strategy: "auto", "grab" or "seek"
+                           (see FrameSampler)
+            gop_size: Keyframe interval of the video in frames, if known
+            prefetch_depth: If > 0, decode on a background thread and buffer
+                            up to this many preprocessed frames ahead of
+                            inference (default: 0, decode inline)
+            motion_threshold: If > 0, frames whose downscaled difference from
+                              the last classified frame is below this value
+                              reuse its prediction instead of running the
+                              model (see MotionGate; default: 0, disabled)
             
         Returns:
             Dictionary with behavior percentages:
@@ -87,106 +195,363 @@ class YOLOBehaviorClassifier:
             }
             Percentages always sum to 1.0
         """
-        if self.model is None:
-            # Placeholder: return equal distribution
-            logger.warning("YOLO model not available, using placeholder percentages")
-            num_classes = len(self.behavior_classes)
-            return {behavior: 1.0 / num_classes for behavior in self.behavior_classes.values()}
+        result = self.analyze_video(
+            video_path,
+            frame_interval=frame_interval,
+            confidence_threshold=confidence_threshold,
+            batch_size=batch_size,
+            sampling_mode=sampling_mode,
+            gop_size=gop_size,
+            prefetch_depth=prefetch_depth,
+            motion_threshold=motion_threshold
+        )
+        return result["behavior_percentages"]
+    
+    def analyze_video(
+        self, 
+        video_path: str, 
+        frame_interval: float = 1.0,
+        confidence_threshold: float = 0.5,
+        batch_size: int = 1,
+        sampling_mode: str = "auto",
+        gop_size: Optional[int] = None,
+        prefetch_depth: int = 0,
+        motion_threshold: float = 0.0
+    ) -> Dict:
+        """
+        Analyze video and return behavior percentages with processing stats.
+        
+        Takes the same arguments as analyze_video_percentages.
         
+        Returns:
+            Dictionary with:
+            - behavior_percentages: Dict[str, float] - Sums to 1.0
+            - length_seconds: float - Video duration
+            - frames_sampled: int - Frames taken from the video
+            - frames_classified: int - Sampled frames with an accepted prediction
+            - inferences_run: int - Frames sent to the model
+            - inferences_skipped: int - Static frames that reused the previous prediction
+            - model_version: str - Version of the model that produced the result
+            - timeline: List[Dict] - Run-length-encoded segments (start_time,
+              end_time, behavior, mean_confidence, frames) of the accepted
+              predictions; the percentages are derived from it
+            - error: str - Only set if the analysis failed; the other
+              fields are then placeholders (equal distribution, 0 frames)
+        """
+        result = None
         try:
-            # Open video
-            cap = cv2.VideoCapture(video_path)
-            if not cap.isOpened():
-                raise ValueError(f"Could not open video: {video_path}")
-            
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            duration = total_frames / fps if fps > 0 else 0
-            
-            logger.info(f"Processing video: {total_frames} frames, {fps:.2f} FPS, {duration:.2f}s")
-            
-            # Calculate frame interval
-            frame_skip = int(fps * frame_interval) if fps > 0 else 1
-            if frame_skip < 1:
-                frame_skip = 1
+            # Only the final update matters; one window spans the whole video
+            for update in self.iter_video_analysis(
+                video_path,
+                frame_interval=frame_interval,
+                confidence_threshold=confidence_threshold,
+                batch_size=batch_size,
+                sampling_mode=sampling_mode,
+                gop_size=gop_size,
+                prefetch_depth=prefetch_depth,
+                motion_threshold=motion_threshold,
+                window_seconds=None
+            ):
+                result = update
+        except Exception as e:
+            logger.error(f"Error analyzing video: {e}", exc_info=True)
+            # Return equal distribution on error, flagged so it is never
+            # mistaken for (or cached as) a real result
+            result = self._empty_result()
+            result["error"] = str(e)
+            return result
+        
+        result.pop("done")
+        return result
+    
+    def iter_video_analysis(
+        self,
+        video_path: str,
+        frame_interval: float = 1.0,
+        confidence_threshold: float = 0.5,
+        batch_size: int = 1,
+        sampling_mode: str = "auto",
+        gop_size: Optional[int] = None,
+        prefetch_depth: int = 0,
+        motion_threshold: float = 0.0,
+        window_seconds: Optional[float] = 60.0
+    ) -> Iterator[Dict]:
+        """
+        Analyze a video incrementally, yielding results as frames are processed.
+        
+        Takes the same arguments as analyze_video_percentages, plus:
+            window_seconds: Length of video covered by each partial update
+                            (None: only the final result)
+        
+        Yields:
+            After each window of video, a dictionary with:
+            - done: False
+            - window_start, window_end: float - Window position in seconds
+            - window_percentages: Dict[str, float] - Behavior shares within
+              the window (empty if no frame was accepted)
+            - running_percentages: Dict[str, float] - Behavior shares so far
+            - progress: float - Fraction of the video processed
+            - frames_sampled, frames_classified, inferences_run,
+              inferences_skipped: int - Counts so far
+            Finally the analyze_video result with done=True.
             
-            # Process frames
-            predictions = []
-            frame_count = 0
-            processed_count = 0
+            Closing the generator stops decoding, so callers can cancel early.
             
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    break
+        Raises:
+            ValueError: If the video cannot be opened
+        """
+        if self.model is None:
+            # Placeholder: return equal distribution
+            logger.warning("YOLO model not available, using placeholder percentages")
+            result = self._empty_result()
+            result["length_seconds"] = get_video_duration(video_path)
+            result["done"] = True
+            yield result
+            return
+        
+        # Open video
+        sampler = FrameSampler(
+            video_path,
+            frame_interval=frame_interval,
+            mode=sampling_mode,
+            gop_size=gop_size
+        )
+        total_frames = sampler.total_frames
+        
+        logger.info(
+            f"Processing video: {total_frames} frames, {sampler.fps:.2f} FPS, "
+            f"{sampler.duration:.2f}s ({sampler.mode} sampling)"
+        )
+        
+        batch_size = max(1, int(batch_size))
+        motion_gate = MotionGate(threshold=motion_threshold) if motion_threshold > 0 else None
+        
+        # Accepted predictions (above the confidence threshold, and failed frames),
+        # each weighted by the time its sample stands for
+        timeline = BehaviorTimeline(sampler.sample_duration, duration=sampler.duration)
+        counts = {
+            "frames_sampled": 0,
+            "frames_classified": 0,
+            "inferences_run": 0,
+            "inferences_skipped": 0
+        }
+        window_seconds_by_behavior = Counter()
+        
+        # (timestamp, span, frame index) of samples waiting for the buffer to
+        # be classified, in video order. Static frames are queued with index
+        # None and take the prediction of the frame before them once the
+        # buffer is resolved.
+        pending = []
+        batch_frames = []
+        batch_indices = []
+        last_prediction = None
+        
+        def flush():
+            nonlocal last_prediction, batch_frames, batch_indices, pending
+            batch_predictions = iter(self._classify_batch(batch_frames, batch_indices)) if batch_frames else iter(())
+            for timestamp, span, frame_index in pending:
+                if frame_index is not None:
+                    last_prediction = next(batch_predictions)
+                if last_prediction is None:
+                    continue
+                behavior, confidence = last_prediction
+                if behavior == "unknown" or confidence >= confidence_threshold:
+                    timeline.add(timestamp, behavior, confidence, span)
+                    window_seconds_by_behavior[behavior] += span
+                    counts["frames_classified"] += 1
+            counts["inferences_run"] += len(batch_frames)
+            batch_frames = []
+            batch_indices = []
+            pending = []
+        
+        def window_update(window_start: float, window_end: float) -> Dict:
+            window_total = sum(window_seconds_by_behavior[b] for b in self.behavior_classes.values())
+            update = {
+                "done": False,
+                "window_start": round(window_start, 3),
+                "window_end": round(window_end, 3),
+                "window_percentages": {
+                    b: window_seconds_by_behavior[b] / window_total for b in self.behavior_classes.values()
+                } if window_total else {},
+                "running_percentages": timeline.percentages(self.behavior_classes.values()),
+                "progress": min(1.0, window_end / sampler.duration) if sampler.duration > 0 else 0.0,
+                **counts
+            }
+            window_seconds_by_behavior.clear()
+            return update
+        
+        # Both paths downscale frames the same way, so the result does not
+        # depend on prefetch_depth
+        if prefetch_depth > 0:
+            frames = FramePrefetcher(sampler, depth=prefetch_depth, preprocess=self._preprocess_sample)
+        else:
+            frames = sampler
+        
+        window_start = 0.0
+        with sampler, frames:
+            for sample in frames:
+                if prefetch_depth <= 0:
+                    sample = self._preprocess_sample(sample)
                 
-                # Process every N frames
-                if frame_count % frame_skip == 0:
-                    try:
-                        # Run YOLO inference
-                        results = self.model(frame, verbose=False)
-                        
-                        # Get classification result
-                        if hasattr(results[0], 'probs'):
-                            # Classification model
-                            probs = results[0].probs
-                            top_class = probs.top1
-                            confidence = probs.top1conf.item()
-                            
-                            if confidence >= confidence_threshold:
-                                behavior = self.behavior_classes.get(top_class, "unknown")
-                                predictions.append(behavior)
-                                processed_count += 1
-                        else:
-                            # Detection model - would need different handling
-                            logger.warning("Detection model detected, but classification expected")
-                            predictions.append("unknown")
-                            processed_count += 1
-                            
-                    except Exception as e:
-                        logger.warning(f"Error processing frame {frame_count}: {e}")
-                        predictions.append("unknown")
-                        processed_count += 1
+                # Report the finished window before starting the next one
+                if window_seconds and sample.timestamp >= window_start + window_seconds:
+                    flush()
+                    yield window_update(window_start, sample.timestamp)
+                    window_start = sample.timestamp
                 
-                frame_count += 1
-            
-            cap.release()
-            
-            # Calculate percentages
-            if len(predictions) == 0:
-                logger.warning("No predictions made, returning equal distribution")
-                num_classes = len(self.behavior_classes)
-                return {behavior: 1.0 / num_classes for behavior in self.behavior_classes.values()}
-            
-            # Count behaviors
-            behavior_counts = Counter(predictions)
-            total_predictions = len(predictions)
-            
-            # Calculate percentages
-            percentages = {}
-            for behavior in self.behavior_classes.values():
-                count = behavior_counts.get(behavior, 0)
-                percentages[behavior] = count / total_predictions
+                counts["frames_sampled"] += 1
+                
+                # Skip the model when nothing moved since the last classified frame
+                if motion_gate is not None and not motion_gate.has_changed(sample.image):
+                    pending.append((sample.timestamp, sample.span, None))
+                    counts["inferences_skipped"] += 1
+                    continue
+                
+                pending.append((sample.timestamp, sample.span, sample.index))
+                batch_frames.append(sample.image)
+                batch_indices.append(sample.index)
+                
+                # Run one forward pass per full buffer
+                if len(batch_frames) >= batch_size:
+                    flush()
+        
+        # Flush the last, partially filled buffer
+        flush()
+        if window_seconds and counts["frames_sampled"]:
+            yield window_update(window_start, sampler.duration)
+        
+        result = self._empty_result()
+        result.update(counts)
+        result["length_seconds"] = sampler.duration
+        result["behavior_percentages"] = self._percentages_from_timeline(timeline)
+        result["timeline"] = timeline.to_list()
+        result["done"] = True
+        
+        logger.info(f"Behavior percentages: {result['behavior_percentages']}")
+        logger.info(
+            f"Processed {counts['frames_classified']} frames from {total_frames} total frames "
+            f"({counts['inferences_run']} inferences, {counts['inferences_skipped']} skipped as static)"
+        )
+        
+        yield result
+    
+    def _empty_result(self) -> Dict:
+        """analyze_video result with no frames processed (equal distribution)."""
+        return {
+            "behavior_percentages": self._equal_distribution(),
+            "length_seconds": 0.0,
+            "frames_sampled": 0,
+            "frames_classified": 0,
+            "inferences_run": 0,
+            "inferences_skipped": 0,
+            "model_version": self.model_version,
+            "timeline": []
+        }
+    
+    def _equal_distribution(self) -> Dict[str, float]:
+        """Placeholder percentages: every behavior gets the same share."""
+        num_classes = len(self.behavior_classes)
+        return {behavior: 1.0 / num_classes for behavior in self.behavior_classes.values()}
+    
+    def _percentages_from_timeline(self, timeline: BehaviorTimeline) -> Dict[str, float]:
+        """
+        Derive time percentages from a behavior timeline.
+        
+        Args:
+            timeline: Accepted predictions, run-length encoded
             
-            # Normalize to ensure sum = 1.0
-            total = sum(percentages.values())
-            if total > 0:
-                percentages = {k: v / total for k, v in percentages.items()}
-            else:
-                # Fallback: equal distribution
-                num_classes = len(self.behavior_classes)
-                percentages = {behavior: 1.0 / num_classes for behavior in self.behavior_classes.values()}
+        Returns:
+            Behavior percentages summing to 1.0 (equal distribution if empty)
+        """
+        percentages = timeline.percentages(self.behavior_classes.values())
+        if not percentages:
+            logger.warning("No predictions made, returning equal distribution")
+            return self._equal_distribution()
+        return percentages
+    
+    def _preprocess_sample(self, sample: SampledFrame) -> SampledFrame:
+        """
+        Downscale a sampled frame to the model input size.
+        
+        The model resizes its input to `input_size` on the shortest side
+        anyway; doing it on the decoder thread moves that work off the
+        inference loop and keeps queued frames small. Without prefetching
+        it runs inline, so both paths feed the model the same pixels.
+        
+        Args:
+            sample: Sampled frame at full resolution
             
-            logger.info(f"Behavior percentages: {percentages}")
-            logger.info(f"Processed {processed_count} frames from {total_frames} total frames")
+        Returns:
+            Sampled frame whose shortest side equals `input_size`
+        """
+        h, w = sample.image.shape[:2]
+        scale = self.input_size / min(h, w)
+        if scale >= 1.0:
+            return sample
+        
+        size = (max(1, round(w * scale)), max(1, round(h * scale)))
+        image = cv2.resize(sample.image, size, interpolation=cv2.INTER_AREA)
+        return sample._replace(image=image)
+    
+    def classify_frames(self, frames: List[np.ndarray]) -> List[Tuple[str, float]]:
+        """
+        Classify standalone frames (e.g. from a live stream) in one model call.
+        
+        Args:
+            frames: BGR frames
             
-            return percentages
+        Returns:
+            One (behavior, confidence) tuple per frame; ("unknown", 0.0)
+            with the placeholder model
+        """
+        if self.model is None:
+            return [("unknown", 0.0)] * len(frames)
+        return self._classify_batch(frames, list(range(len(frames))))
+    
+    def _classify_batch(
+        self,
+        frames: List[np.ndarray],
+        frame_indices: List[int]
+    ) -> List[Tuple[str, float]]:
+        """
+        Classify a buffer of frames with a single model call.
+        
+        Args:
+            frames: BGR frames to classify
+            frame_indices: Video frame number of each frame (for logging)
             
+        Returns:
+            One (behavior, confidence) tuple per frame. Frames that fail are
+            labelled "unknown" with confidence 0.0.
+        """
+        try:
+            # Run YOLO inference on the whole buffer at once
+            results = self.model(frames, verbose=False)
         except Exception as e:
-            logger.error(f"Error analyzing video: {e}", exc_info=True)
-            # Return equal distribution on error
-            num_classes = len(self.behavior_classes)
-            return {behavior: 1.0 / num_classes for behavior in self.behavior_classes.values()}
+            logger.warning(f"Error processing frames {frame_indices[0]}-{frame_indices[-1]}: {e}")
+            return [("unknown", 0.0)] * len(frames)
+        
+        predictions = []
+        for frame_index, result in zip(frame_indices, results):
+            try:
+                # Get classification result
+                if hasattr(result, 'probs') and result.probs is not None:
+                    # Classification model
+                    probs = result.probs
+                    top_class = probs.top1
+                    confidence = probs.top1conf.item()
+                    behavior = self.behavior_classes.get(top_class, "unknown")
+                    predictions.append((behavior, confidence))
+                else:
+                    # Detection model - would need different handling
+                    logger.warning("Detection model detected, but classification expected")
+                    predictions.append(("unknown", 0.0))
+                    
+            except Exception as e:
+                logger.warning(f"Error processing frame {frame_index}: {e}")
+                predictions.append(("unknown", 0.0))
+        
+        return predictions
     
     def get_primary_behavior(self, percentages: Dict[str, float]) -> tuple:
         """